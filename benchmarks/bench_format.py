@@ -0,0 +1,46 @@
+"""Compare format_scientific_batch with a loop over format_scientific.
+
+Run from the repository root (needs NumPy):
+
+    python benchmarks/bench_format.py [count]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from physics_engine import format_scientific
+from physics_format import format_scientific_batch
+
+
+def sample(count, seed=0):
+    """Results spread over the fixed and scientific ranges, as in a sweep export"""
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal(count) * 10.0 ** rng.integers(-30, 30, count)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    values = sample(count)
+    as_list = values.tolist()
+
+    start = time.perf_counter()
+    scalar = [format_scientific(value) for value in as_list]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = format_scientific_batch(values)
+    batch_time = time.perf_counter() - start
+
+    assert batch == scalar, "batch output differs from format_scientific"
+    print(f"{count} values")
+    print(f"format_scientific loop   {scalar_time:8.3f} s  {count / scalar_time / 1e6:6.2f} M/s")
+    print(f"format_scientific_batch  {batch_time:8.3f} s  {count / batch_time / 1e6:6.2f} M/s")
+    print(f"speedup                  {scalar_time / batch_time:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare the expression parser and its compiled programs with CPython compile+eval.
+
+Columns, in microseconds per expression:
+  compile+eval   compile() then eval() of the equivalent Python source
+  parse+run      compile_expression() then running the program once
+  cached eval    eval() of an already compiled code object
+  cached run     Program.run() of an already compiled program (linked closures)
+  stack VM       run() over the same program's instructions
+  engine         PhysicsEngine.evaluate(), cache lookup and precision checks included
+
+Run from the repository root:
+
+    python benchmarks/bench_parser.py
+"""
+import os
+import re
+import sys
+import timeit
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from physics_engine import FUNCTIONS, PhysicsEngine
+from physics_parser import compile_expression, run, symbol_aliases
+
+EXPRESSIONS = [
+    "h*c",
+    "mₑ*c^2",
+    "sqrt(kB*300)",
+    "10^8",
+    "h*c/(500*nm)",
+    "1.5×10^3*eV",
+    "ln(2)*kB*300/eV",
+    "(mₚ+mₙ-2*u)*c^2/MeV",
+    # These fold no further than the constants, so the program runs each operation
+    "h*c/(x*nm)/eV",
+    "sqrt(x^2+y^2)*exp(-x/y)+x^2",
+    "x*y/(x+y)*kB*300",
+]
+VARIABLES = {'x': 500.0, 'y': 2.5}
+
+
+def eval_namespace(symbols):
+    namespace = {'__builtins__': {}}
+    namespace.update(FUNCTIONS)
+    namespace.update(symbols)
+    # eval applies NFKC to identifiers, so 'mₑ' is looked up as 'me'
+    for symbol, value in symbols.items():
+        namespace.setdefault(unicodedata.normalize('NFKC', symbol), value)
+    return namespace
+
+
+def python_source(text):
+    text = text.replace('^', '**')
+    return re.sub(r'(\d+\.?\d*)\s*×\s*10\*\*([+-]?\d+)', r'(\1 * 10**\2)', text)
+
+
+def best_of(statement, number, repeat=5):
+    return min(timeit.repeat(statement, number=number, repeat=repeat)) / number
+
+
+def main():
+    engine = PhysicsEngine()
+    # A plain dict of the featured symbols, as the engine used before the registry
+    symbols = dict(engine.constants)
+    symbols.update(engine.units)
+    namespace = eval_namespace(symbols)
+    namespace.update(VARIABLES)
+    aliases = symbol_aliases(symbols)
+
+    print(f"{'expression':<30}{'compile+eval':>14}{'parse+run':>11}{'cached eval':>13}{'cached run':>12}"
+          f"{'stack VM':>10}{'engine':>8}  (µs)")
+    for text in EXPRESSIONS:
+        source = python_source(text)
+        code = compile(source, '<expression>', 'eval')
+        program = compile_expression(text, symbols, FUNCTIONS, aliases)
+        variables = {name: value for name, value in VARIABLES.items() if name in program.variables}
+        assert eval(code, namespace) == program.run(FUNCTIONS, variables)
+
+        cold_eval = best_of(lambda: eval(compile(source, '<expression>', 'eval'), namespace), 2000)
+        cold_run = best_of(lambda: compile_expression(text, symbols, FUNCTIONS, aliases).run(FUNCTIONS, variables),
+                           2000)
+        warm_eval = best_of(lambda: eval(code, namespace), 20000)
+        warm_run = best_of(lambda: program.run(FUNCTIONS, variables), 20000)
+        vm = best_of(lambda: run(program.code, FUNCTIONS, variables, program.temps), 20000)
+        cached = best_of(lambda: engine.evaluate(text, variables), 20000)
+        print(f"{text:<30}{cold_eval * 1e6:>14.2f}{cold_run * 1e6:>11.2f}{warm_eval * 1e6:>13.2f}"
+              f"{warm_run * 1e6:>12.2f}{vm * 1e6:>10.2f}{cached * 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""A stand-in for tkinter so GUI code paths can be timed without a display.
+
+install() registers fake tkinter modules in sys.modules before the GUI module
+is imported.  Widgets accept any option and any method call; after() and
+after_idle() callbacks are queued and run by run_pending().  Timings taken
+this way measure the Python side of widget construction and updates only,
+not Tk's own layout and drawing.
+"""
+import sys
+import types
+
+
+class Widget:
+    pending = []
+
+    def __init__(self, *args, **options):
+        self.options = options
+
+    def __getattr__(self, name):
+        return lambda *args, **options: None
+
+    def after(self, delay, callback=None, *args):
+        if callback is not None:
+            Widget.pending.append((callback, args))
+        return f"after#{len(Widget.pending)}"
+
+    def after_idle(self, callback, *args):
+        return self.after(0, callback, *args)
+
+    def cget(self, option):
+        return self.options.get(option)
+
+    def winfo_height(self):
+        return 300
+
+    def clipboard_get(self):
+        return ""
+
+
+class Variable:
+    def __init__(self, master=None, value=None):
+        self.value = value
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class Font(Widget):
+    def metrics(self, option=None):
+        return 15 if option else {'linespace': 15}
+
+    def measure(self, text):
+        return 7 * len(text)
+
+
+class Treeview(Widget):
+    def get_children(self, item=''):
+        return ()
+
+    def exists(self, item):
+        return False
+
+    def selection(self):
+        return ()
+
+
+def run_pending(limit=100000):
+    """Run queued after()/after_idle() callbacks, including ones they schedule"""
+    count = 0
+    while Widget.pending and count < limit:
+        callback, args = Widget.pending.pop(0)
+        callback(*args)
+        count += 1
+    return count
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+def install():
+    """Register the fake tkinter package; returns the fake tkinter module"""
+    widget_names = ['Tk', 'Toplevel', 'Frame', 'Label', 'Button', 'LabelFrame', 'Canvas', 'Text',
+                    'Entry', 'Scrollbar', 'Listbox', 'Menu', 'Checkbutton', 'Radiobutton', 'Scale']
+    tk = _module('tkinter', TclError=Exception, TkVersion=8.6, Widget=Widget)
+    for name in widget_names:
+        setattr(tk, name, type(name, (Widget,), {}))
+    for name in ['StringVar', 'BooleanVar', 'IntVar', 'DoubleVar']:
+        setattr(tk, name, type(name, (Variable,), {}))
+
+    # Constants such as tk.END or tk.LEFT are the lower-case name, as in tkinter.constants
+    tk.__getattr__ = lambda name: name.lower() if name.isupper() else _missing(name)
+
+    ttk = _module('tkinter.ttk', Scrollbar=type('Scrollbar', (Widget,), {}),
+                  Style=type('Style', (Widget,), {}), Treeview=Treeview)
+    messagebox = _module('tkinter.messagebox', showinfo=_ignore, showerror=_ignore,
+                         showwarning=_ignore, askyesno=lambda *a, **k: True)
+    filedialog = _module('tkinter.filedialog', asksaveasfilename=lambda **k: '',
+                         askopenfilename=lambda **k: '')
+    font = _module('tkinter.font', Font=Font, nametofont=lambda name: Font())
+    scrolledtext = _module('tkinter.scrolledtext', ScrolledText=type('ScrolledText', (Widget,), {}))
+    for sub in (ttk, messagebox, filedialog, font, scrolledtext):
+        setattr(tk, sub.__name__.split('.')[-1], sub)
+        sys.modules[sub.__name__] = sub
+    sys.modules['tkinter'] = tk
+    return tk
+
+
+def _ignore(*args, **options):
+    return None
+
+
+def _missing(name):
+    raise AttributeError(f"mock tkinter has no attribute '{name}'")
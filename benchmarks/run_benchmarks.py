@@ -0,0 +1,730 @@
+"""Benchmark suite for the calculator's evaluation, formatting, startup and GUI paths.
+
+Run from the repository root:
+
+    python benchmarks/run_benchmarks.py                    # full run, writes benchmarks/results-<time>.json
+    python benchmarks/run_benchmarks.py --quick -o new.json --compare old.json
+
+Sections:
+    latency   cold (compile + run) and cached evaluation of a corpus of physics expressions
+    batch     evaluate_lines throughput over a mixed file of expressions, with and
+              without the function memo
+    format    format_scientific (and format_scientific_batch, with NumPy) throughput
+    startup   time from process launch to the first usable calculator window, and the
+              calculator's own first-paint and panels-filled times
+    gui       keystroke display updates, pasting whole expressions, calculate() and a
+              multi-line paste evaluated as a batch, in a live calculator
+    history   append, window and search cost as the history log grows
+    registry  constants/units registry load and lookup cost as the data file grows
+    server    request rate and latency of the local evaluation server under concurrent clients
+    solve     single-target solve latency, and many-target solve throughput (with NumPy)
+    integrate integrate() and sum() latency, and repeated integrals with changing limits
+    uncertainty  Monte Carlo evaluation of expressions with ± values, against one
+              scalar run per sample
+    files     grid mode on one process and on a pool, and file mode over .npy and CSV
+              columns (with NumPy)
+    precision float and decimal-tier latency of expressions that overflow, underflow
+              or cancel, next to ordinary ones
+    worksheet recomputation after changing the first, a middle and the last name of
+              long chains of worksheet definitions, and loading a saved worksheet
+
+The startup and gui sections use the real Tk when a display is available
+(e.g. under xvfb-run) and the mocked Tk in mock_tk.py otherwise, or when
+--mock-tk is given; mocked timings cover only the Python side.  History
+files are written to a temporary directory, never to the user's history.
+All timings are in microseconds unless the key says otherwise.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from physics_engine import PhysicsEngine, evaluate_lines, format_scientific
+from physics_history import HistoryStore
+from physics_registry import DATA_PATH, Registry
+
+try:
+    import numpy as np
+except ImportError:  # the batch formatter is benchmarked only when NumPy is present
+    np = None
+
+# Expressions of the kind typed into the calculator
+CORPUS = [
+    "h*c",
+    "mₑ*c^2",
+    "sqrt(kB*300)",
+    "10^8",
+    "h*c/(500*nm)/eV",
+    "mₚ*c^2/MeV",
+    "e^2/(4*π*ε₀*ℏ*c)",
+    "1/sqrt(μ₀*ε₀)",
+    "G*5.97e24/(6.371e6)^2",
+    "kB*300/eV",
+    "NA*kB",
+    "h/(mₑ*c)",
+    "R∞*h*c/eV",
+    "ℏ/(2*mₑ*13.6*eV)",
+    "sqrt(2*G*1.989e30/6.96e8)",
+    "3*kB*5778/(2*eV)",
+    "(mₙ-mₚ)*c^2/MeV",
+    "exp(-1.5*eV/(kB*300*K))",
+    "sin(π/6)^2+cos(π/6)^2",
+    "log10(6.02214076e23)",
+    "u*c^2/MeV",
+    "α^-1",
+    "2*π*ℏ*c/(1.5*Å)/keV",
+    "pow(2, 64)",
+]
+
+
+def timed(function, repeat):
+    """Run function repeat times; return per-call durations in µs"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        function()
+        samples.append((time.perf_counter_ns() - start) / 1e3)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'p90': ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))],
+    }
+
+
+def bench_latency(repeat):
+    """Per-expression latency, uncached (compile + run) and cached"""
+    engine = PhysicsEngine()
+    results = {}
+    for text in CORPUS:
+        def cold():
+            engine.clear_cache()
+            engine.evaluate(text)
+        cold_samples = timed(cold, repeat)
+        engine.evaluate(text)
+        warm_samples = timed(lambda: engine.evaluate(text), repeat)
+        results[text] = {'cold': summarize(cold_samples), 'cached': summarize(warm_samples)}
+
+    cold_total = sum(entry['cold']['median'] for entry in results.values())
+    cached_total = sum(entry['cached']['median'] for entry in results.values())
+    return {
+        'expressions': results,
+        'corpus_cold_median_sum': cold_total,
+        'corpus_cached_median_sum': cached_total,
+    }
+
+
+def batch_lines(count, seed=0):
+    """A batch file: corpus expressions with varied literals, some repeats, comments and an error"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        text = CORPUS[i % len(CORPUS)]
+        kind = rng.random()
+        if kind < 0.5:
+            lines.append(f"{text}*{rng.randint(1, 1000)}")
+        elif kind < 0.95:
+            lines.append(text)
+        elif kind < 0.99:
+            lines.append("# comment")
+        else:
+            lines.append("h*")
+    return lines
+
+
+def bench_batch(count, jobs):
+    lines = batch_lines(count)
+    results = {'lines': count}
+
+    for label, memo_size in (('serial', 0), ('serial_memo', 4096)):
+        engine = PhysicsEngine(memo_size=memo_size)
+        start = time.perf_counter()
+        for _ in evaluate_lines(engine, lines):
+            pass
+        elapsed = time.perf_counter() - start
+        results[f'{label}_s'] = elapsed
+        results[f'{label}_lines_per_s'] = count / elapsed
+        if memo_size:
+            results['memo_hit_rate'] = engine.memo_stats()['hit_rate']
+
+    if jobs != 1:
+        from physics_parallel import evaluate_parallel
+        start = time.perf_counter()
+        for _ in evaluate_parallel(lines, workers=jobs or None):
+            pass
+        elapsed = time.perf_counter() - start
+        results['parallel_jobs'] = jobs or os.cpu_count()
+        results['parallel_s'] = elapsed
+        results['parallel_lines_per_s'] = count / elapsed
+    return results
+
+
+def format_sample(count, seed=0):
+    """Floats over the fixed and scientific ranges, plus some whole numbers"""
+    rng = random.Random(seed)
+    values = []
+    for i in range(count):
+        if i % 10 == 0:
+            values.append(float(rng.randint(-10 ** 6, 10 ** 6)))
+        else:
+            values.append(rng.gauss(0, 1) * 10.0 ** rng.randint(-30, 30))
+    return values
+
+
+def bench_format(count):
+    values = format_sample(count)
+    results = {'values': count}
+
+    start = time.perf_counter()
+    scalar = [format_scientific(value) for value in values]
+    elapsed = time.perf_counter() - start
+    results['scalar_s'] = elapsed
+    results['scalar_values_per_s'] = count / elapsed
+
+    if np is not None:
+        from physics_format import format_scientific_batch
+        array = np.array(values)
+        start = time.perf_counter()
+        batch = format_scientific_batch(array)
+        elapsed = time.perf_counter() - start
+        results['batch_s'] = elapsed
+        results['batch_values_per_s'] = count / elapsed
+        results['batch_matches_scalar'] = batch == scalar
+    return results
+
+
+def display_available():
+    if sys.platform in ('win32', 'darwin'):
+        return True
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+STARTUP_SCRIPT = """
+import sys
+if {mock!r}:
+    sys.path.insert(0, {bench_dir!r})
+    import mock_tk
+    mock_tk.install()
+sys.path.insert(0, {repo_dir!r})
+import physics_calculator_gui
+calc = physics_calculator_gui.PhysicsCalculatorGUI()
+if {mock!r}:
+    mock_tk.run_pending()
+else:
+    calc.root.update()
+print("ready", calc.startup_times.get('first_paint', 0.0), calc.startup_times.get('panels', 0.0), flush=True)
+calc.on_close()
+"""
+
+
+def bench_startup(repeat, mock, workdir):
+    """Wall time from launching a fresh interpreter to a drawn, usable window"""
+    script = STARTUP_SCRIPT.format(mock=mock, bench_dir=BENCH_DIR, repo_dir=REPO_DIR)
+    env = dict(os.environ, PHYSICS_CALC_HISTORY=os.path.join(workdir, 'startup.sqlite3'))
+    samples = []
+    first_paint = []
+    panels = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, env=env, text=True)
+        fields = process.stdout.readline().split()
+        elapsed = time.perf_counter() - start
+        process.wait()
+        if not fields or fields[0] != "ready":
+            raise RuntimeError(f"calculator did not start (exit code {process.returncode})")
+        samples.append(elapsed * 1e3)
+        # Measured inside the calculator, from the start of PhysicsCalculatorGUI()
+        first_paint.append(float(fields[1]))
+        panels.append(float(fields[2]))
+
+    # Baseline: interpreter start-up alone, to separate it from the calculator's own cost
+    baseline = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        baseline.append((time.perf_counter() - start) * 1e3)
+
+    return {
+        'tk': 'mock' if mock else 'real',
+        'first_window_ms': summarize(samples),
+        'gui_first_paint_ms': summarize(first_paint),
+        'gui_panels_ready_ms': summarize(panels),
+        'interpreter_ms': summarize(baseline),
+    }
+
+
+def bench_gui(repeat, mock, workdir):
+    """Cost of a keystroke (display update), a paste and calculate() in a live calculator"""
+    if mock:
+        import mock_tk
+        mock_tk.install()
+    os.environ['PHYSICS_CALC_HISTORY'] = os.path.join(workdir, 'gui.sqlite3')
+    import physics_calculator_gui
+
+    calc = physics_calculator_gui.PhysicsCalculatorGUI()
+
+    def settle():
+        # Let Tk redraw; the mock runs the display update and drops the other queued
+        # callbacks (preview timers, history flushes)
+        if mock:
+            calc.flush_display()
+            mock_tk.Widget.pending.clear()
+        else:
+            calc.root.update()
+
+    keystrokes = []
+    calculations = []
+    for _ in range(repeat):
+        for text in CORPUS:
+            calc.clear_function('C')
+            settle()
+            for char in text:
+                start = time.perf_counter_ns()
+                calc.add_to_input(char)
+                settle()
+                keystrokes.append((time.perf_counter_ns() - start) / 1e3)
+            start = time.perf_counter_ns()
+            calc.calculate()
+            settle()
+            calculations.append((time.perf_counter_ns() - start) / 1e3)
+
+    # The same expressions arriving whole, as from a paste, and all at once as a batch
+    pastes = []
+    batches = []
+    for _ in range(repeat):
+        for text in CORPUS:
+            calc.clear_function('C')
+            settle()
+            start = time.perf_counter_ns()
+            calc.inject(text)
+            settle()
+            pastes.append((time.perf_counter_ns() - start) / 1e3)
+        start = time.perf_counter_ns()
+        calc.evaluate_batch(CORPUS)
+        settle()
+        batches.append((time.perf_counter_ns() - start) / 1e3)
+
+    calc.on_close()
+    return {
+        'tk': 'mock' if mock else 'real',
+        'keystroke': summarize(keystrokes),
+        'paste': summarize(pastes),
+        'calculate': summarize(calculations),
+        'batch_paste': summarize(batches),
+        'batch_lines': len(CORPUS),
+    }
+
+
+def bench_history(sizes, workdir):
+    """Append cost per growth segment and read/search cost at each size"""
+    path = os.path.join(workdir, 'history.sqlite3')
+    store = HistoryStore(path)
+    expressions = batch_lines(1000, seed=1)
+    results = {}
+    previous = 0
+    for size in sizes:
+        start = time.perf_counter()
+        for i in range(previous, size):
+            store.append(expressions[i % len(expressions)], format_scientific(i * 1.5e-3))
+        store.flush()
+        append_us = (time.perf_counter() - start) * 1e6 / (size - previous)
+        previous = size
+
+        results[str(size)] = {
+            'append_per_entry': append_us,
+            'window_recent': summarize(timed(lambda: store.window(size - 15, 15), 200)),
+            'window_oldest': summarize(timed(lambda: store.window(0, 15), 200)),
+            'search_substring': summarize(timed(lambda: store.search('c^2', limit=100), 20)),
+            'search_short': summarize(timed(lambda: store.search('h*', limit=100), 20)),
+            'reopen_ms': _reopen_ms(path),
+            'file_bytes': os.path.getsize(path),
+        }
+    store.close()
+    return results
+
+
+def _reopen_ms(path):
+    start = time.perf_counter()
+    HistoryStore(path).close()
+    return (time.perf_counter() - start) * 1e3
+
+
+def synthetic_data(path, count):
+    """The real data file padded with count made-up constants and prefixable units"""
+    with open(DATA_PATH, encoding='utf-8') as f:
+        real = f.read()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(real)
+        for i in range(count):
+            kind = 'si-unit' if i % 2 else 'constant'
+            f.write(f"X{i}\t{1.5 + i}e-{i % 30}\tkg m2 s-2\t{kind}\tsynthetic entry {i}\n")
+
+
+def bench_registry(sizes, workdir):
+    """Load and lookup cost for the real data file and for ever larger synthetic ones"""
+    results = {}
+    for size in [0] + sizes:
+        path = DATA_PATH
+        if size:
+            path = os.path.join(workdir, f'registry-{size}.tsv')
+            synthetic_data(path, size)
+
+        def load():
+            Registry(path).load()
+        registry = Registry(path)
+        registry.load()
+        names = {'exact': 'h', 'alias': 'me', 'prefixed': 'GHz', 'miss': 'not_a_symbol'}
+        lookups = {}
+        for kind, name in names.items():
+            # A fresh registry each time, so the first-lookup parse is included
+            lookups[f'first_{kind}'] = summarize(timed(lambda: Registry.lookup(_loaded(registry), name), 200))
+            registry.lookup(name)
+            lookups[f'repeat_{kind}'] = summarize(timed(lambda: registry.lookup(name), 2000))
+        results[str(len(registry))] = {'load_ms': summarize([t / 1e3 for t in timed(load, 10)]), **lookups}
+    return results
+
+
+def _loaded(registry):
+    """A registry sharing registry's index but with an empty parsed-entry cache"""
+    fresh = Registry(registry.path)
+    fresh.lines = registry.lines
+    fresh.aliases = registry.aliases
+    return fresh
+
+
+def bench_server(clients, requests_per_client, workdir):
+    """Concurrent clients on a Unix socket (TCP where unavailable), each waiting for every reply"""
+    import asyncio
+    from physics_server import EvaluationClient, EvaluationServer
+
+    async def run():
+        server = EvaluationServer()
+        use_unix = hasattr(asyncio, 'start_unix_server')
+        path = os.path.join(workdir, 'server.sock') if use_unix else None
+        await server.start(path)
+        port = None if use_unix else server.address()[1]
+        connections = [await EvaluationClient().connect(path, port=port) for _ in range(clients)]
+        latencies = []
+
+        async def client(connection, offset):
+            for i in range(requests_per_client):
+                text = CORPUS[(offset + i) % len(CORPUS)]
+                start = time.perf_counter_ns()
+                await connection.evaluate(f"{text}*{i % 100 + 1}")
+                latencies.append((time.perf_counter_ns() - start) / 1e3)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(connection, n) for n, connection in enumerate(connections)))
+        elapsed = time.perf_counter() - start
+        stats = await connections[0].stats()
+        for connection in connections:
+            await connection.close()
+        await server.close()
+        return {
+            'clients': clients,
+            'requests': len(latencies),
+            'requests_per_s': len(latencies) / elapsed,
+            'latency': summarize(latencies),
+            'p99': sorted(latencies)[int(len(latencies) * 0.99)],
+            'mean_batch': stats['mean_batch'],
+        }
+
+    return asyncio.run(run())
+
+
+# (expression, target) pairs solved for their one unknown
+SOLVE_CASES = [
+    ("h*c/λ", "2.5*eV"),
+    ("sqrt(2*E/mₑ)", "1e6"),
+    ("exp(-E/(kB*300*K))", "1e-3"),
+    ("x**3 - x", "0.1"),
+]
+
+
+def bench_solve(repeat, count):
+    """Scalar solves (grid bracket search + Brent), and solve_many over an array of targets"""
+    from physics_solve import solve, solve_many
+    engine = PhysicsEngine()
+    results = {}
+    for text, target in SOLVE_CASES:
+        results[f"{text} = {target}"] = summarize(timed(lambda: solve(engine, text, target), repeat))
+    if np is not None:
+        targets = np.geomspace(0.5, 5, count)
+        start = time.perf_counter()
+        roots = solve_many(engine, "h*c/λ/eV", targets)
+        elapsed = time.perf_counter() - start
+        results['many'] = {'targets': count, 'seconds': elapsed, 'targets_per_s': count / elapsed,
+                           'unsolved': int(np.isnan(roots).sum())}
+    return results
+
+
+# Integrals and sums of the kind the calculator is asked for; k (set to 1) keeps
+# them from being folded to a number at compile time
+INTEGRATE_CASES = [
+    "integrate(x^3/expm1(k*x), x, 0, ∞)",
+    "integrate(2*π*h*c^2/λ^5/expm1(h*c/(λ*kB*5778*k*K)), λ, 0*m, ∞*m)",
+    "integrate(exp(-k*x^2), x, -∞, ∞)",
+    "integrate(k/sqrt(x), x, 0, 1)",
+    "sum(k/n^2, n, 1, ∞)",
+    "sum(exp(-k*n*1e-3), n, 1, 10^5)",
+]
+
+
+def bench_integrate(repeat):
+    """integrate() and sum() run time, and evaluation with new limits each call"""
+    engine = PhysicsEngine()
+    results = {}
+    for text in INTEGRATE_CASES:
+        program = engine.compile_expression(text)
+        results[text] = summarize(timed(lambda: program.run(engine.functions, {'k': 1.0}), repeat))
+
+    # New limits each time: the expression is recompiled but the integrand is not
+    limits = iter(range(1, 1 << 30))
+    results['new_limits'] = summarize(timed(
+        lambda: engine.evaluate(f"integrate(x^3/expm1(x), x, 0, {1 + next(limits) % 1000 / 100})"), repeat))
+    results['integrand_programs'] = len(engine.integrands)
+    return results
+
+
+UNCERTAINTY_CASES = [
+    "9.81 ± 0.02",
+    "h*c/((532 ± 1)*nm)/eV",
+    "(9.81 ± 0.02)*m/s^2 * ((1.20 ± 0.01)*s)^2 / 2",
+    "sqrt((2.0 ± 0.1)^2 + (3.0 ± 0.2)^2)*exp(-(0.50 ± 0.05))",
+]
+
+
+def bench_uncertainty(repeat):
+    """Latency of a ± expression at the default sample count, and per-sample cost"""
+    from physics_uncertainty import DEFAULT_SAMPLES, SCALAR_SAMPLES, np
+
+    engine = PhysicsEngine()
+    engine.propagator.seed = 1
+    results = {'samples': DEFAULT_SAMPLES if np is not None else SCALAR_SAMPLES}
+    for text in UNCERTAINTY_CASES:
+        engine.evaluate(text)
+        results[text] = summarize(timed(lambda: engine.evaluate(text), repeat))
+        # The same expression run once per sample, as a scalar loop would
+        program = engine.compile_expression(text)
+        values = {name: value for name, value, spread in program.uncertain}
+        per_sample = summarize(timed(lambda: program.run(engine.functions, values), repeat * 100))
+        results[text]['scalar_loop_estimate'] = per_sample['median'] * results['samples']
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__ if np is not None else None,
+    }
+
+
+def flatten(results, prefix=''):
+    """Map 'section.key.subkey' paths to numeric leaves"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(current, baseline):
+    """Print current/baseline ratios for every metric present in both runs"""
+    old = flatten(baseline['results'])
+    new = flatten(current['results'])
+    print(f"\nCompared with {baseline['metadata'].get('commit') or 'baseline'} "
+          f"({baseline['metadata'].get('time')}):")
+    for path in new:
+        if path in old and old[path]:
+            print(f"  {path:<70} {old[path]:>12.4g} -> {new[path]:>12.4g}  x{new[path] / old[path]:.3f}")
+
+
+def bench_files(size, jobs, workdir):
+    """Points per second for grid mode (in process and pooled) and for file mode"""
+    if np is None:
+        return {}
+    from physics_columns import CsvSource, NpySource, evaluate_columns
+    from physics_grid import evaluate_grid
+
+    engine = PhysicsEngine()
+    planck = "2*h*c^2/λ^5/(exp(h*c/(λ*kB*θ*K))-1)"
+    wavelengths = np.linspace(100e-9, 3000e-9, size)
+    temperatures = np.linspace(1000, 6000, size)
+    results = {}
+    for name, workers in (('grid_1', 1), (f'grid_{jobs}', jobs)):
+        start = time.perf_counter()
+        evaluate_grid(engine, planck, 'λ', wavelengths, 'θ', temperatures,
+                      os.path.join(workdir, 'grid.npy'), workers)
+        elapsed = time.perf_counter() - start
+        results[name] = {'points': size * size, 'seconds': elapsed, 'points_per_s': size * size / elapsed}
+
+    rows = size * size // 10
+    column = np.random.default_rng(0).uniform(200, 900, rows)
+    npy_path = os.path.join(workdir, 'wavelength.npy')
+    csv_path = os.path.join(workdir, 'wavelength.csv')
+    np.save(npy_path, column)
+    np.savetxt(csv_path, column, header='wavelength', comments='')
+    for name, source in (('npy', lambda: NpySource(npy_path)), ('csv', lambda: CsvSource(csv_path))):
+        start = time.perf_counter()
+        for _ in evaluate_columns(engine, "h*c/(wavelength*nm)/eV", [source()]):
+            pass
+        elapsed = time.perf_counter() - start
+        results[name] = {'rows': rows, 'seconds': elapsed, 'rows_per_s': rows / elapsed}
+    return results
+
+
+PRECISION_CASES = [
+    "h*c/(500*nm)/eV",
+    "(mₚ + mₙ - 2.01410177812*u)*c^2/MeV",
+    "euler**1000",
+    "exp(-1000)",
+    "(1e16 + k) - 1e16",
+    "1.00782503223*u*k - 1.00782503207*u",
+]
+
+
+def bench_precision(repeat):
+    """Cold and cached latency per case, and the precision tier each one settled on"""
+    results = {}
+    for text in PRECISION_CASES:
+        engine = PhysicsEngine()
+        # k keeps the cancelling cases from folding to a constant at compile time
+        variables = {'k': 1} if 'k' in text else None
+        texts = iter(f"{text} + 0*{index}" for index in range(1 << 30))
+        results[text] = {
+            'cold': summarize(timed(lambda: engine.evaluate(next(texts), variables), repeat)),
+            'cached': summarize(timed(lambda: engine.evaluate(text, variables), repeat * 10)),
+            'digits': engine.compile_expression(text).precision,
+        }
+    return results
+
+
+def bench_worksheet(sizes, repeat):
+    """Incremental recomputation cost as a chain of dependent worksheet names grows"""
+    from physics_worksheet import Worksheet
+
+    engine = PhysicsEngine()
+    results = {}
+    for size in sizes:
+        worksheet = Worksheet(engine)
+        worksheet.assign('q0', "1*m")
+        for index in range(1, size):
+            # Every name uses the one before it, so a change to q0 reaches them all
+            worksheet.define(f'q{index}', f"q{index - 1}*(1 + 1/{index}) - {index % 7}*m")
+        worksheet.recompute()
+        values = iter(range(1, 1 << 30))
+        middle = size // 2
+        results[size] = {
+            'first': summarize(timed(lambda: worksheet.assign('q0', f"{next(values)}*m"), repeat)),
+            'middle': summarize(timed(lambda: worksheet.assign(f'q{middle}', f"q{middle - 1} + {next(values)}*m"),
+                                      repeat)),
+            'last': summarize(timed(lambda: worksheet.assign(f'q{size - 1}', f"q{size - 2}*{next(values)}"),
+                                    repeat)),
+        }
+        text = worksheet.dumps()
+        results[size]['load'] = summarize(timed(lambda: Worksheet(engine).loads(text), max(1, repeat // 10)))
+    return results
+
+
+SECTIONS = ['latency', 'batch', 'format', 'startup', 'gui', 'history', 'registry', 'server', 'solve', 'integrate',
+            'uncertainty', 'files', 'worksheet', 'precision']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the physics calculator.")
+    parser.add_argument('sections', nargs='*', help=f"sections to run: {', '.join(SECTIONS)} (default: all)")
+    parser.add_argument('-o', '--output', help="JSON results file (default: benchmarks/results-<time>.json)")
+    parser.add_argument('--compare', metavar='FILE', help="earlier results file to compare against")
+    parser.add_argument('--quick', action='store_true', help="smaller sizes and fewer repeats")
+    parser.add_argument('--mock-tk', action='store_true', help="use the mocked Tk even if a display is available")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="also time the batch with this many worker processes (0 = all CPUs)")
+    args = parser.parse_args(argv)
+
+    sections = args.sections or SECTIONS
+    for section in sections:
+        if section not in SECTIONS:
+            parser.error(f"unknown section '{section}'")
+    mock = args.mock_tk or not display_available()
+    if args.quick:
+        repeat, batch_count, format_count, history_sizes = 20, 20000, 100000, [1000, 10000]
+        registry_sizes = [1000, 10000]
+    else:
+        repeat, batch_count, format_count, history_sizes = 200, 200000, 1000000, [1000, 10000, 100000]
+        registry_sizes = [1000, 10000, 100000]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for section in sections:
+            print(f"running {section}...", file=sys.stderr)
+            if section == 'latency':
+                results[section] = bench_latency(repeat)
+            elif section == 'batch':
+                results[section] = bench_batch(batch_count, args.jobs)
+            elif section == 'format':
+                results[section] = bench_format(format_count)
+            elif section == 'startup':
+                results[section] = bench_startup(max(3, repeat // 20), mock, workdir)
+            elif section == 'gui':
+                results[section] = bench_gui(max(1, repeat // 20), mock, workdir)
+            elif section == 'history':
+                results[section] = bench_history(history_sizes, workdir)
+            elif section == 'registry':
+                results[section] = bench_registry(registry_sizes, workdir)
+            elif section == 'server':
+                results[section] = bench_server(32, repeat * 10, workdir)
+            elif section == 'solve':
+                results[section] = bench_solve(max(5, repeat // 4), batch_count)
+            elif section == 'integrate':
+                results[section] = bench_integrate(max(5, repeat // 10))
+            elif section == 'uncertainty':
+                results[section] = bench_uncertainty(max(5, repeat // 10))
+            elif section == 'files':
+                results[section] = bench_files(1000 if args.quick else 4000, args.jobs or os.cpu_count() or 1,
+                                               workdir)
+            elif section == 'precision':
+                results[section] = bench_precision(max(5, repeat // 4))
+            elif section == 'worksheet':
+                results[section] = bench_worksheet([100, 1000] if args.quick else [100, 1000, 5000],
+                                                   max(5, repeat // 10))
+
+    report = {'metadata': metadata(), 'results': results}
+    output = args.output or os.path.join(BENCH_DIR, time.strftime('results-%Y%m%d-%H%M%S.json'))
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,59 +1,365 @@
 
 
-import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
-import math
+import itertools
 import re
+import sqlite3
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from tkinter import font as tkfont
+from physics_engine import PhysicsEngine, CONSTANT_DESCRIPTIONS, UNIT_DESCRIPTIONS, format_scientific
+from physics_history import HistoryStore, default_history_path
+from physics_solve import solve_quantity
+from physics_stats import PROFILER
+from physics_uncertainty import Uncertain
+from physics_units import DimensionError, Quantity
+from physics_worksheet import Worksheet, parse_assignment
+
+# One named Tk font per role, shared by every widget that uses it
+FONT_SPECS = {
+    'title': ('Arial', 18, 'bold'),
+    'subtitle': ('Arial', 11, 'normal'),
+    'heading': ('Arial', 11, 'bold'),
+    'display': ('Courier New', 24, 'bold'),
+    'input': ('Courier New', 12, 'normal'),
+    'mono': ('Courier New', 9, 'normal'),
+    'control': ('Arial', 9, 'normal'),
+    'small': ('Arial', 8, 'normal'),
+    'key_large': ('Arial', 16, 'bold'),
+    'key': ('Arial', 12, 'bold'),
+    'key_small': ('Arial', 10, 'bold'),
+}
+
+# Constant and unit rows built per idle slice while the panels fill in
+PANEL_ROWS_PER_IDLE = 4
+
+# Backspace and Escape inside buffered input edit as their keys do
+EDIT_KEYS = re.compile('([\x08\x1b])')
+LEADING_ZEROS = re.compile(r'^0+(?=\d)')
+
+
+class PreviewWorker:
+    """Evaluates the latest input on a background thread for the live result preview
+
+    Requests are debounced on the Tk side; only the newest one is evaluated and
+    stale results are dropped.  If an evaluation is still running after
+    stall_timeout seconds (e.g. a huge integer power), a fresh thread takes over
+    new requests and the stuck one exits once it finishes.
+    """
+
+    def __init__(self, root, callback, delay=150, stall_timeout=1.0):
+        self.root = root
+        self.callback = callback
+        self.delay = delay
+        self.stall_timeout = stall_timeout
+        self.generation = 0
+        self.pending = None
+        self.timer = None
+        self.busy_since = None
+        self.condition = threading.Condition()
+        self.thread = None
+        self.start_thread()
+
+    def start_thread(self):
+        self.thread = threading.Thread(target=self.work, name="preview", daemon=True)
+        self.thread.start()
+
+    def request(self, text, scientific_mode=True, variables=None, check_dimensions=True):
+        """Ask for a preview of text (with a snapshot of variables); called on the Tk main thread"""
+        self.generation += 1
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+        self.timer = self.root.after(self.delay, self.submit, self.generation, text,
+                                     (scientific_mode, check_dimensions), variables)
+
+    def cancel(self):
+        """Drop any queued or running preview"""
+        self.generation += 1
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+
+    def submit(self, generation, text, modes, variables):
+        self.timer = None
+        with self.condition:
+            busy_since = self.busy_since
+            if busy_since is not None and time.monotonic() - busy_since > self.stall_timeout:
+                self.busy_since = None
+                self.start_thread()
+            self.pending = (generation, text, modes, variables)
+            self.condition.notify_all()
+
+    def work(self):
+        # Each thread has its own engine: the compile cache is not shared across threads
+        engine = PhysicsEngine()
+        me = threading.current_thread()
+        while True:
+            with self.condition:
+                while self.pending is None and self.thread is me:
+                    self.condition.wait()
+                if self.thread is not me:
+                    return
+                generation, text, (scientific_mode, check_dimensions), variables = self.pending
+                self.pending = None
+                if generation != self.generation:
+                    continue
+                self.busy_since = time.monotonic()
+
+            try:
+                engine.scientific_mode = scientific_mode
+                if engine.check_dimensions != check_dimensions:
+                    # Dimensions are worked out when a program is compiled
+                    engine.check_dimensions = check_dimensions
+                    engine.invalidate_namespace()
+                # An assignment previews the value being assigned
+                assignment = parse_assignment(text)
+                expression = assignment[1] if assignment is not None else text
+                preview = engine.format_scientific(engine.evaluate(expression, variables))
+            except Exception:
+                # Incomplete input has no preview
+                preview = None
+
+            with self.condition:
+                if self.thread is me:
+                    self.busy_since = None
+            if generation == self.generation and preview is not None:
+                self.root.after(0, self.deliver, generation, text, preview)
+
+    def deliver(self, generation, text, preview):
+        if generation == self.generation:
+            self.callback(text, preview)
+
+
+class WorksheetView:
+    """Window listing the worksheet's names, expressions and values
+
+    Rows are updated only for the names a change recomputed.
+    """
+
+    def __init__(self, root, worksheet, fonts):
+        self.worksheet = worksheet
+        self.window = tk.Toplevel(root)
+        self.window.title("Worksheet")
+        self.window.configure(bg='#2b2b2b')
+
+        self.tree = ttk.Treeview(self.window, columns=('expression', 'value'), height=16)
+        self.tree.heading('#0', text="Name")
+        self.tree.heading('expression', text="Expression")
+        self.tree.heading('value', text="Value")
+        self.tree.column('#0', width=100)
+        self.tree.column('expression', width=280)
+        self.tree.column('value', width=220)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+
+        self.entry_var = tk.StringVar()
+        entry = tk.Entry(self.window, textvariable=self.entry_var, font=fonts['input'])
+        entry.pack(fill=tk.X, padx=5)
+        entry.bind('<Return>', self.assign)
+        self.status_var = tk.StringVar(value="Enter name = expression, e.g. μ = mₑ*mₚ/(mₑ + mₚ)")
+        tk.Label(self.window, textvariable=self.status_var, bg='#2b2b2b', fg='#cccccc',
+                 font=fonts['small'], anchor='w').pack(fill=tk.X, padx=5)
+
+        buttons = tk.Frame(self.window, bg='#2b2b2b')
+        buttons.pack(fill=tk.X, padx=5, pady=5)
+        for text, command in (("Set", self.assign), ("Remove", self.remove),
+                              ("Open...", self.open), ("Save...", self.save)):
+            tk.Button(buttons, text=text, command=command, bg='#666666', fg='white',
+                      font=fonts['control']).pack(side=tk.LEFT, padx=2)
+        self.reload()
+
+    def reload(self):
+        self.tree.delete(*self.tree.get_children())
+        for cell in self.worksheet:
+            self.tree.insert('', tk.END, iid=cell.name, text=cell.name,
+                             values=(cell.text, self.worksheet.format(cell)))
+
+    def update(self, names):
+        if not self.window.winfo_exists():
+            return
+        for name in names:
+            if name not in self.worksheet:
+                continue
+            cell = self.worksheet[name]
+            values = (cell.text, self.worksheet.format(cell))
+            if self.tree.exists(name):
+                self.tree.item(name, values=values)
+            else:
+                self.tree.insert('', tk.END, iid=name, text=name, values=values)
+
+    def on_select(self, event=None):
+        selection = self.tree.selection()
+        if selection:
+            cell = self.worksheet[selection[0]]
+            self.entry_var.set(f"{cell.name} = {cell.text}")
+
+    def assign(self, event=None):
+        assignment = parse_assignment(self.entry_var.get())
+        if assignment is None:
+            self.status_var.set("Expected name = expression")
+            return
+        try:
+            updated = self.worksheet.assign(*assignment)
+        except Exception as e:
+            self.status_var.set(f"Error: {e}")
+            return
+        self.update(updated)
+        self.status_var.set(f"Recomputed {len(updated)} of {len(self.worksheet)}")
+
+    def remove(self):
+        for name in self.tree.selection():
+            if name in self.worksheet:
+                updated = self.worksheet.remove(name)
+                self.tree.delete(name)
+                self.update(updated)
+
+    def open(self):
+        path = filedialog.askopenfilename(filetypes=[("Worksheet", "*.txt"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            self.worksheet.load(path)
+        except (ValueError, OSError) as e:
+            self.status_var.set(f"Error: {e}")
+        self.reload()
+
+    def save(self):
+        path = filedialog.asksaveasfilename(defaultextension='.txt', filetypes=[("Worksheet", "*.txt")])
+        if path:
+            self.worksheet.save(path)
+
+
+class HistoryView:
+    """History panel that renders only the visible window of a HistoryStore"""
+
+    def __init__(self, parent, store, rows=15, **text_options):
+        self.store = store
+        self.rows = rows
+        self.first = 0          # index of the first visible entry
+        self.follow = True      # keep the newest entry in view
+        self.placeholder = ""   # shown while the history is empty
+        self.highlighted = None
+        self.render_pending = False
+
+        self.frame = tk.Frame(parent, bg=text_options.get('bg', '#1a1a1a'))
+        self.text = tk.Text(self.frame, height=rows, wrap=tk.NONE, **text_options)
+        self.scrollbar = tk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.tag_configure('match', background='#35a7ff', foreground='black')
+
+        font = text_options.get('font')
+        if not isinstance(font, tkfont.Font):
+            font = tkfont.Font(font=font)
+        self.line_height = font.metrics('linespace')
+        self.text.bind('<Configure>', self.on_resize)
+        self.text.bind('<MouseWheel>', lambda e: self.scroll_by(-1 if e.delta > 0 else 1))
+        self.text.bind('<Button-4>', lambda e: self.scroll_by(-1))
+        self.text.bind('<Button-5>', lambda e: self.scroll_by(1))
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def on_resize(self, event):
+        rows = max(1, event.height // max(1, self.line_height))
+        if rows != self.rows:
+            self.rows = rows
+            self.render()
+
+    def on_scroll(self, action, *args):
+        total = len(self.store)
+        if action == tk.MOVETO:
+            self.scroll_to(int(float(args[0]) * total))
+        elif action == tk.SCROLL:
+            amount = int(args[0])
+            self.scroll_by(amount * self.rows if args[1] == tk.PAGES else amount)
+
+    def scroll_by(self, amount):
+        self.scroll_to(self.first + amount)
+
+    def scroll_to(self, index):
+        last_first = max(0, len(self.store) - self.rows)
+        self.first = min(max(0, index), last_first)
+        self.follow = self.first >= last_first
+        self.render()
+
+    def show(self, index):
+        """Scroll so that entry index is visible and highlight it"""
+        self.highlighted = index
+        self.scroll_to(index - self.rows // 2)
+
+    def refresh(self):
+        """Schedule one redraw after new entries, however many arrive before idle"""
+        if not self.render_pending:
+            self.render_pending = True
+            self.text.after_idle(self._refresh)
+
+    def _refresh(self):
+        self.render_pending = False
+        if self.follow:
+            self.first = max(0, len(self.store) - self.rows)
+        self.render()
+
+    def render(self):
+        total = len(self.store)
+        self.text.delete(1.0, tk.END)
+        if total == 0:
+            self.text.insert(tk.END, self.placeholder)
+            self.scrollbar.set(0.0, 1.0)
+            return
+
+        lines = self.store.window(self.first, self.rows)
+        self.text.insert(tk.END, "\n".join(lines))
+        if self.highlighted is not None and self.first <= self.highlighted < self.first + len(lines):
+            row = self.highlighted - self.first + 1
+            self.text.tag_add('match', f"{row}.0", f"{row}.end")
+        self.scrollbar.set(self.first / total, (self.first + len(lines)) / total)
 
 class PhysicsCalculatorGUI:
     def __init__(self):
+        self.started = time.perf_counter()
+        self.startup_times = {}
+
         self.root = tk.Tk()
         self.root.title("Physics Calculator with Powers")
         self.root.geometry("1200x800")
         self.root.configure(bg='#2b2b2b')
+        self.fonts = self.create_fonts()
+
+        # Evaluation engine (compiled expression cache; the constants and
+        # units registry is read on first use)
+        self.engine = PhysicsEngine()
+        # Named quantities (name = expression), usable in any expression
+        self.worksheet = Worksheet(self.engine)
+        self.worksheet_view = None
+
+        self._current_input = ""
+        # Keys, pastes and injected text waiting for the next idle, applied as one edit
+        self.pending_input = []
+        self.display_pending = False
+        self.scientific_mode = True
 
-        # Physics constants
-        self.constants = {
-            'h': 6.63e-34,       # Planck constant (J·s)
-            'ℏ': 1.054571817e-34,      # Reduced Planck constant (J·s)
-            'c': 300000000,            # Speed of light (m/s)
-            'e': 1.602176634e-19,      # Elementary charge (C)
-            'mₑ': 9.1e-31,    # Electron mass (kg)
-            'mₚ': 1.67e-27,   # Proton mass (kg)
-            'mₙ': 1.675e-27,    # Neutron mass (kg)
-            'u': 1.66e-27,    # Atomic mass unit (kg)
-            'α': 0.007297352566,       # Fine structure constant
-            'ε₀': 8.854187817e-12,     # Permittivity of free space (F/m)
-            'μ₀': 1.25663706e-6,       # Permeability of free space (H/m)
-            'G': 6.67430e-11,          # Gravitational constant (m³/(kg·s²))
-            'kB': 1.380649e-23,        # Boltzmann constant (J/K)
-            'NA': 6.02214076e23,       # Avogadro constant (mol⁻¹)
-            'R∞': 1.097e7,             # Rydberg constant (m⁻¹)
-            'π': math.pi,              # Pi
-            'euler': math.e            # Euler's number
-        }
+        # Calculation history (on-disk log with an in-memory ring buffer)
+        try:
+            self.history = HistoryStore(default_history_path())
+        except sqlite3.Error:
+            self.history = HistoryStore()
+        self.history_flush_pending = False
+        self.search_text = ""
+        self.search_before = None
 
-        # Unit conversions
-        self.units = {
-            'eV': 1.602176634e-19,     # Electron volt to Joules
-            'keV': 1.602176634e-16,    # Kilo eV to Joules
-            'MeV': 1.602176634e-13,    # Mega eV to Joules
-            'nm': 1e-9,                # Nanometer to meters
-            'pm': 1e-12,               # Picometer to meters
-            'fm': 1e-15,               # Femtometer to meters
-            'Å': 1e-10,                # Angstrom to meters
-            'MHz': 1e6,                # Megahertz to Hertz
-            'GHz': 1e9,                # Gigahertz to Hertz
-            'THz': 1e12                # Terahertz to Hertz
-        }
+        self.setup_gui()
 
-        self.current_input = ""
-        self.scientific_mode = True
-        self.history = []
+        # Live result preview, evaluated off the Tk main loop
+        self.preview = PreviewWorker(self.root, self.show_preview)
 
-        self.setup_gui()
+        # Tk draws the window on idle; the constants and units rows follow after that
+        self.root.after_idle(self.on_first_paint)
 
     def setup_gui(self):
+        self.create_menu()
+
         # Create main frames
         top_frame = tk.Frame(self.root, bg='#2b2b2b')
         top_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -63,11 +369,11 @@ class PhysicsCalculatorGUI:
 
         # Title
         title_label = tk.Label(top_frame, text="Physics Calculator for modern physics by yuga jain", 
-                              font=('Arial', 18, 'bold'), bg='#2b2b2b', fg='#00ff88')
+                              font=self.fonts['title'], bg='#2b2b2b', fg='#00ff88')
         title_label.pack()
 
         subtitle_label = tk.Label(top_frame, text="Numbers with many zeros auto-format as powers of 10", 
-                                 font=('Arial', 11), bg='#2b2b2b', fg='#cccccc')
+                                 font=self.fonts['subtitle'], bg='#2b2b2b', fg='#cccccc')
         subtitle_label.pack()
 
         # Display frame
@@ -77,14 +383,14 @@ class PhysicsCalculatorGUI:
         # Main display
         self.display_var = tk.StringVar(value="0")
         self.display = tk.Label(display_frame, textvariable=self.display_var, 
-                               font=('Courier New', 24, 'bold'), bg='#000000', fg='#00ff88',
+                               font=self.fonts['display'], bg='#000000', fg='#00ff88',
                                height=2, anchor='e', relief=tk.SUNKEN, bd=1)
         self.display.pack(fill=tk.X, padx=5, pady=5)
 
         # Input display (shows what user is typing)
         self.input_var = tk.StringVar(value="")
         self.input_display = tk.Label(display_frame, textvariable=self.input_var,
-                                     font=('Courier New', 12), bg='#1a1a1a', fg='#888888',
+                                     font=self.fonts['input'], bg='#1a1a1a', fg='#888888',
                                      height=1, anchor='e')
         self.input_display.pack(fill=tk.X, padx=5)
 
@@ -94,11 +400,11 @@ class PhysicsCalculatorGUI:
 
         # Control buttons
         tk.Button(controls_frame, text="Scientific Notation", command=self.toggle_mode,
-                 bg='#666666', fg='white', font=('Arial', 9)).pack(side=tk.LEFT, padx=2)
+                 bg='#666666', fg='white', font=self.fonts['control']).pack(side=tk.LEFT, padx=2)
         tk.Button(controls_frame, text="Clear History", command=self.clear_history,
-                 bg='#666666', fg='white', font=('Arial', 9)).pack(side=tk.LEFT, padx=2)
+                 bg='#666666', fg='white', font=self.fonts['control']).pack(side=tk.LEFT, padx=2)
         tk.Button(controls_frame, text="Copy Result", command=self.copy_result,
-                 bg='#666666', fg='white', font=('Arial', 9)).pack(side=tk.LEFT, padx=2)
+                 bg='#666666', fg='white', font=self.fonts['control']).pack(side=tk.LEFT, padx=2)
 
         # Main content frame
         content_frame = tk.Frame(middle_frame, bg='#2b2b2b')
@@ -106,10 +412,10 @@ class PhysicsCalculatorGUI:
 
         # Left side - Constants
         constants_frame = tk.LabelFrame(content_frame, text="Physics Constants (Click to Insert)", 
-                                      bg='#3a3a3a', fg='#ff35a7', font=('Arial', 11, 'bold'))
+                                      bg='#3a3a3a', fg='#ff35a7', font=self.fonts['heading'])
         constants_frame.pack(side=tk.LEFT, fill=tk.Y, padx=5)
 
-        self.create_constants_buttons(constants_frame)
+        constants_rows = self.create_constants_panel(constants_frame)
 
         # Center - Calculator
         calc_frame = tk.Frame(content_frame, bg='#2b2b2b')
@@ -123,22 +429,245 @@ class PhysicsCalculatorGUI:
 
         # History
         history_frame = tk.LabelFrame(right_frame, text="Calculation History", 
-                                    bg='#3a3a3a', fg='#35a7ff', font=('Arial', 11, 'bold'))
+                                    bg='#3a3a3a', fg='#35a7ff', font=self.fonts['heading'])
         history_frame.pack(fill=tk.BOTH, expand=True, pady=(0,5))
 
-        self.history_text = scrolledtext.ScrolledText(history_frame, width=30, height=15,
-                                                     bg='#1a1a1a', fg='#cccccc',
-                                                     font=('Courier New', 9))
-        self.history_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        search_frame = tk.Frame(history_frame, bg='#3a3a3a')
+        search_frame.pack(fill=tk.X, padx=5, pady=(5,0))
+        self.search_var = tk.StringVar(value="")
+        search_entry = tk.Entry(search_frame, textvariable=self.search_var,
+                                bg='#1a1a1a', fg='#cccccc', insertbackground='#cccccc',
+                                font=self.fonts['mono'])
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        search_entry.bind('<Return>', lambda e: self.search_history())
+        tk.Button(search_frame, text="Find", command=self.search_history,
+                 bg='#666666', fg='white', font=self.fonts['small']).pack(side=tk.LEFT, padx=(2,0))
+
+        self.history_view = HistoryView(history_frame, self.history, rows=15, width=30,
+                                        bg='#1a1a1a', fg='#cccccc',
+                                        font=self.fonts['mono'])
+        self.history_view.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
         # Units
         units_frame = tk.LabelFrame(right_frame, text="Unit Conversions", 
-                                  bg='#3a3a3a', fg='#35ffa7', font=('Arial', 11, 'bold'))
+                                  bg='#3a3a3a', fg='#35ffa7', font=self.fonts['heading'])
         units_frame.pack(fill=tk.X)
 
-        self.create_units_buttons(units_frame)
+        # The panel rows are built after the first paint (see on_first_paint)
+        self.panel_rows = itertools.chain(self.create_constants_buttons(constants_rows),
+                                          self.create_units_buttons(units_frame))
+
+    def create_menu(self):
+        menubar = tk.Menu(self.root)
+        edit_menu = tk.Menu(menubar, tearoff=0)
+        edit_menu.add_command(label="Paste", accelerator="Ctrl+V", command=self.paste)
+        menubar.add_cascade(label="Edit", menu=edit_menu)
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        self.profiling_var = tk.BooleanVar(value=PROFILER.enabled)
+        tools_menu.add_checkbutton(label="Profiling", variable=self.profiling_var,
+                                   command=self.toggle_profiling)
+        self.check_units_var = tk.BooleanVar(value=self.engine.check_dimensions)
+        tools_menu.add_checkbutton(label="Check Units", variable=self.check_units_var,
+                                   command=self.toggle_check_units)
+        tools_menu.add_command(label="Solve for Unknown...", command=self.show_solver)
+        tools_menu.add_command(label="Worksheet...", command=self.show_worksheet)
+        tools_menu.add_separator()
+        tools_menu.add_command(label="Timing Stats...", command=self.show_stats)
+        tools_menu.add_command(label="Export Stats as JSON...", command=self.export_stats)
+        menubar.add_cascade(label="Tools", menu=tools_menu)
+        self.root.config(menu=menubar)
+
+    def toggle_profiling(self):
+        PROFILER.enabled = bool(self.profiling_var.get())
+
+    def toggle_check_units(self):
+        """Turn dimension checks on or off; off, exp(-E/(kB*300)) takes 300 as a plain number"""
+        self.engine.check_dimensions = bool(self.check_units_var.get())
+        # Dimensions are worked out when a program is compiled
+        self.engine.invalidate_namespace()
+        updated = self.worksheet.recompute()
+        if self.worksheet_view is not None:
+            self.worksheet_view.update(updated)
+        self.update_display()
 
-    def create_constants_buttons(self, parent):
+    def stats_text(self):
+        cache = self.engine.cache_stats()
+        text = (PROFILER.report() + "\n\n"
+                f"Compile cache: {cache['hits']} hits, {cache['misses']} misses, "
+                f"{cache['size']}/{cache['maxsize']} entries\n")
+        memo = self.engine.memo_stats()
+        if memo is not None:
+            text += (f"Function memo: {memo['hits']} hits, {memo['misses']} misses "
+                     f"({memo['hit_rate']:.0%}), {memo['size']}/{memo['maxsize']} entries\n")
+        return text + f"History: {len(self.history)} entries"
+
+    def show_stats(self):
+        window = tk.Toplevel(self.root)
+        window.title("Timing Stats")
+        window.configure(bg='#2b2b2b')
+        text = tk.Text(window, width=62, height=14, bg='#1a1a1a', fg='#cccccc',
+                       font=self.fonts['mono'])
+        text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        def refresh():
+            text.delete(1.0, tk.END)
+            text.insert(tk.END, self.stats_text())
+
+        def reset():
+            PROFILER.reset()
+            refresh()
+
+        buttons = tk.Frame(window, bg='#2b2b2b')
+        buttons.pack(fill=tk.X, padx=5, pady=(0,5))
+        tk.Button(buttons, text="Refresh", command=refresh,
+                 bg='#666666', fg='white', font=self.fonts['control']).pack(side=tk.LEFT, padx=2)
+        tk.Button(buttons, text="Reset", command=reset,
+                 bg='#666666', fg='white', font=self.fonts['control']).pack(side=tk.LEFT, padx=2)
+        refresh()
+
+    def show_solver(self):
+        """Dialog that solves an expression (or equation) for its one unknown"""
+        window = tk.Toplevel(self.root)
+        window.title("Solve for Unknown")
+        window.configure(bg='#2b2b2b')
+        fields = {}
+        for row, (label, initial) in enumerate((("Expression", self.current_input),
+                                                ("Target", ""), ("Unknown", ""))):
+            tk.Label(window, text=label, bg='#2b2b2b', fg='white',
+                    font=self.fonts['control']).grid(row=row, column=0, sticky='w', padx=5, pady=2)
+            fields[label] = tk.StringVar(value=initial)
+            tk.Entry(window, textvariable=fields[label], width=36,
+                    font=self.fonts['input']).grid(row=row, column=1, padx=5, pady=2)
+        tk.Label(window, text="e.g. h*c/λ with target 2.5*eV, or h*c/λ = 2.5*eV",
+                bg='#2b2b2b', fg='#cccccc', font=self.fonts['small']).grid(row=3, column=0, columnspan=2)
+        result_var = tk.StringVar()
+        tk.Label(window, textvariable=result_var, bg='#2b2b2b', fg='#00ff00',
+                font=self.fonts['input']).grid(row=4, column=0, columnspan=2, padx=5, pady=5)
+
+        def solve(event=None):
+            expression = fields["Expression"].get().strip()
+            target = fields["Target"].get().strip()
+            if not expression:
+                return
+            try:
+                root = solve_quantity(self.engine, expression, target or None,
+                                      fields["Unknown"].get().strip() or None)
+            except Exception as e:
+                result_var.set(f"Error: {str(e)}")
+                return
+            unit = ""
+            if isinstance(root, Quantity):
+                root, unit = root.value, root.unit
+            self.last_result = root
+            formatted_result = self.format_scientific(root)
+            if unit:
+                formatted_result = f"{formatted_result} {unit}"
+            result_var.set(formatted_result)
+            equation = f"{expression} = {target}" if target else expression
+            self.add_history(f"solve {equation}", formatted_result)
+
+        tk.Button(window, text="Solve", command=solve,
+                 bg='#666666', fg='white', font=self.fonts['control']).grid(row=5, column=1, sticky='e',
+                                                                          padx=5, pady=(0,5))
+        window.bind('<Return>', solve)
+
+    def assign_variable(self, name, expression):
+        """Set a worksheet name from 'name = expression' input; returns its formatted value"""
+        updated = self.worksheet.assign(name, expression)
+        cell = self.worksheet[name]
+        if cell.error is None:
+            self.last_result = cell.value
+        if self.worksheet_view is not None:
+            self.worksheet_view.update(updated)
+        return self.worksheet.format(cell)
+
+    def paste(self, event=None):
+        """Paste the clipboard: one line into the input, several as a batch to evaluate"""
+        if event is not None and isinstance(event.widget, tk.Entry):
+            # Entries paste into themselves
+            return
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            return "break"
+        lines = [line for line in text.splitlines() if line.strip()]
+        if len(lines) > 1:
+            self.evaluate_batch(lines)
+        elif lines:
+            self.inject(lines[0].strip())
+        return "break"
+
+    def evaluate_batch(self, lines):
+        """Evaluate lines of expressions or 'name = expression' assignments in order, in one pass
+
+        Each line gets its own history entry; the history and the display are
+        redrawn once, for the whole batch.  Blank lines and # comments are skipped.
+        """
+        self.flush_display()
+        self.preview.cancel()
+        count = failed = 0
+        formatted_result = None
+        for line in lines:
+            text = line.strip()
+            if not text or text.startswith('#'):
+                continue
+            count += 1
+            try:
+                assignment = parse_assignment(text)
+                if assignment is not None:
+                    text = f"{assignment[0]} = {assignment[1]}"
+                    formatted_result = history_result = self.assign_variable(*assignment)
+                else:
+                    result, formatted_result, history_result = self.evaluate_expression(text)
+                    self.last_result = result
+            except Exception as e:
+                formatted_result = history_result = f"Error: {str(e)}"
+                failed += 1
+            self.add_history(text, history_result)
+        if formatted_result is None:
+            return
+
+        self.display_var.set(formatted_result)
+        self.current_input = ""
+        self.input_var.set("0")
+        if failed:
+            messagebox.showerror("Paste", f"{failed} of {count} pasted lines failed; see the history")
+
+    def show_worksheet(self):
+        if self.worksheet_view is not None and self.worksheet_view.window.winfo_exists():
+            self.worksheet_view.window.lift()
+            return
+        self.worksheet_view = WorksheetView(self.root, self.worksheet, self.fonts)
+
+    def export_stats(self):
+        path = filedialog.asksaveasfilename(defaultextension='.json',
+                                            filetypes=[("JSON", "*.json")])
+        if path:
+            PROFILER.export(path)
+
+    def create_fonts(self):
+        return {role: tkfont.Font(self.root, family=family, size=size, weight=weight)
+                for role, (family, size, weight) in FONT_SPECS.items()}
+
+    def on_first_paint(self):
+        self.record_startup('first_paint')
+        self.root.after_idle(self.fill_panels)
+
+    def fill_panels(self):
+        """Build a few constant and unit rows, then yield to Tk until the next idle"""
+        for _ in range(PANEL_ROWS_PER_IDLE):
+            if next(self.panel_rows, None) is None:
+                self.record_startup('panels')
+                return
+        self.root.after_idle(self.fill_panels)
+
+    def record_startup(self, stage):
+        """Record the time since the calculator was created (shown in Timing Stats)"""
+        elapsed = time.perf_counter() - self.started
+        self.startup_times[stage] = elapsed * 1e3
+        PROFILER.record(stage, int(elapsed * 1e9))
+
+    def create_constants_panel(self, parent):
         # Create scrollable frame for constants
         canvas = tk.Canvas(parent, bg='#3a3a3a', width=200)
         scrollbar = ttk.Scrollbar(parent, orient="vertical", command=canvas.yview)
@@ -151,53 +680,33 @@ class PhysicsCalculatorGUI:
 
         canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
         canvas.configure(yscrollcommand=scrollbar.set)
+        scrollable_frame.grid_columnconfigure(0, weight=1)
 
-        # Constants buttons with descriptions
-        constant_descriptions = {
-            'h': 'Planck constant',
-            'ℏ': 'Reduced Planck',
-            'c': 'Speed of light',
-            'e': 'Elementary charge',
-            'mₑ': 'Electron mass',
-            'mₚ': 'Proton mass',
-            'mₙ': 'Neutron mass',
-            'u': 'Atomic mass unit',
-            'α': 'Fine structure',
-            'ε₀': 'Permittivity',
-            'μ₀': 'Permeability',
-            'G': 'Gravitational',
-            'kB': 'Boltzmann',
-            'NA': 'Avogadro',
-            'R∞': 'Rydberg',
-            'π': 'Pi',
-            'euler': 'Euler\'s number'
-        }
+        canvas.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        return scrollable_frame
 
-        row = 0
-        for symbol, value in self.constants.items():
+    def create_constants_buttons(self, parent):
+        """Build the constant rows one at a time (a generator driven by fill_panels)"""
+        for row, (symbol, value) in enumerate(self.engine.constants.items()):
             scientific_val = self.format_scientific(value)
-            desc = constant_descriptions.get(symbol, symbol)
+            desc = CONSTANT_DESCRIPTIONS.get(symbol, symbol)
 
             # Create button frame
-            btn_frame = tk.Frame(scrollable_frame, bg='#3a3a3a')
+            btn_frame = tk.Frame(parent, bg='#3a3a3a')
             btn_frame.grid(row=row, column=0, sticky='ew', padx=2, pady=1)
-            scrollable_frame.grid_columnconfigure(0, weight=1)
 
             btn = tk.Button(btn_frame, text=symbol, 
                            command=lambda s=symbol: self.add_constant(s),
-                           bg='#ff35a7', fg='white', font=('Arial', 12, 'bold'),
+                           bg='#ff35a7', fg='white', font=self.fonts['key'],
                            width=4)
             btn.pack(side=tk.LEFT, padx=(0,5))
 
             desc_label = tk.Label(btn_frame, text=f"{desc}\n{scientific_val}",
-                                 bg='#3a3a3a', fg='#cccccc', font=('Arial', 8),
+                                 bg='#3a3a3a', fg='#cccccc', font=self.fonts['small'],
                                  justify=tk.LEFT)
             desc_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
-
-            row += 1
-
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+            yield
 
     def create_calculator_buttons(self, parent):
         # Calculator buttons frame
@@ -206,7 +715,7 @@ class PhysicsCalculatorGUI:
 
         # Power functions section
         power_frame = tk.LabelFrame(calc_buttons_frame, text="Power & Scientific Functions",
-                                  bg='#3a3a3a', fg='#a735ff', font=('Arial', 11, 'bold'))
+                                  bg='#3a3a3a', fg='#a735ff', font=self.fonts['heading'])
         power_frame.pack(fill=tk.X, pady=5)
 
         power_buttons_data = [
@@ -226,7 +735,7 @@ class PhysicsCalculatorGUI:
 
         for i, (text, tooltip, command) in enumerate(power_buttons_data):
             btn = tk.Button(power_frame, text=text, command=command,
-                           bg='#a735ff', fg='white', font=('Arial', 10, 'bold'),
+                           bg='#a735ff', fg='white', font=self.fonts['key_small'],
                            width=7, height=2)
             btn.grid(row=i//6, column=i%6, padx=2, pady=2)
             self.create_tooltip(btn, tooltip)
@@ -244,115 +753,57 @@ class PhysicsCalculatorGUI:
             ['±', '0', '.', '=', 'EXP', 'ANS']
         ]
 
+        # Keys other than digits and '.': command, colour and font
+        special_keys = {
+            '=': (self.calculate, '#ff6b35', 'key_large'),
+            'C': (lambda: self.clear_function('C'), '#ff6b35', 'key'),
+            'CE': (lambda: self.clear_function('CE'), '#ff6b35', 'key'),
+            '←': (lambda: self.clear_function('←'), '#ff6b35', 'key'),
+            '±': (self.toggle_sign, '#35a7ff', 'key'),
+            'π': (lambda: self.add_constant('π'), '#ff35a7', 'key'),
+            'e': (lambda: self.add_constant('euler'), '#ff35a7', 'key'),
+            'x²': (lambda: self.add_power_function('**2'), '#a735ff', 'key'),
+            '√': (lambda: self.add_function('sqrt('), '#a735ff', 'key'),
+            '^': (lambda: self.add_to_input('^'), '#a735ff', 'key_large'),
+            'ln': (lambda: self.add_function('ln('), '#a735ff', 'key'),
+            'EXP': (lambda: self.add_to_input('e'), '#666666', 'key_small'),
+            'ANS': (self.add_last_result, '#666666', 'key_small'),
+        }
+        for operator in ['+', '-', '*', '/', '(', ')']:
+            special_keys[operator] = (lambda t=operator: self.add_to_input(t), '#35a7ff', 'key_large')
+
         for row, button_row in enumerate(buttons):
             for col, button_text in enumerate(button_row):
-                if button_text == '=':
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=self.calculate,
-                                   bg='#ff6b35', fg='white', font=('Arial', 16, 'bold'),
-                                   width=5, height=2)
-                elif button_text in ['C', 'CE', '←']:
-                    cmd = lambda t=button_text: self.clear_function(t)
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=cmd,
-                                   bg='#ff6b35', fg='white', font=('Arial', 12, 'bold'),
-                                   width=5, height=2)
-                elif button_text in ['+', '-', '*', '/', '(', ')']:
-                    cmd = lambda t=button_text: self.add_to_input(t)
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=cmd,
-                                   bg='#35a7ff', fg='white', font=('Arial', 16, 'bold'),
-                                   width=5, height=2)
-                elif button_text == '±':
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=self.toggle_sign,
-                                   bg='#35a7ff', fg='white', font=('Arial', 12, 'bold'),
-                                   width=5, height=2)
-                elif button_text == 'π':
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=lambda: self.add_constant('π'),
-                                   bg='#ff35a7', fg='white', font=('Arial', 12, 'bold'),
-                                   width=5, height=2)
-                elif button_text == 'e':
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=lambda: self.add_constant('euler'),
-                                   bg='#ff35a7', fg='white', font=('Arial', 12, 'bold'),
-                                   width=5, height=2)
-                elif button_text == 'x²':
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=lambda: self.add_power_function('**2'),
-                                   bg='#a735ff', fg='white', font=('Arial', 12, 'bold'),
-                                   width=5, height=2)
-                elif button_text == '√':
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=lambda: self.add_function('sqrt('),
-                                   bg='#a735ff', fg='white', font=('Arial', 12, 'bold'),
-                                   width=5, height=2)
-                elif button_text == '^':
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=lambda: self.add_to_input('^'),
-                                   bg='#a735ff', fg='white', font=('Arial', 16, 'bold'),
-                                   width=5, height=2)
-                elif button_text == 'ln':
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=lambda: self.add_function('ln('),
-                                   bg='#a735ff', fg='white', font=('Arial', 12, 'bold'),
-                                   width=5, height=2)
-                elif button_text == 'EXP':
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=lambda: self.add_to_input('e'),
-                                   bg='#666666', fg='white', font=('Arial', 10, 'bold'),
-                                   width=5, height=2)
-                elif button_text == 'ANS':
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=self.add_last_result,
-                                   bg='#666666', fg='white', font=('Arial', 10, 'bold'),
-                                   width=5, height=2)
+                if button_text in special_keys:
+                    cmd, color, font = special_keys[button_text]
                 else:
-                    cmd = lambda t=button_text: self.add_to_input(t)
-                    btn = tk.Button(std_frame, text=button_text,
-                                   command=cmd,
-                                   bg='#4a4a4a', fg='white', font=('Arial', 16, 'bold'),
-                                   width=5, height=2)
-
+                    cmd, color, font = (lambda t=button_text: self.add_to_input(t)), '#4a4a4a', 'key_large'
+                btn = tk.Button(std_frame, text=button_text, command=cmd,
+                               bg=color, fg='white', font=self.fonts[font],
+                               width=5, height=2)
                 btn.grid(row=row, column=col, padx=2, pady=2)
 
     def create_units_buttons(self, parent):
-        # Unit descriptions
-        unit_descriptions = {
-            'eV': 'Electron volt',
-            'keV': 'Kilo eV', 
-            'MeV': 'Mega eV',
-            'nm': 'Nanometer',
-            'pm': 'Picometer',
-            'fm': 'Femtometer',
-            'Å': 'Angstrom',
-            'MHz': 'Megahertz',
-            'GHz': 'Gigahertz',
-            'THz': 'Terahertz'
-        }
-
-        row = 0
-        for symbol, value in self.units.items():
+        """Build the unit rows one at a time (a generator driven by fill_panels)"""
+        parent.grid_columnconfigure(0, weight=1)
+        for row, (symbol, value) in enumerate(self.engine.units.items()):
             scientific_val = self.format_scientific(value)
-            desc = unit_descriptions.get(symbol, symbol)
+            desc = UNIT_DESCRIPTIONS.get(symbol, symbol)
 
             btn_frame = tk.Frame(parent, bg='#3a3a3a')
             btn_frame.grid(row=row, column=0, sticky='ew', padx=2, pady=1)
-            parent.grid_columnconfigure(0, weight=1)
 
             btn = tk.Button(btn_frame, text=symbol, 
                            command=lambda s=symbol: self.add_unit(s),
-                           bg='#35ffa7', fg='black', font=('Arial', 10, 'bold'),
+                           bg='#35ffa7', fg='black', font=self.fonts['key_small'],
                            width=6)
             btn.pack(side=tk.LEFT, padx=(0,5))
 
             desc_label = tk.Label(btn_frame, text=f"{desc}\n{scientific_val}",
-                                 bg='#3a3a3a', fg='#cccccc', font=('Arial', 8),
+                                 bg='#3a3a3a', fg='#cccccc', font=self.fonts['small'],
                                  justify=tk.LEFT)
             desc_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
-
-            row += 1
+            yield
 
     def create_tooltip(self, widget, text):
         def show_tooltip(event):
@@ -360,7 +811,7 @@ class PhysicsCalculatorGUI:
             tooltip.wm_overrideredirect(True)
             tooltip.wm_geometry(f"+{event.x_root+10}+{event.y_root+10}")
             label = tk.Label(tooltip, text=text, background='#ffffe0', 
-                           relief='solid', borderwidth=1, font=('Arial', 9))
+                           relief='solid', borderwidth=1, font=self.fonts['control'])
             label.pack()
             widget.tooltip = tooltip
 
@@ -374,75 +825,93 @@ class PhysicsCalculatorGUI:
 
     def format_scientific(self, number):
         """Convert number to scientific notation format with × symbol"""
-        if number == 0:
-            return "0"
-
-        if not self.scientific_mode:
-            return str(number)
+        if not PROFILER.enabled:
+            return format_scientific(number, self.scientific_mode)
+        start = PROFILER.start()
+        formatted = format_scientific(number, self.scientific_mode)
+        PROFILER.stop('format', start)
+        return formatted
+
+    @property
+    def current_input(self):
+        # Buffered input is applied before anything reads the input, so edits keep their order
+        if self.pending_input:
+            self.apply_input()
+        return self._current_input
+
+    @current_input.setter
+    def current_input(self, text):
+        self.pending_input.clear()
+        self._current_input = text
 
-        abs_num = abs(number)
-        if abs_num >= 1000000 or (abs_num <= 0.000001 and abs_num != 0):
-            exp = int(math.floor(math.log10(abs_num)))
-            mantissa = number / (10 ** exp)
-
-            if abs(mantissa - round(mantissa, 3)) < 1e-10:
-                mantissa = round(mantissa, 3)
-            else:
-                mantissa = round(mantissa, 6)
+    def add_to_input(self, value):
+        self.inject(str(value))
 
-            return f"{mantissa}×10^{exp}"
-        else:
-            if abs(number - round(number)) < 1e-10:
-                return str(int(round(number)))
-            else:
-                return f"{number:.8g}"
+    def inject(self, text):
+        """Add text to the input as typed keys, a paste or a script would
 
-    def add_to_input(self, value):
-        if self.current_input == "0" and value.isdigit():
-            self.current_input = value
-        elif self.current_input == "" and value.isdigit():
-            self.current_input = value
-        else:
-            self.current_input += str(value)
+        Text arriving before the next idle is applied as one edit, with one
+        display update.  Backspace and Escape characters edit as their keys do.
+        """
+        self.pending_input.append(text)
         self.update_display()
 
-    def add_constant(self, symbol):
-        value = self.constants[symbol]
+    def apply_input(self):
+        text = "".join(self.pending_input)
+        self.pending_input.clear()
+        current = self._current_input
+        for piece in EDIT_KEYS.split(text):
+            if piece == '\x08':
+                current = current[:-1]
+            elif piece == '\x1b':
+                current = ""
+            elif piece:
+                # A number typed over an empty input or a lone 0 replaces it,
+                # as it would typed one key at a time
+                if current in ("", "0") and piece[0].isdigit():
+                    current = LEADING_ZEROS.sub('', piece)
+                else:
+                    current += piece
+        self._current_input = current
+
+    def ends_with_operand(self):
+        """True if the input ends with a number, symbol name or closing bracket"""
+        if not self.current_input:
+            return False
+        last = self.current_input[-1]
+        return last.isalnum() or last in ')_∞'
+
+    def add_symbol(self, symbol):
+        # Symbols are inserted by name; the parser folds their values at compile time
         if self.current_input == "0" or self.current_input == "":
-            self.current_input = str(value)
+            self.current_input = symbol
         else:
-            # If last character is a number or ), add multiplication
-            if self.current_input[-1].isdigit() or self.current_input[-1] == ')':
-                self.current_input += '*' + str(value)
+            # If input ends with a number, symbol or ), add multiplication
+            if self.ends_with_operand():
+                self.current_input += '*' + symbol
             else:
-                self.current_input += str(value)
+                self.current_input += symbol
         self.update_display()
 
+    def add_constant(self, symbol):
+        self.add_symbol(symbol)
+
     def add_unit(self, symbol):
-        value = self.units[symbol]
-        if self.current_input == "0" or self.current_input == "":
-            self.current_input = str(value)
-        else:
-            # If last character is a number or ), add multiplication
-            if self.current_input[-1].isdigit() or self.current_input[-1] == ')':
-                self.current_input += '*' + str(value)
-            else:
-                self.current_input += str(value)
-        self.update_display()
+        self.add_symbol(symbol)
 
     def add_function(self, func):
         if self.current_input == "0" or self.current_input == "":
             self.current_input = func
         else:
-            # If last character is a number or ), add multiplication before function
-            if self.current_input[-1].isdigit() or self.current_input[-1] == ')':
+            # If input ends with a number, symbol or ), add multiplication before function
+            if self.ends_with_operand():
                 self.current_input += '*' + func
             else:
                 self.current_input += func
         self.update_display()
 
     def add_power_function(self, power):
-        if self.current_input and (self.current_input[-1].isdigit() or self.current_input[-1] == ')'):
+        if self.ends_with_operand():
             self.current_input += power
         else:
             self.current_input += '(' + self.current_input + ')' + power
@@ -473,6 +942,23 @@ class PhysicsCalculatorGUI:
             pass
 
     def update_display(self):
+        """Schedule one display update, however many edits arrive before idle"""
+        if not self.display_pending:
+            self.display_pending = True
+            self.root.after_idle(self.flush_display)
+
+    def flush_display(self):
+        """Apply buffered input and bring the display up to date now, if anything changed"""
+        if not self.display_pending:
+            return
+        self.display_pending = False
+        if not PROFILER.enabled:
+            return self._update_display()
+        start = PROFILER.start()
+        self._update_display()
+        PROFILER.stop('display', start)
+
+    def _update_display(self):
         # Show current input in the input display
         self.input_var.set(self.current_input if self.current_input else "0")
 
@@ -483,65 +969,82 @@ class PhysicsCalculatorGUI:
                 val = float(self.current_input)
                 formatted = self.format_scientific(val)
                 self.display_var.set(formatted)
-            else:
-                # Show the input as-is
-                self.display_var.set(self.current_input if self.current_input else "0")
+                self.preview.cancel()
+                return
         except:
-            self.display_var.set(self.current_input if self.current_input else "0")
+            pass
+
+        # Show the input as-is until the background preview arrives
+        self.display_var.set(self.current_input if self.current_input else "0")
+        if self.current_input:
+            self.preview.request(self.current_input, self.scientific_mode, self.worksheet.values() or None,
+                                 self.engine.check_dimensions)
+        else:
+            self.preview.cancel()
+
+    def show_preview(self, text, preview):
+        # Ignore previews for input that has changed since the request
+        if text == self.current_input:
+            self.display_var.set(preview)
+
+    def evaluate_expression(self, text):
+        """Evaluate an input expression; returns (result, formatted result, history text)"""
+        # Compiled programs and their dimensions are cached by the engine
+        result = self.engine.evaluate_quantity(text, self.worksheet.variables() or None)
+        unit = ""
+        if isinstance(result, Quantity):
+            result, unit = result.value, result.unit
+
+        # Format result, with its SI unit when it has one
+        formatted_result = self.format_scientific(result)
+        if unit:
+            formatted_result = f"{formatted_result} {unit}"
+
+        # The history shows the spread of the samples for a ± result
+        history_result = formatted_result
+        if isinstance(result, Uncertain) and len(result.percentiles) > 1:
+            low, high = min(result.percentiles), max(result.percentiles)
+            history_result += (f" ({low:g}–{high:g}%: {self.format_scientific(result.percentiles[low])}"
+                               f" to {self.format_scientific(result.percentiles[high])})")
+        return result, formatted_result, history_result
 
     def calculate(self):
         try:
+            # Keys typed just before Enter are part of the input
+            self.flush_display()
             if not self.current_input:
                 return
 
-            # Prepare expression for evaluation
-            expression = self.current_input.replace('^', '**')
-
-            # Handle scientific notation input
-            expression = re.sub(r'(\d+\.?\d*)\s*×\s*10\*\*([+-]?\d+)', r'(\1 * 10**\2)', expression)
-
-            # Create safe evaluation environment
-            safe_dict = {
-                '__builtins__': {},
-                'sqrt': math.sqrt,
-                'cbrt': lambda x: x**(1/3),
-                'log10': math.log10,
-                'ln': math.log,
-                'sin': math.sin,
-                'cos': math.cos,
-                'tan': math.tan,
-                'exp': math.exp,
-                'abs': abs,
-                'pow': pow
-            }
-
-            # Add constants and units
-            safe_dict.update(self.constants)
-            safe_dict.update(self.units)
-
-            # Evaluate
-            result = eval(expression, safe_dict)
-            self.last_result = result
+            self.preview.cancel()
 
-            # Format result
-            formatted_result = self.format_scientific(result)
+            assignment = parse_assignment(self.current_input)
+            if assignment is not None:
+                name, expression = assignment
+                formatted_result = self.assign_variable(name, expression)
+                self.display_var.set(formatted_result)
+                self.add_history(f"{name} = {expression}", formatted_result)
+                self.current_input = name
+                self.input_var.set(self.current_input)
+                return
 
-            # Update display
+            result, formatted_result, history_result = self.evaluate_expression(self.current_input)
+            self.last_result = result
             self.display_var.set(formatted_result)
-
-            # Add to history
-            history_entry = f"{self.current_input} = {formatted_result}\n"
-            self.history.append(history_entry)
-            self.history_text.insert(tk.END, history_entry)
-            self.history_text.see(tk.END)
+            self.add_history(self.current_input, history_result)
 
             # Set current input to result for chaining
             self.current_input = str(result)
             self.input_var.set(self.current_input)
 
+            if PROFILER.enabled:
+                # Idle callbacks run after Tk has redrawn the changed widgets
+                self.root.after_idle(PROFILER.stop, 'redraw', PROFILER.start())
+
         except Exception as e:
             error_msg = f"Error: {str(e)}"
             self.display_var.set(error_msg)
+            if isinstance(e, DimensionError):
+                error_msg += "\n\nTools → Check Units turns dimension checks off."
             messagebox.showerror("Calculation Error", error_msg)
 
     def toggle_mode(self):
@@ -550,9 +1053,44 @@ class PhysicsCalculatorGUI:
         messagebox.showinfo("Scientific Notation", f"Scientific notation mode: {mode_text}")
         self.update_display()
 
+    def add_history(self, expression, formatted_result):
+        start = PROFILER.start()
+        self.history.append(expression, formatted_result)
+        self.history_view.refresh()
+        PROFILER.stop('history', start)
+
+        # Commit to disk shortly after a burst of calculations
+        if not self.history_flush_pending:
+            self.history_flush_pending = True
+            self.root.after(2000, self.flush_history)
+
+    def flush_history(self):
+        self.history_flush_pending = False
+        self.history.flush()
+
+    def search_history(self):
+        """Jump to the next older history entry containing the search text"""
+        text = self.search_var.get().strip()
+        if not text:
+            return
+        if text != self.search_text:
+            self.search_text = text
+            self.search_before = None
+        matches = self.history.search(text, limit=1, before=self.search_before)
+        if not matches:
+            if self.search_before is None:
+                messagebox.showinfo("History", f"No history entries contain '{text}'")
+                return
+            # Wrap around to the newest match
+            self.search_before = None
+            matches = self.history.search(text, limit=1)
+        index = matches[0][0]
+        self.search_before = index
+        self.history_view.show(index)
+
     def clear_history(self):
         self.history.clear()
-        self.history_text.delete(1.0, tk.END)
+        self.history_view.render()
         messagebox.showinfo("History", "Calculation history cleared!")
 
     def copy_result(self):
@@ -564,7 +1102,10 @@ class PhysicsCalculatorGUI:
     def run(self):
         # Bind keyboard events
         self.root.bind('<Key>', self.on_key_press)
+        self.root.bind('<Control-v>', self.paste)
+        self.root.bind('<Control-V>', self.paste)
         self.root.focus_set()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Show initial help
         help_text = """🧮 PHYSICS CALCULATOR READY!
@@ -576,24 +1117,35 @@ Features:
 • Example: 1500000 → 1.5×10^6
 • Calculation history saved on the right
 • Copy results to clipboard
+• Uncertainties: (9.81 ± 0.02)*m/s^2, or type +/- for ±
+• Units are checked: exp(-E/(kB*300*K)); Tools → Check Units turns that off
+• Ctrl+V pastes an expression; several lines are evaluated as a batch
+• Tools → Worksheet: named quantities (μ = mₑ*mₚ/(mₑ + mₚ)) that update when their inputs change
 
 Try: h*c, me*c^2, sqrt(kB*300), 10^8"""
 
-        self.history_text.insert(tk.END, help_text + "\n\n")
+        self.history_view.placeholder = help_text
+        self.history_view.scroll_to(len(self.history))
 
         self.root.mainloop()
 
+    def on_close(self):
+        self.history.close()
+        self.root.destroy()
+
     def on_key_press(self, event):
         """Handle keyboard input"""
+        if isinstance(event.widget, tk.Entry):
+            # Typing in the history search box is not calculator input
+            return
         key = event.char
-        if key.isdigit() or key in '+-*/.()':
+        if key.isdigit() or key in '+-*/.()±':
             self.add_to_input(key)
         elif key == '\r' or key == '\n':  # Enter key
             self.calculate()
-        elif key == '\x08':  # Backspace
-            self.clear_function('←')
-        elif key == '\x1b':  # Escape
-            self.clear_function('C')
+        elif key == '\x08' or key == '\x1b':  # Backspace, Escape
+            # Queued with the other keys of a burst, so they apply in order
+            self.inject(key)
 
 
 def main():
@@ -0,0 +1,273 @@
+"""File mode: evaluate an expression over columns of measured data.
+
+    python physics_columns.py "h*c/(λ*nm)/eV" spectrum.csv -o energies.npy
+    python physics_columns.py "h*c/(w*nm)/eV" spectrum.csv --bind w=wavelength -o energies.csv
+    python physics_columns.py "U/I*Ω^-1" volts.npy amps.npy --bind U=volts --bind I=amps -o ohms.npy
+
+Inputs are .npy or CSV files, read side by side, one row at a time:
+
+- A .npy file is memory-mapped.  A 1-D array is one column, named after
+  the file ("volts" for volts.npy).  A 2-D array has one column per index
+  of its second axis, named "volts:0", "volts:1" and so on.
+- A CSV file is parsed a chunk of lines at a time.  Its columns are named
+  by its header row, or numbered from 0 when the first row is all numbers.
+
+Each variable of the expression is bound to the column of the same name,
+unless --bind maps it to another column; a column or --bind name that is
+also a constant or unit (T, the tesla) stands for the data.  An expression
+with one variable and a single input column needs no binding at all.  The
+expression is compiled once and run on each chunk with the same vectorized
+functions and constants/units namespace as sweep mode.  Results are streamed to a .npy
+or CSV file (CSV to stdout without -o), so memory use is set by the chunk
+size, not by the size of the data.
+"""
+import csv
+import itertools
+import os
+import struct
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only file mode needs it
+    np = None
+
+from physics_engine import PhysicsEngine
+from physics_sweep import require_numpy, vector_functions
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+# Room for any shape in a streamed .npy header, which is rewritten at the end
+NPY_HEADER_SIZE = 128
+
+
+class NpySource:
+    """Columns of a memory-mapped .npy file"""
+
+    def __init__(self, path):
+        self.array = np.load(path, mmap_mode='r')
+        if self.array.ndim not in (1, 2):
+            raise ValueError(f"{path}: expected a 1-D or 2-D array, found {self.array.ndim}-D")
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if self.array.ndim == 1:
+            self.columns = [stem]
+        else:
+            self.columns = [f"{stem}:{index}" for index in range(self.array.shape[1])]
+        self.position = 0
+
+    def read(self, count, names):
+        """The next count rows (fewer at the end) of the named columns, as float64 arrays"""
+        block = self.array[self.position:self.position + count]
+        self.position += len(block)
+        if self.array.ndim == 1:
+            return {names[0]: np.asarray(block, dtype=np.float64)} if names else {}
+        return {name: np.asarray(block[:, self.columns.index(name)], dtype=np.float64) for name in names}
+
+
+class CsvSource:
+    """Columns of a CSV file, parsed a chunk of lines at a time"""
+
+    def __init__(self, path, delimiter=','):
+        self.path = path
+        self.delimiter = delimiter
+        self.file = open(path, encoding='utf-8', newline='')
+        self.line = 1
+        first = self.file.readline()
+        header = next(csv.reader([first], delimiter=delimiter), [])
+        if not header:
+            raise ValueError(f"{path}: no columns")
+        if all(is_number(field) for field in header):
+            self.columns = [str(index) for index in range(len(header))]
+            self.pending = [first]
+        else:
+            self.columns = [field.strip() for field in header]
+            self.pending = []
+            self.line += 1
+
+    def read(self, count, names):
+        lines = self.pending + list(itertools.islice(self.file, count - len(self.pending)))
+        self.pending = []
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return {name: np.empty(0) for name in names}
+        indices = [self.columns.index(name) for name in names]
+        try:
+            block = np.loadtxt(lines, delimiter=self.delimiter, usecols=indices, ndmin=2, dtype=np.float64,
+                               quotechar='"')
+        except ValueError as e:
+            raise ValueError(f"{self.path}: line {self.line} onwards: {e}") from None
+        self.line += len(lines)
+        return {name: block[:, index] for index, name in enumerate(names)}
+
+    def close(self):
+        self.file.close()
+
+
+def is_number(text):
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def open_source(path):
+    if path.lower().endswith('.npy'):
+        return NpySource(path)
+    return CsvSource(path, '\t' if path.lower().endswith(('.tsv', '.tab')) else ',')
+
+
+def resolve_bindings(program, sources, bindings):
+    """Map each variable of the program to (source, column name)"""
+    columns = {}
+    for source in sources:
+        for name in source.columns:
+            columns.setdefault(name, source)
+    bindings = dict(bindings or {})
+    if not bindings and len(program.variables) == 1 and len(columns) == 1:
+        bindings[program.variables[0]] = next(iter(columns))
+
+    resolved = {}
+    for variable in program.variables:
+        column = bindings.get(variable, variable)
+        if column not in columns:
+            known = ", ".join(columns) or "none"
+            raise ValueError(f"No column '{column}' for variable '{variable}' (columns: {known})")
+        resolved[variable] = (columns[column], column)
+    return resolved
+
+
+def evaluate_columns(engine, text, sources, bindings=None, chunk_size=DEFAULT_CHUNK_SIZE, exact=False):
+    """Evaluate text over input columns, yielding one float64 array of results per chunk"""
+    require_numpy()
+    names = set(bindings or ())
+    for source in sources:
+        names.update(source.columns)
+    program = engine.compile_expression(text, names)
+    functions = vector_functions(exact, engine.integrator)
+    resolved = resolve_bindings(program, sources, bindings)
+    wanted = {id(source): (source, []) for source in sources}
+    for source, column in resolved.values():
+        if column not in wanted[id(source)][1]:
+            wanted[id(source)][1].append(column)
+    reads = [(source, names) for source, names in wanted.values() if names]
+    if not reads:
+        # An expression without variables still gives one result per row
+        reads = [(sources[0], sources[0].columns[:1])]
+
+    while True:
+        blocks = {}
+        sizes = set()
+        for source, names in reads:
+            block = source.read(chunk_size, names)
+            blocks[id(source)] = block
+            sizes.add(len(block[names[0]]))
+        if sizes == {0}:
+            return
+        if len(sizes) > 1:
+            raise ValueError("Input files have different numbers of rows")
+        size = sizes.pop()
+        variables = {variable: blocks[id(source)][column] for variable, (source, column) in resolved.items()}
+        with np.errstate(all='ignore'):
+            result = program.run(functions, variables)
+        result = np.broadcast_to(np.asarray(result), (size,))
+        if result.dtype.kind == 'c':
+            raise ValueError("Expression has complex results")
+        yield result.astype(np.float64)
+
+
+class NpyWriter:
+    """Streams a 1-D float64 array to a .npy file whose length is only known at the end"""
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.count = 0
+        self.write_header()
+
+    def write_header(self):
+        header = f"{{'descr': '<f8', 'fortran_order': False, 'shape': ({self.count},), }}"
+        # Magic string, format version 1.0, header length, then the padded header ending in \n
+        prefix = b'\x93NUMPY\x01\x00' + struct.pack('<H', NPY_HEADER_SIZE - 10)
+        self.file.write(prefix + header.ljust(NPY_HEADER_SIZE - 11).encode('latin1') + b'\n')
+
+    def write(self, values):
+        self.file.write(values.astype('<f8', copy=False).tobytes())
+        self.count += len(values)
+
+    def close(self):
+        self.file.seek(0)
+        self.write_header()
+        self.file.close()
+
+
+class CsvWriter:
+    """Streams results to a one-column CSV file (or stdout) under a header"""
+
+    def __init__(self, path, name='result'):
+        self.file = sys.stdout if path is None else open(path, 'w', encoding='utf-8', newline='')
+        self.file.write(name + '\n')
+
+    def write(self, values):
+        # repr gives the shortest text that reads back as the same float
+        self.file.write(''.join(f"{value!r}\n" for value in values.tolist()))
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+def open_writer(path, name='result'):
+    if path is not None and path.lower().endswith('.npy'):
+        return NpyWriter(path)
+    return CsvWriter(path, name)
+
+
+def parse_binding(text):
+    variable, separator, column = text.partition('=')
+    if not separator or not variable.strip() or not column.strip():
+        raise ValueError(f"Expected VARIABLE=COLUMN, got '{text}'")
+    return variable.strip(), column.strip()
+
+
+def main(argv=None):
+    """Evaluate an expression over columns of .npy or CSV files and stream the results"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluate an expression over columns of data files")
+    parser.add_argument('expression', help="expression whose variables are columns")
+    parser.add_argument('inputs', nargs='+', help=".npy or CSV files, read side by side")
+    parser.add_argument('--bind', action='append', default=[], metavar='VARIABLE=COLUMN',
+                        help="use COLUMN for VARIABLE (default: the column with the variable's name)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk")
+    parser.add_argument('--exact', action='store_true', help="match scalar results bit for bit")
+    parser.add_argument('--name', default='result', help="CSV output column name (default: result)")
+    parser.add_argument('-o', '--output', help=".npy or CSV output file (default: CSV to stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        bindings = dict(parse_binding(text) for text in args.bind)
+    except ValueError as e:
+        parser.error(str(e))
+
+    engine = PhysicsEngine()
+    sources = []
+    writer = None
+    try:
+        for path in args.inputs:
+            sources.append(open_source(path))
+        writer = open_writer(args.output, args.name)
+        for values in evaluate_columns(engine, args.expression, sources, bindings, args.chunk_size, args.exact):
+            writer.write(values)
+    except (ValueError, SyntaxError, NameError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if writer is not None:
+            writer.close()
+        for source in sources:
+            if isinstance(source, CsvSource):
+                source.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,393 @@
+"""Headless evaluation engine for the physics calculator.
+
+Holds the expression evaluation and scientific formatting used by the GUI,
+without importing tkinter, so expressions can be evaluated on machines with
+no display.  Constants and units come from physics_registry.  Run as a script for batch mode:
+
+    python physics_engine.py expressions.txt -o results.txt
+    cat expressions.txt | python physics_engine.py
+"""
+import math
+import os
+import sys
+from collections import OrderedDict
+from decimal import Decimal
+
+from physics_integrate import Integrator
+from physics_memo import MemoCache, memoize_functions, memoized_operator
+from physics_parser import BINARY_OPERATORS, checked_pow, compile_expression, shadow
+from physics_precision import Precision, format_decimal
+from physics_registry import CONSTANT, UNIT, Namespace, default_registry
+from physics_stats import PROFILER
+from physics_uncertainty import Propagator, Uncertain, format_uncertain, has_uncertain
+from physics_units import DIMENSIONLESS, Quantity, QuantityArray, dimensions_of
+
+# Constants and units shown in the GUI panels; their values, and every
+# other constant, unit and prefixed unit, come from the registry
+FEATURED_CONSTANTS = ['h', 'ℏ', 'c', 'e', 'mₑ', 'mₚ', 'mₙ', 'u', 'α', 'ε₀', 'μ₀',
+                      'G', 'kB', 'NA', 'R∞', 'π', 'euler']
+
+CONSTANT_DESCRIPTIONS = {
+    'h': 'Planck constant',
+    'ℏ': 'Reduced Planck',
+    'c': 'Speed of light',
+    'e': 'Elementary charge',
+    'mₑ': 'Electron mass',
+    'mₚ': 'Proton mass',
+    'mₙ': 'Neutron mass',
+    'u': 'Atomic mass unit',
+    'α': 'Fine structure',
+    'ε₀': 'Permittivity',
+    'μ₀': 'Permeability',
+    'G': 'Gravitational',
+    'kB': 'Boltzmann',
+    'NA': 'Avogadro',
+    'R∞': 'Rydberg',
+    'π': 'Pi',
+    'euler': 'Euler\'s number'
+}
+
+FEATURED_UNITS = ['eV', 'keV', 'MeV', 'nm', 'pm', 'fm', 'Å', 'MHz', 'GHz', 'THz']
+
+UNIT_DESCRIPTIONS = {
+    'eV': 'Electron volt',
+    'keV': 'Kilo eV',
+    'MeV': 'Mega eV',
+    'nm': 'Nanometer',
+    'pm': 'Picometer',
+    'fm': 'Femtometer',
+    'Å': 'Angstrom',
+    'MHz': 'Megahertz',
+    'GHz': 'Gigahertz',
+    'THz': 'Terahertz'
+}
+
+# Scalar functions available inside expressions
+FUNCTIONS = {
+    'sqrt': math.sqrt,
+    'cbrt': lambda x: x**(1/3),
+    'log10': math.log10,
+    'ln': math.log,
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'exp': math.exp,
+    # exp(x) - 1 without cancellation near 0, e.g. x^3/expm1(x)
+    'expm1': math.expm1,
+    'abs': abs,
+    'pow': checked_pow
+}
+
+
+def format_scientific(number, scientific_mode=True):
+    """Convert number to scientific notation format with × symbol"""
+    if isinstance(number, Uncertain):
+        return format_uncertain(number, scientific_mode)
+    if isinstance(number, Decimal):
+        return format_decimal(number, scientific_mode)
+    if isinstance(number, complex):
+        # Roots and logs of negative numbers; round() and log10 have no complex form
+        return str(number)
+    if number == 0:
+        return "0"
+
+    if not scientific_mode:
+        return str(number)
+
+    if isinstance(number, float) and not math.isfinite(number):
+        return str(number)
+
+    abs_num = abs(number)
+    if abs_num >= 1000000 or (abs_num <= 0.000001 and abs_num != 0):
+        exp = int(math.floor(math.log10(abs_num)))
+        mantissa = number / (10 ** exp)
+
+        if abs(mantissa - round(mantissa, 3)) < 1e-10:
+            mantissa = round(mantissa, 3)
+        else:
+            mantissa = round(mantissa, 6)
+
+        return f"{mantissa}×10^{exp}"
+    else:
+        if abs(number - round(number)) < 1e-10:
+            return str(int(round(number)))
+        else:
+            return f"{number:.8g}"
+
+
+# Symbols are resolved by the namespace itself (including NFKC spellings and
+# SI prefixes), so the parser needs no alias table
+NO_ALIASES = {}
+
+
+class PhysicsEngine:
+    def __init__(self, cache_size=4096, check_dimensions=True, registry=None, memo_size=None):
+        self.registry = registry if registry is not None else default_registry()
+        # Definitions made with define_constant/define_unit shadow the registry
+        self.namespace = Namespace(self.registry)
+        self._constants = None
+        self._units = None
+        # Reject sums of incompatible dimensions (eV + nm) at compile time
+        self.check_dimensions = check_dimensions
+        self.scientific_mode = True
+
+        # Optional LRU memo of pure function calls and folded constant operations
+        # (size from PHYSICS_CALC_MEMO unless given; 0 turns it off)
+        if memo_size is None:
+            memo_size = int(os.environ.get('PHYSICS_CALC_MEMO', '0') or 0)
+        self.memo = MemoCache(memo_size) if memo_size else None
+        if self.memo is not None:
+            self.functions = memoize_functions(FUNCTIONS, self.memo)
+            self.operators = {operator: memoized_operator(operator, function, self.memo)
+                              for operator, function in BINARY_OPERATORS.items()}
+        else:
+            self.functions = FUNCTIONS
+            self.operators = BINARY_OPERATORS
+
+        # integrate() and sum(), with tolerance and budget from PHYSICS_CALC_QUAD_TOL/_BUDGET
+        self.integrator = Integrator()
+        self.functions = dict(self.functions, **self.integrator.functions())
+        # Expressions with ± values, sampled with the PHYSICS_CALC_MC_* settings
+        self.propagator = Propagator()
+        # Decimal re-evaluation of results floats get wrong (digits from PHYSICS_CALC_PRECISION)
+        self.precision = Precision(self.namespace)
+
+        # Compiled expression cache (LRU keyed on normalized input text)
+        self.expression_cache = OrderedDict()
+        self.expression_cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Whether each name callers have bound is also a constant or unit
+        # (a namespace miss tries every SI prefix, which is slow)
+        self.symbol_names = {}
+        # Compiled integrate()/sum() bodies by structure, shared between expressions
+        # so an integrand is compiled once whatever its limits
+        self.integrands = OrderedDict()
+
+    @property
+    def constants(self):
+        """The featured constants (symbol -> value), read from the registry on first use"""
+        if self._constants is None:
+            self._constants = {symbol: self.registry[symbol] for symbol in FEATURED_CONSTANTS}
+        return self._constants
+
+    @property
+    def units(self):
+        """The featured units (symbol -> value), read from the registry on first use"""
+        if self._units is None:
+            self._units = {symbol: self.registry[symbol] for symbol in FEATURED_UNITS}
+        return self._units
+
+    def get_namespace(self):
+        """Return the symbol table that expressions resolve against"""
+        return self.namespace
+
+    def invalidate_namespace(self):
+        """Drop compiled programs after constants or units change"""
+        # Constant values are bound into compiled programs
+        self.expression_cache.clear()
+        self.integrands.clear()
+        self.symbol_names.clear()
+        self.precision.clear()
+
+    def define_constant(self, symbol, value, dims=DIMENSIONLESS):
+        self.constants[symbol] = value
+        self.namespace.define(symbol, value, dims, CONSTANT)
+        self.invalidate_namespace()
+
+    def define_unit(self, symbol, value, dims=DIMENSIONLESS):
+        self.units[symbol] = value
+        self.namespace.define(symbol, value, dims, UNIT)
+        self.invalidate_namespace()
+
+    def compile_expression(self, text, variables=None):
+        """Return the compiled Program for an input expression, using the LRU cache
+
+        variables, if given, are the names the caller will bind.  A bound name
+        that is also a constant or unit (T is the tesla, R the gas constant)
+        stands for the caller's value: the expression is compiled with those
+        names hidden from the namespace.
+        """
+        key = text.strip()
+        if not variables:
+            return self.compiled(key, ())
+        return self.compiled(key, self.hidden_names(variables))
+
+    def hidden_names(self, variables):
+        """The names in variables that are also constants or units, sorted"""
+        hidden = []
+        for name in variables:
+            is_symbol = self.symbol_names.get(name)
+            if is_symbol is None:
+                if len(self.symbol_names) >= self.expression_cache_size:
+                    self.symbol_names.clear()
+                is_symbol = self.symbol_names[name] = name in self.namespace
+            if is_symbol:
+                hidden.append(name)
+        return tuple(sorted(hidden))
+
+    def compiled(self, key, hidden):
+        """The cached Program for stripped text with the names in hidden read as variables"""
+        cache_key = (key, hidden) if hidden else key
+        program = self.expression_cache.get(cache_key)
+        if program is not None:
+            self.cache_hits += 1
+            self.expression_cache.move_to_end(cache_key)
+            return program
+
+        self.cache_misses += 1
+        start = PROFILER.start()
+        symbols, aliases = self.namespace, NO_ALIASES
+        for name in hidden:
+            symbols, aliases = shadow(symbols, aliases, name)
+        program = compile_expression(key, symbols, self.functions, aliases, self.operators, self.integrands)
+        if self.check_dimensions:
+            # Worked out once per compiled program, so evaluation stays on plain floats
+            program.dims = dimensions_of(program.tree, symbols, self.namespace.dimensions, self.functions, aliases,
+                                         dict.fromkeys(hidden))
+        PROFILER.stop('compile', start)
+        self.expression_cache[cache_key] = program
+        if len(self.expression_cache) > self.expression_cache_size:
+            self.expression_cache.popitem(last=False)
+        while len(self.integrands) > self.expression_cache_size:
+            self.integrands.popitem(last=False)
+        return program
+
+    def evaluate(self, text, variables=None):
+        """Evaluate an expression string and return the raw result
+
+        Expressions with ± values (or Uncertain variables) return an Uncertain.
+        Results that overflow, underflow or cancel on floats are recomputed
+        in decimal arithmetic (see physics_precision); those beyond the float
+        range are returned as a Decimal.
+        """
+        return self.run(self.compile_expression(text, variables), variables)
+
+    def run(self, program, variables=None):
+        """Run a program from compile_expression, as evaluate does"""
+        if program.uncertain or variables and has_uncertain(variables):
+            return self.propagator.evaluate(program, self.functions, self.integrator, variables)
+        if not PROFILER.enabled:
+            return self.precision.run(program, self.functions, variables)
+        start = PROFILER.start()
+        try:
+            return self.precision.run(program, self.functions, variables)
+        finally:
+            PROFILER.stop('run', start)
+
+    def evaluate_quantity(self, text, variables=None):
+        """Evaluate an expression and return a Quantity (QuantityArray for array results)
+
+        Variables may be Quantity values.  If the dimension cannot be worked
+        out (variables without one), the plain value is returned.
+        """
+        program = self.compile_expression(text, variables)
+        dims = program.dims
+        if variables and any(isinstance(value, Quantity) for value in variables.values()):
+            variable_dims = {name: value.dims if isinstance(value, Quantity) else DIMENSIONLESS
+                             for name, value in variables.items()}
+            variables = {name: value.value if isinstance(value, Quantity) else value
+                         for name, value in variables.items()}
+            dims = dimensions_of(program.tree, self.namespace, self.namespace.dimensions, self.functions,
+                                 NO_ALIASES, variable_dims)
+        value = self.run(program, variables)
+        if dims is None:
+            return value
+        if hasattr(value, 'shape') and value.shape:
+            return QuantityArray(value, dims)
+        return Quantity(value, dims)
+
+    def format_scientific(self, number):
+        if not PROFILER.enabled:
+            return format_scientific(number, self.scientific_mode)
+        start = PROFILER.start()
+        formatted = format_scientific(number, self.scientific_mode)
+        PROFILER.stop('format', start)
+        return formatted
+
+    def cache_stats(self):
+        """Return hit/miss counters for the compiled expression cache"""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'size': len(self.expression_cache),
+            'maxsize': self.expression_cache_size,
+            'hit_rate': self.cache_hits / lookups if lookups else 0.0
+        }
+
+    def memo_stats(self):
+        """Return hit/miss counters for the function memo, or None if memoization is off"""
+        return self.memo.stats() if self.memo is not None else None
+
+    def clear_cache(self):
+        self.expression_cache.clear()
+        self.integrands.clear()
+        self.symbol_names.clear()
+        self.precision.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        if self.memo is not None:
+            self.memo.clear()
+
+
+def evaluate_lines(engine, lines, echo=False):
+    """Evaluate an iterable of expression lines, yielding one output line each"""
+    for line in lines:
+        text = line.strip()
+        if not text or text.startswith('#'):
+            # Keep output lines aligned with input lines
+            yield "\n"
+            continue
+        try:
+            result = engine.format_scientific(engine.evaluate(text))
+        except Exception as e:
+            result = f"Error: {e}"
+        yield f"{text} = {result}\n" if echo else result + "\n"
+
+
+def main(argv=None):
+    """Batch mode: evaluate one expression per line from a file or stdin"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluate physics calculator expressions line by line")
+    parser.add_argument('input', nargs='?', default='-', help="expression file (default: stdin)")
+    parser.add_argument('-o', '--output', default='-', help="result file (default: stdout)")
+    parser.add_argument('--echo', action='store_true', help="print 'expression = result' lines")
+    parser.add_argument('--plain', action='store_true', help="disable scientific notation formatting")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="worker processes for large batches (0 = one per CPU)")
+    parser.add_argument('--stats', metavar='FILE', help="write per-stage timing statistics as JSON")
+    parser.add_argument('--memo', type=int, metavar='SIZE',
+                        help="memoize pure function calls in an LRU cache of this many entries")
+    args = parser.parse_args(argv)
+    if args.stats:
+        PROFILER.enabled = True
+
+    engine = PhysicsEngine(memo_size=args.memo)
+    engine.scientific_mode = not args.plain
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        # Lines are streamed, so memory use does not grow with the input size
+        if args.jobs == 1:
+            target.writelines(evaluate_lines(engine, source, args.echo))
+        else:
+            from physics_parallel import evaluate_parallel
+            target.writelines(evaluate_parallel(source, args.jobs or None, echo=args.echo,
+                                                scientific_mode=engine.scientific_mode,
+                                                memo_size=args.memo))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    if args.stats:
+        # Worker processes keep their own counters, so with --jobs only the parent's time is shown
+        PROFILER.export(args.stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
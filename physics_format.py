@@ -0,0 +1,113 @@
+"""Batch version of format_scientific for arrays of results.
+
+format_scientific_batch() gives exactly the strings format_scientific()
+would give for each element, but does the numeric work (exponent
+extraction, mantissa scaling and rounding, fixed-vs-scientific selection)
+in a few NumPy passes over the whole array.  Only the final string
+assembly is done per element.  Without NumPy it falls back to the scalar
+formatter.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the batch formatter degrades to a loop
+    np = None
+
+from physics_engine import format_scientific
+
+# Exponents a finite float64 can have after floor(log10(x))
+MIN_EXPONENT = -324
+MAX_EXPONENT = 308
+
+_power_table = None
+_suffix_table = None
+
+
+def power_table():
+    """10**exp for every float exponent, computed exactly as the scalar formatter does"""
+    global _power_table
+    if _power_table is None:
+        _power_table = np.array([10 ** exp for exp in range(MIN_EXPONENT, MAX_EXPONENT + 1)],
+                                dtype=np.float64)
+    return _power_table
+
+
+def suffix_table():
+    """The "×10^exp" text for every float exponent"""
+    global _suffix_table
+    if _suffix_table is None:
+        _suffix_table = np.array([f"×10^{exp}" for exp in range(MIN_EXPONENT, MAX_EXPONENT + 1)],
+                                 dtype=object)
+    return _suffix_table
+
+
+def format_scientific_batch(values, scientific_mode=True):
+    """Format a sequence or array of numbers; returns a list of strings"""
+    if np is None:
+        return [format_scientific(value, scientific_mode) for value in values]
+
+    if isinstance(values, np.ndarray):
+        if values.dtype != np.float64:
+            if values.dtype.kind != 'f':
+                # Integers keep their exact scalar semantics
+                return [format_scientific(value, scientific_mode) for value in values.tolist()]
+            values = values.astype(np.float64)
+        array = values.reshape(-1)
+    else:
+        values = list(values)
+        if not all(type(value) is float for value in values):
+            return [format_scientific(value, scientific_mode) for value in values]
+        array = np.array(values, dtype=np.float64)
+
+    if not scientific_mode:
+        return ["0" if value == 0 else str(value) for value in array.tolist()]
+
+    output = np.empty(array.size, dtype=object)
+    with np.errstate(all='ignore'):
+        finite = np.isfinite(array)
+        magnitude = np.abs(array)
+        zero = array == 0
+        scientific = finite & ~zero & ((magnitude >= 1000000) | (magnitude <= 0.000001))
+        fixed = finite & ~zero & ~scientific
+
+        output[zero] = "0"
+        if not finite.all():
+            output[~finite] = [str(value) for value in array[~finite].tolist()]
+        if scientific.any():
+            output[scientific] = _format_scientific_part(array[scientific], magnitude[scientific])
+        if fixed.any():
+            output[fixed] = _format_fixed_part(array[fixed])
+    return output.tolist()
+
+
+def _format_scientific_part(numbers, magnitudes):
+    log = np.log10(magnitudes)
+    exponents = np.floor(log).astype(np.int64)
+    # NumPy's log10 can differ from math.log10 in the last bit; where that
+    # could move the floor across an integer, use math.log10 itself
+    for position in np.flatnonzero(np.abs(log - np.rint(log)) < 1e-9).tolist():
+        exponents[position] = int(math.floor(math.log10(magnitudes[position].item())))
+
+    mantissas = numbers / power_table()[exponents - MIN_EXPONENT]
+
+    rounded3 = np.round(mantissas, 3)
+    short = np.abs(mantissas - rounded3) < 1e-10
+    rounded6 = np.round(mantissas, 6)
+    # np.round scales by 10**6 and rounds half to even; near a half-way point
+    # that can disagree with Python's correctly rounded round(), so redo those
+    scaled = np.abs(mantissas) * 1e6
+    for position in np.flatnonzero(~short & (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)).tolist():
+        rounded6[position] = round(mantissas[position].item(), 6)
+    rounded = np.where(short, rounded3, rounded6)
+
+    # repr() of the rounded mantissa is what the f-string in format_scientific produces
+    return list(map(str.__add__, map(repr, rounded.tolist()),
+                    suffix_table()[exponents - MIN_EXPONENT].tolist()))
+
+
+def _format_fixed_part(numbers):
+    nearest = np.rint(numbers)
+    whole = np.abs(numbers - nearest) < 1e-10
+    return [str(int(integer)) if is_whole else f"{number:.8g}"
+            for number, is_whole, integer in zip(numbers.tolist(), whole.tolist(), nearest.tolist())]
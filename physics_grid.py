@@ -0,0 +1,199 @@
+"""Grid mode: evaluate one expression over every pair of values of two variables.
+
+    python physics_grid.py "2*h*c^2/λ^5/(exp(h*c/(λ*kB*θ*K))-1)" λ 100*nm 3000*nm θ 1000 6000 \\
+        --num 10000 10000 -o planck.npy
+
+The result has one row per value of the first variable and one column per
+value of the second.  It is cut into tiles of whole rows (or pieces of a
+row, for very wide grids), and the tiles are evaluated by a process pool
+with the same vectorized functions as sweep mode.  Each worker writes its
+tiles straight into one memory-mapped result array, so no results are sent
+back through the pool.  With -o the result array is the output .npy file
+itself.  Without -o it lives in a deleted temporary file (in /dev/shm where
+there is one), which is freed when the array is.
+
+Workers build their own engine from the same registry, with the calling
+engine's define_constant/define_unit definitions, so names resolve exactly
+as they do for calculate.
+"""
+import os
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only grid mode needs it
+    np = None
+
+from physics_engine import PhysicsEngine
+from physics_format import format_scientific_batch
+from physics_sweep import linspace, logspace, require_numpy, vector_functions
+
+# Elements per tile: a few MB of float64, large enough to amortize a task
+DEFAULT_TILE_SIZE = 1 << 18
+SHARED_MEMORY_DIR = '/dev/shm'
+
+# Per-process state, set up by the pool initializer
+_worker = None
+
+
+def tiles(rows, columns, tile_size=DEFAULT_TILE_SIZE):
+    """Yield (row_start, row_stop, column_start, column_stop) blocks covering a grid"""
+    if columns <= tile_size:
+        step = max(1, tile_size // columns)
+        for start in range(0, rows, step):
+            yield start, min(rows, start + step), 0, columns
+    else:
+        for row in range(rows):
+            for start in range(0, columns, tile_size):
+                yield row, row + 1, start, min(columns, start + tile_size)
+
+
+def definitions(engine):
+    """The engine's own constants and units, as arguments for namespace.define"""
+    return [(entry.symbol, entry.value, entry.dims, entry.kind) for entry in engine.namespace.overrides.values()]
+
+
+class GridEvaluator:
+    """One compiled expression and its two axes, writing tiles into a result array"""
+
+    def __init__(self, engine, text, x, x_values, y, y_values, exact=False):
+        self.program = engine.compile_expression(text, (x, y))
+        others = [name for name in self.program.variables if name not in (x, y)]
+        if others:
+            raise ValueError(f"Unknown names in grid expression: {', '.join(others)}")
+        self.functions = vector_functions(exact, engine.integrator)
+        self.x, self.y = x, y
+        self.x_values = np.asarray(x_values, dtype=np.float64)
+        self.y_values = np.asarray(y_values, dtype=np.float64)
+
+    def evaluate(self, target, row_start, row_stop, column_start, column_stop):
+        variables = {self.x: self.x_values[row_start:row_stop, None],
+                     self.y: self.y_values[None, column_start:column_stop]}
+        with np.errstate(all='ignore'):
+            # Results that do not depend on a variable broadcast over the tile
+            target[row_start:row_stop, column_start:column_stop] = self.program.run(self.functions, variables)
+
+
+def _init_worker(path, text, x, x_values, y, y_values, exact, defined):
+    global _worker
+    engine = PhysicsEngine()
+    for symbol, value, dims, kind in defined:
+        engine.namespace.define(symbol, value, dims, kind)
+    _worker = (GridEvaluator(engine, text, x, x_values, y, y_values, exact), np.load(path, mmap_mode='r+'))
+
+
+def _evaluate_tile(tile):
+    evaluator, target = _worker
+    evaluator.evaluate(target, *tile)
+
+
+def result_file(path, shape):
+    """A .npy file of float64 mapped into memory; a deleted temporary file when path is None"""
+    if path is not None:
+        return np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=shape), path
+    directory = SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) else None
+    handle, temporary = tempfile.mkstemp(suffix='.npy', prefix='physics-grid-', dir=directory)
+    os.close(handle)
+    return np.lib.format.open_memmap(temporary, mode='w+', dtype=np.float64, shape=shape), temporary
+
+
+def evaluate_grid(engine, text, x, x_values, y, y_values, output=None, workers=None,
+                  tile_size=DEFAULT_TILE_SIZE, exact=False):
+    """Evaluate text for every (x, y) pair; returns an array of shape (len(x_values), len(y_values))
+
+    output is a .npy path to write the result to (the returned array is
+    mapped from that file).  workers=1 evaluates in this process.
+    """
+    require_numpy()
+    x_values = np.asarray(x_values, dtype=np.float64).reshape(-1)
+    y_values = np.asarray(y_values, dtype=np.float64).reshape(-1)
+    # Compile here first, so errors are raised before any worker starts
+    evaluator = GridEvaluator(engine, text, x, x_values, y, y_values, exact)
+    shape = (x_values.size, y_values.size)
+    blocks = tiles(*shape, tile_size)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        target = np.empty(shape) if output is None else result_file(output, shape)[0]
+        for tile in blocks:
+            evaluator.evaluate(target, *tile)
+        if output is not None:
+            target.flush()
+        return target
+
+    target, path = result_file(output, shape)
+    try:
+        # Keep a couple of tiles queued per worker so no process sits idle
+        max_pending = workers * 2
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(path, text, x, x_values, y, y_values, exact,
+                                           definitions(engine))) as executor:
+            pending = deque()
+            for tile in blocks:
+                pending.append(executor.submit(_evaluate_tile, tile))
+                if len(pending) >= max_pending:
+                    pending.popleft().result()
+            while pending:
+                pending.popleft().result()
+        target.flush()
+    finally:
+        if output is None:
+            # The mapping stays valid; the memory goes when the array does
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+    return target
+
+
+def axis(engine, start, stop, num, log):
+    start, stop = engine.evaluate(start), engine.evaluate(stop)
+    return logspace(start, stop, num) if log else linspace(start, stop, num)
+
+
+def main(argv=None):
+    """Evaluate an expression over a grid of two variables and save or print the result"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluate an expression over a grid of two variables")
+    parser.add_argument('expression', help="expression containing both grid variables")
+    parser.add_argument('x', help="first variable (one row of the result per value)")
+    parser.add_argument('x_start', help="first value of x (may be an expression, e.g. 100*nm)")
+    parser.add_argument('x_stop', help="last value of x")
+    parser.add_argument('y', help="second variable (one column per value)")
+    parser.add_argument('y_start', help="first value of y")
+    parser.add_argument('y_stop', help="last value of y")
+    parser.add_argument('--num', type=int, nargs=2, default=(100, 100), metavar=('NX', 'NY'),
+                        help="number of values of x and y (default: 100 100)")
+    parser.add_argument('--log-x', action='store_true', help="space x logarithmically")
+    parser.add_argument('--log-y', action='store_true', help="space y logarithmically")
+    parser.add_argument('--exact', action='store_true', help="match scalar results bit for bit")
+    parser.add_argument('-j', '--jobs', type=int, default=0, help="worker processes (default 0 = one per CPU)")
+    parser.add_argument('--tile-size', type=int, default=DEFAULT_TILE_SIZE, help="grid points per tile")
+    parser.add_argument('-o', '--output', help="write the result to a .npy file instead of printing")
+    args = parser.parse_args(argv)
+
+    engine = PhysicsEngine()
+    try:
+        x_values = axis(engine, args.x_start, args.x_stop, args.num[0], args.log_x)
+        y_values = axis(engine, args.y_start, args.y_stop, args.num[1], args.log_y)
+        result = evaluate_grid(engine, args.expression, args.x, x_values, args.y, y_values, args.output,
+                               args.jobs or None, args.tile_size, args.exact)
+    except (ValueError, SyntaxError, NameError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if args.output is None:
+        xs = format_scientific_batch(x_values, engine.scientific_mode)
+        ys = format_scientific_batch(y_values, engine.scientific_mode)
+        for x, row in zip(xs, result):
+            values = format_scientific_batch(row, engine.scientific_mode)
+            sys.stdout.writelines(f"{x}\t{y}\t{value}\n" for y, value in zip(ys, values))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
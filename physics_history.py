@@ -0,0 +1,155 @@
+"""Calculation history backed by an append-only SQLite log.
+
+Entries are appended to a SQLite table on disk and the most recent ones are
+also kept in an in-memory ring buffer, so the GUI can show a window of the
+history without holding all of it in memory or in a Tk text widget.  Entry i
+(0-based, oldest first) is stored with rowid i + 1, which makes reading any
+window a primary-key range scan.  SQLite assigns the rowids, so several
+calculator windows can append to the same file; an append that finds
+entries from another window in between picks them up.  When the SQLite
+build has FTS5, a trigram index keeps substring search fast on very long
+histories.
+"""
+import os
+import sqlite3
+import time
+from collections import deque
+
+DEFAULT_BUFFER_SIZE = 1000
+DEFAULT_COMMIT_EVERY = 256
+
+
+def default_history_path():
+    """History file location, overridable with PHYSICS_CALC_HISTORY"""
+    return os.environ.get('PHYSICS_CALC_HISTORY',
+                          os.path.join(os.path.expanduser('~'), '.physics_calculator_history.sqlite3'))
+
+
+def format_entry(expression, result):
+    return f"{expression} = {result}"
+
+
+class HistoryStore:
+    def __init__(self, path=':memory:', buffer_size=DEFAULT_BUFFER_SIZE,
+                 commit_every=DEFAULT_COMMIT_EVERY):
+        self.path = path
+        self.commit_every = commit_every
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY, expression TEXT NOT NULL, result TEXT NOT NULL, created REAL)")
+        self.full_text = self._create_search_index()
+        self.connection.commit()
+
+        self.pending = 0
+        # Ring buffer of the most recent entries; recent[0] is entry self.count - len(recent)
+        self.recent = deque(maxlen=buffer_size)
+        self.reload()
+
+    def reload(self):
+        """Read the entry count and the most recent entries from the file"""
+        self.count = self.connection.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        rows = self.connection.execute(
+            "SELECT expression, result FROM history ORDER BY id DESC LIMIT ?", (self.recent.maxlen,)).fetchall()
+        self.recent.clear()
+        self.recent.extend(format_entry(expression, result) for expression, result in reversed(rows))
+
+    def _create_search_index(self):
+        """Create the FTS5 trigram index if this SQLite build supports it"""
+        try:
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS history_search "
+                "USING fts5(line, content='', tokenize='trigram')")
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def __len__(self):
+        return self.count
+
+    def append(self, expression, result):
+        """Append an entry and return its index"""
+        line = format_entry(expression, result)
+        row_id = self.connection.execute("INSERT INTO history (expression, result, created) VALUES (?, ?, ?)",
+                                         (expression, result, time.time())).lastrowid
+        if self.full_text:
+            self.connection.execute("INSERT INTO history_search (rowid, line) VALUES (?, ?)", (row_id, line))
+        index = row_id - 1
+        if index == self.count:
+            self.count += 1
+            self.recent.append(line)
+        else:
+            # Another window sharing the file appended (or cleared it) since
+            self.reload()
+
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.flush()
+        return index
+
+    def window(self, start, count):
+        """Return up to count entry lines starting at index start"""
+        start = max(0, start)
+        stop = min(self.count, start + count)
+        if start >= stop:
+            return []
+
+        first_recent = self.count - len(self.recent)
+        if start >= first_recent:
+            offset = start - first_recent
+            return [self.recent[i] for i in range(offset, offset + stop - start)]
+
+        rows = self.connection.execute(
+            "SELECT expression, result FROM history WHERE id > ? AND id <= ? ORDER BY id",
+            (start, stop)).fetchall()
+        return [format_entry(expression, result) for expression, result in rows]
+
+    def get(self, index):
+        lines = self.window(index, 1)
+        if not lines:
+            raise IndexError("history index out of range")
+        return lines[0]
+
+    def search(self, text, limit=100, before=None):
+        """Return (index, line) pairs containing text, newest first
+
+        Pass the smallest index from a previous page as before to continue.
+        """
+        if before is None:
+            before = self.count
+        if self.full_text and len(text) >= 3:
+            # The trigram index needs at least three characters
+            query = '"' + text.replace('"', '""') + '"'
+            rows = self.connection.execute(
+                "SELECT history.id, expression, result FROM history_search "
+                "JOIN history ON history.id = history_search.rowid "
+                "WHERE history_search MATCH ? AND history_search.rowid <= ? "
+                "ORDER BY history_search.rowid DESC LIMIT ?", (query, before, limit)).fetchall()
+        else:
+            pattern = '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            rows = self.connection.execute(
+                "SELECT id, expression, result FROM history "
+                "WHERE id <= ? AND (expression || ' = ' || result) LIKE ? ESCAPE '\\' "
+                "ORDER BY id DESC LIMIT ?", (before, pattern, limit)).fetchall()
+        return [(row_id - 1, format_entry(expression, result)) for row_id, expression, result in rows]
+
+    def clear(self):
+        self.connection.execute("DELETE FROM history")
+        if self.full_text:
+            self.connection.execute("INSERT INTO history_search (history_search) VALUES ('delete-all')")
+        self.connection.commit()
+        self.pending = 0
+        self.count = 0
+        self.recent.clear()
+
+    def flush(self):
+        """Commit appended entries to disk"""
+        if self.pending:
+            self.connection.commit()
+            self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,372 @@
+"""Adaptive integration and summation for integrate() and sum() in expressions.
+
+    integrate(h*ν^3/expm1(h*ν/(kB*5778*K)), ν, 0*Hz, ∞*Hz)
+    sum(1/n^2, n, 1, ∞)
+    integrate(exp(-x^2), x, -∞, ∞, 1e-12)        optional tolerance...
+    sum(1/n^3, n, 1, ∞, 1e-8, 10^7)              ...and evaluation budget
+
+integrate() uses a globally adaptive Gauss-Kronrod 7-15 rule: every new
+interval is sampled at its 15 nodes, and all those nodes are evaluated
+together in one batch (one vectorized run of the integrand when NumPy is
+available).  The integral is done when the summed error estimates |K15 - G7|
+are within tolerance × ∫|f|; until then the intervals with the largest
+errors are halved for the next batch.  The range is cut into pieces that
+start at its ends, x = a + u near a finite end and x = a + 1/u out to an
+infinite one, because floats are densest near 0: a spectrum peaking at
+1e14 Hz is sampled as finely as one peaking at 1e-6 m.  The nodes never
+reach the end points.  Values that are infinite or undefined at the nodes
+next to an end, as when exp(x)-1 rounds to 0 in x^3/(exp(x)-1), are taken
+from the nearest node further in; expm1(x) avoids that rounding.
+
+sum() adds terms in batches of growing size.  A sum to ∞ is finished when
+two successive estimates agree: each estimate is the partial sum plus the
+tail ∫ f from N+1/2 to ∞ (the midpoint Euler-Maclaurin correction) where
+that integral exists, or the bare partial sum otherwise.
+
+The tolerance is relative; the budget bounds function evaluations per call
+(terms, for a sum).  Engine-wide defaults come from PHYSICS_CALC_QUAD_TOL and
+PHYSICS_CALC_QUAD_BUDGET.  The integral's unit is the integrand's times the
+variable's, which is taken from the limits: integrate over λ from 0*m to
+∞*m to get W/m² from a spectral radiance in W/m³.
+"""
+import math
+import os
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it the batches are evaluated point by point
+    np = None
+
+DEFAULT_TOLERANCE = 1e-10
+DEFAULT_BUDGET = 100000
+# The range is split this many times before the first batch
+INITIAL_INTERVALS = 4
+# Largest batch of terms a sum evaluates at once
+SUM_BATCH = 1 << 14
+ABOVE_ZERO = math.ulp(0.0)
+
+# Gauss-Kronrod 7-15 rule on [-1, 1] (QUADPACK's qk15): positive Kronrod
+# nodes, their weights, and the weights of the Gauss nodes among them
+KRONROD_NODES = (0.991455371120812639206854697526329, 0.949107912342758524526189684047851,
+                 0.864864423359769072789712788640926, 0.741531185599394439863864773280788,
+                 0.586087235467691130294144845693013, 0.405845151377397166906606412076961,
+                 0.207784955007898467600689403773245)
+KRONROD_WEIGHTS = (0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+                   0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+                   0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+                   0.204432940075298892414161999234649)
+KRONROD_CENTER_WEIGHT = 0.209482141084727828012999174891714
+GAUSS_WEIGHTS = (0.0, 0.129484966168869693270611432679082, 0.0, 0.279705391489276667901467771423780,
+                 0.0, 0.381830050505118944950369775488975, 0.0)
+GAUSS_CENTER_WEIGHT = 0.417959183673469387755102040816327
+
+# All 15 nodes in ascending order, with matching weights (0 where Gauss has no node)
+NODES = tuple(-x for x in KRONROD_NODES) + (0.0,) + KRONROD_NODES[::-1]
+K15 = KRONROD_WEIGHTS + (KRONROD_CENTER_WEIGHT,) + KRONROD_WEIGHTS[::-1]
+G7 = GAUSS_WEIGHTS + (GAUSS_CENTER_WEIGHT,) + GAUSS_WEIGHTS[::-1]
+
+
+class IntegrationError(ValueError):
+    """Raised when an integral or sum does not converge within its budget"""
+
+
+def ieee_functions(functions):
+    """Scalar functions that return inf or nan where math would raise, like NumPy's
+
+    Far out on an infinite range exp(x) overflows; with this table
+    x^3/(exp(x)-1) is 0 there instead of an error.
+    """
+
+    def wrap(function):
+        def call(*args):
+            try:
+                return function(*args)
+            except OverflowError:
+                return math.inf
+            except ValueError:
+                return math.nan
+        return call
+
+    return {name: wrap(function) for name, function in functions.items()}
+
+
+def has_arrays(values):
+    return any(getattr(value, 'ndim', 0) for value in values)
+
+
+class Integrator:
+    """integrate() and sum() for expressions, with a default tolerance and evaluation budget"""
+
+    def __init__(self, tolerance=None, budget=None):
+        if tolerance is None:
+            tolerance = float(os.environ.get('PHYSICS_CALC_QUAD_TOL') or DEFAULT_TOLERANCE)
+        if budget is None:
+            budget = int(os.environ.get('PHYSICS_CALC_QUAD_BUDGET') or DEFAULT_BUDGET)
+        self.tolerance = tolerance
+        self.budget = budget
+        self.evaluations = 0
+        self._vector_functions = None
+        self._scalar_functions = {}
+
+    def functions(self):
+        """The entries integrate() and sum() add to a function table"""
+        return {'integrate': self.integrate, 'sum': self.sum}
+
+    def vector_functions(self):
+        if self._vector_functions is None:
+            from physics_sweep import vector_functions
+            self._vector_functions = vector_functions(integrator=self)
+        return self._vector_functions
+
+    def scalar_functions(self, functions):
+        table = self._scalar_functions.get(id(functions))
+        if table is None:
+            table = ieee_functions(functions)
+            table.update(self.functions())
+            self._scalar_functions = {id(functions): table}
+        return table
+
+    def sample(self, closure, points):
+        """Evaluate closure at a list of points in one batch; returns a list of floats"""
+        self.evaluations += len(points)
+        if np is not None:
+            with np.errstate(all='ignore'):
+                values = closure(np.array(points, dtype=np.float64), self.vector_functions())
+            values = np.broadcast_to(np.asarray(values), (len(points),))
+            if values.dtype.kind not in 'fiub':
+                return [math.nan] * len(points)
+            return values.astype(np.float64).tolist()
+        functions = self.scalar_functions(closure.functions)
+        values = []
+        for x in points:
+            try:
+                value = closure(x, functions)
+            except (ArithmeticError, ValueError):
+                value = math.nan
+            values.append(value if type(value) in (float, int, bool) else math.nan)
+        return values
+
+    def elementwise(self, method, closure, limits, options):
+        """Apply method per element when the limits or enclosing variables are arrays"""
+        names = list(closure.variables or ())
+        arrays = np.broadcast_arrays(*[closure.variables[name] for name in names], *limits)
+        result = np.empty(arrays[0].shape)
+        for index in np.ndindex(result.shape):
+            values = [array[index] for array in arrays]
+            bound = closure.bind(dict(zip(names, values[:len(names)])))
+            result[index] = method(bound, *values[len(names):], *options)
+        return result
+
+    def integrate(self, closure, a, b, tolerance=None, budget=None):
+        """∫ closure(x) dx from a to b"""
+        if has_arrays((a, b) + tuple((closure.variables or {}).values())):
+            return self.elementwise(self.integrate, closure, (a, b), (tolerance, budget))
+        tolerance = self.tolerance if tolerance is None else tolerance
+        budget = self.budget if budget is None else budget
+        a, b = float(a), float(b)
+        if math.isnan(a) or math.isnan(b):
+            raise IntegrationError("integrate() limits must be numbers")
+        if a == b:
+            return 0.0
+        if a > b:
+            return -self.integrate(closure, b, a, tolerance, budget)
+
+        # Pieces that each start at one end of the range (see the module docstring)
+        if math.isinf(a) and math.isinf(b):
+            pieces = [end_piece(0.0, 1, 1.0), infinite_piece(0.0, 1), end_piece(0.0, -1, 1.0),
+                      infinite_piece(0.0, -1)]
+        elif math.isinf(b):
+            pieces = [end_piece(a, 1, 1.0), infinite_piece(a, 1)]
+        elif math.isinf(a):
+            pieces = [end_piece(b, -1, 1.0), infinite_piece(b, -1)]
+        else:
+            half = 0.5 * b - 0.5 * a
+            pieces = [end_piece(a, 1, half), end_piece(b, -1, half)]
+        maps = [piece[1] for piece in pieces]
+
+        def sample(points):
+            mapped = [maps[k](u) for k, u in points]
+            values = self.sample(closure, [x for x, scale in mapped])
+            # 0 * inf far out on an infinite range counts as 0
+            return [value * scale if value else 0.0 for value, (x, scale) in zip(values, mapped)]
+
+        return adaptive_quadrature(sample, [piece[0] for piece in pieces], tolerance, budget)
+
+    def sum(self, closure, a, b, tolerance=None, budget=None):
+        """Σ closure(n) for integers n from a to b inclusive"""
+        if has_arrays((a, b) + tuple((closure.variables or {}).values())):
+            return self.elementwise(self.sum, closure, (a, b), (tolerance, budget))
+        tolerance = self.tolerance if tolerance is None else tolerance
+        budget = self.budget if budget is None else budget
+        if any(not math.isinf(limit) and limit != int(limit) for limit in (a, b)):
+            raise IntegrationError("sum() limits must be whole numbers or ±∞")
+        if a > b:
+            return 0
+        if math.isinf(a) and math.isinf(b):
+            return (self.sum(closure, -math.inf, -1, tolerance, budget)
+                    + self.sum(closure, 0, math.inf, tolerance, budget))
+        if math.isinf(a):
+            # Σ from -∞ to b of f(n) is Σ from -b to ∞ of f(-m)
+            return self.series(closure, -int(b), tolerance, budget, lambda m: -m)
+        if math.isinf(b):
+            return self.series(closure, int(a), tolerance, budget)
+
+        a, b = int(a), int(b)
+        if b - a + 1 > budget:
+            raise IntegrationError(f"sum() has {b - a + 1} terms, more than its budget of {budget}")
+        partials = []
+        for start in range(a, b + 1, SUM_BATCH):
+            partials.append(math.fsum(self.terms(closure, start, min(SUM_BATCH, b + 1 - start))))
+        return math.fsum(partials)
+
+    def terms(self, closure, start, count, mirror=None):
+        """The terms for n = start ... start+count-1 (integers stay exact without NumPy)"""
+        ns = range(start, start + count)
+        if mirror is not None:
+            ns = [mirror(n) for n in ns]
+        values = self.sample(closure, list(ns))
+        if not all(map(math.isfinite, values)):
+            raise IntegrationError("sum() term is infinite or undefined")
+        return values
+
+    def series(self, closure, start, tolerance, budget, mirror=None):
+        """Σ closure(n) for n from start to ∞"""
+        partials = []
+        scale = []
+        previous = None
+        use_tail = True
+        used = 0
+        count = 16
+        n = start
+        while True:
+            if used + count > budget:
+                raise IntegrationError(f"sum() did not converge within {budget} terms")
+            values = self.terms(closure, n, count, mirror)
+            used += count
+            n += count
+            partials.append(math.fsum(values))
+            scale.append(math.fsum(map(abs, values)))
+            estimate = math.fsum(partials)
+            if use_tail:
+                tail = self.tail(closure, n, tolerance, mirror)
+                # Without a tail integral (alternating terms, say) only the partial sums are compared
+                use_tail = tail is not None
+                estimate += tail or 0.0
+            if previous is not None and abs(estimate - previous) <= tolerance * math.fsum(scale):
+                return estimate
+            previous = estimate
+            count = min(count * 2, SUM_BATCH)
+
+    def tail(self, closure, n, tolerance, mirror=None):
+        """∫ f from n-1/2 to ∞, approximating the remaining terms from n on; None if it does not converge"""
+        try:
+            if mirror is None:
+                return self.integrate(closure, n - 0.5, math.inf, tolerance)
+            return self.integrate(closure, -math.inf, -(n - 0.5), tolerance)
+        except IntegrationError:
+            return None
+
+
+def end_piece(end, sign, width):
+    """(width, map) for x = end + sign*u, u from 0 to width"""
+    return width, lambda u: (end + sign * u, 1.0)
+
+
+def infinite_piece(start, sign):
+    """(width, map) for x = start + sign/u, u from 0 to 1: from start ± 1 out to ±∞
+
+    u is kept above 0 in case a tiny interval rounds onto it.
+    """
+    def transform(u):
+        u = max(u, ABOVE_ZERO)
+        return start + sign / u, 1 / (u * u)
+    return 1.0, transform
+
+
+def end_limits(values, pending):
+    """values with the infinite or undefined values at the start of a piece replaced
+
+    Close to an end point a removable singularity can still evaluate badly:
+    in x^3/(exp(x)-1) near 0, exp(x)-1 rounds to 0.  The integrand's limit
+    there is taken to be its value at the nearest node further in.
+    """
+    values = list(values)
+    for i, (k, lo, hi) in enumerate(pending):
+        if lo != 0:
+            continue
+        run = range(15 * i, 15 * i + 15)
+        inner = next((j for j in run if math.isfinite(values[j])), None)
+        if inner is not None:
+            for j in range(15 * i, inner):
+                values[j] = values[inner]
+    return values
+
+
+def adaptive_quadrature(sample, widths, tolerance, budget):
+    """Globally adaptive Gauss-Kronrod 7-15 integration over pieces [0, width]
+
+    sample takes a list of (piece index, point) pairs and returns the
+    integrand's values there; the result is the sum over all the pieces.
+    Each round evaluates the new intervals in one batch; if the summed error
+    estimate is still above tolerance × ∫|f|, the intervals with the largest
+    errors are halved, just enough of them that the rest would be within
+    half the tolerance.
+    """
+    count = max(1, INITIAL_INTERVALS // len(widths))
+    pending = []
+    for k, width in enumerate(widths):
+        edges = [i * width / count for i in range(count)] + [width]
+        pending.extend((k, lo, hi) for lo, hi in zip(edges, edges[1:]))
+    intervals = []          # (error, estimate, ∫|f| estimate, piece, lo, hi) for the current partition
+    error = 0.0
+    evaluations = 0
+    while True:
+        if evaluations + 15 * len(pending) > budget:
+            estimate = f" (error estimate {error:.2g})" if evaluations else ""
+            raise IntegrationError(f"integrate() did not converge within {budget} evaluations"
+                                   f"{estimate}; raise the budget or split the range")
+        points = []
+        for k, lo, hi in pending:
+            center, half = 0.5 * (lo + hi), 0.5 * (hi - lo)
+            points.extend((k, center + half * node) for node in NODES)
+        values = sample(points)
+        evaluations += len(points)
+        if not all(map(math.isfinite, values)):
+            values = end_limits(values, pending)
+            if not all(map(math.isfinite, values)):
+                raise IntegrationError("Integrand is infinite or undefined inside the range")
+
+        for i, (k, lo, hi) in enumerate(pending):
+            half = 0.5 * (hi - lo)
+            chunk = values[15 * i:15 * i + 15]
+            try:
+                kronrod = half * math.fsum(w * v for w, v in zip(K15, chunk))
+                gauss = half * math.fsum(w * v for w, v in zip(G7, chunk))
+                absolute = half * math.fsum(w * abs(v) for w, v in zip(K15, chunk))
+            except OverflowError:
+                absolute = math.inf
+            if not math.isfinite(absolute) or not math.isfinite(gauss):
+                # Values filled in at an end of a divergent integral (1/x^2 from 0) end up here
+                raise IntegrationError("Integral is infinite or too large for a float")
+            intervals.append((abs(kronrod - gauss), kronrod, absolute, k, lo, hi))
+        error = math.fsum(interval[0] for interval in intervals)
+        limit = tolerance * math.fsum(interval[2] for interval in intervals)
+        if error <= limit:
+            return math.fsum(interval[1] for interval in intervals)
+
+        intervals.sort(reverse=True)
+        excess = error - 0.5 * limit
+        pending = []
+        kept = []
+        for interval in intervals:
+            k, lo, hi = interval[3:]
+            mid = 0.5 * (lo + hi)
+            if excess > 0 and lo < mid < hi:
+                excess -= interval[0]
+                pending.extend(((k, lo, mid), (k, mid, hi)))
+            else:
+                kept.append(interval)
+        if not pending:
+            raise IntegrationError(f"integrate() cannot reach the tolerance at double precision "
+                                   f"(error estimate {error:.2g})")
+        intervals = kept
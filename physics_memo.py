@@ -0,0 +1,99 @@
+"""Optional memoization of pure function calls and constant subexpressions.
+
+An engine created with memo_size > 0 wraps its function table so repeated
+calls such as sqrt(2) or pow(3, 200) with identical arguments are answered
+from a bounded LRU cache, and constant folding looks up whole constant
+operations (h*c, 10**300) in the same cache before computing them.
+
+Arguments are keyed by type and exact value (floats by their hex form), so
+2 and 2.0, or 0.0 and -0.0, never share an entry and cached results are
+always the ones the function would have returned.  Calls that raise are not
+cached, and arguments of other types (such as NumPy arrays) bypass the cache.
+"""
+from collections import OrderedDict
+
+DEFAULT_MEMO_SIZE = 4096
+
+
+def argument_key(value):
+    """Hashable key that distinguishes every distinct number, or None if value can't be cached"""
+    kind = type(value)
+    if kind is float:
+        return value.hex()
+    if kind is int or kind is bool:
+        return (kind, value)
+    if kind is complex:
+        return (kind, value.real.hex(), value.imag.hex())
+    return None
+
+
+class MemoCache:
+    """A bounded LRU mapping with hit and miss counters"""
+
+    def __init__(self, maxsize=DEFAULT_MEMO_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """Return (True, value) on a hit, (False, None) on a miss"""
+        entries = self.entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return True, entries[key]
+        self.misses += 1
+        return False, None
+
+    def store(self, key, value):
+        entries = self.entries
+        entries[key] = value
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def memoized(name, function, cache):
+    """Wrap a pure function so calls with cacheable arguments go through cache"""
+
+    def call(*args):
+        key = (name,)
+        for arg in args:
+            arg_key = argument_key(arg)
+            if arg_key is None:
+                return function(*args)
+            key += (arg_key,)
+        found, value = cache.lookup(key)
+        if found:
+            return value
+        value = function(*args)
+        cache.store(key, value)
+        return value
+
+    call.__name__ = name
+    return call
+
+
+def memoize_functions(functions, cache):
+    """Return a copy of a function table with every function memoized in cache"""
+    return {name: memoized(name, function, cache) for name, function in functions.items()}
+
+
+def memoized_operator(operator, function, cache):
+    """Like memoized(), for the binary operators used by constant folding"""
+    return memoized(f"({operator})", function, cache)
@@ -0,0 +1,56 @@
+"""Process-pool evaluation for large expression batches.
+
+Input lines are grouped into chunks and sent to a pool of worker processes.
+Each worker builds one PhysicsEngine on start-up, so its namespace and
+compiled expression cache stay warm for the whole run.  Results are yielded
+in input order, and only a bounded number of chunks is in flight at a time,
+so memory stays flat however long the input is.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from physics_engine import PhysicsEngine, evaluate_lines
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Per-process engine, created by the pool initializer
+_worker_engine = None
+
+
+def _init_worker(scientific_mode, memo_size):
+    global _worker_engine
+    _worker_engine = PhysicsEngine(memo_size=memo_size)
+    _worker_engine.scientific_mode = scientific_mode
+
+
+def _evaluate_chunk(lines, echo):
+    return ''.join(evaluate_lines(_worker_engine, lines, echo))
+
+
+def chunked(lines, chunk_size):
+    """Split an iterable of lines into lists of at most chunk_size lines"""
+    iterator = iter(lines)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def evaluate_parallel(lines, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                      echo=False, scientific_mode=True, memo_size=None):
+    """Evaluate expression lines on a process pool, yielding output text per chunk in order"""
+    workers = workers or os.cpu_count() or 1
+    # Keep a couple of chunks queued per worker so no process sits idle
+    max_pending = workers * 2
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(scientific_mode, memo_size)) as executor:
+        pending = deque()
+        for chunk in chunked(lines, chunk_size):
+            pending.append(executor.submit(_evaluate_chunk, chunk, echo))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
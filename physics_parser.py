@@ -0,0 +1,758 @@
+"""Tokenizer, Pratt parser and stack VM for calculator expressions.
+
+The grammar covers exactly what the calculator needs: numbers (including the
+"1.5×10^3" notation), constant/unit/variable names with Unicode symbols such
+as ℏ, ε₀ and R∞, function calls, + - * / × ÷, ^ or ** for powers and unary
+signs, integrate()/sum() over a bound variable, and values with an
+uncertainty written "9.81 ± 0.02" or "9.81 +/- 0.02".  Expressions are parsed
+into a small tuple-based tree, constant-only subtrees are folded to single
+values, and the rest is compiled to a flat list of (opcode, argument)
+instructions, computing repeated subexpressions only once.  run() evaluates
+the instructions with a value stack; a Program also links them into nested
+closures once (see link), which replay two to three times faster.  Nothing is
+looked up through Python's eval, so there is no way to reach builtins or
+attributes from an expression.
+
+Operators follow Python's precedence and associativity, and arithmetic is
+done with the ordinary Python operators, so results are identical to the old
+eval-based path.  The same compiled program runs on NumPy arrays when given
+a table of vectorized functions.
+"""
+import math
+import operator
+import re
+import sys
+import unicodedata
+from decimal import Decimal
+
+# Tree node tags
+NUM = 'num'
+NAME = 'name'
+NEG = 'neg'
+POS = 'pos'
+BINOP = 'bin'
+CALL = 'call'
+LAMBDA = 'lambda'
+UNCERTAIN = 'uncertain'
+
+# Opcodes
+OP_CONST = 0
+OP_LOAD = 1
+OP_ADD = 2
+OP_SUB = 3
+OP_MUL = 4
+OP_DIV = 5
+OP_POW = 6
+OP_NEG = 7
+OP_CALL1 = 8
+OP_CALL = 9
+OP_STORE = 10
+OP_RECALL = 11
+OP_CLOSURE = 12
+
+BINARY_OPCODES = {'+': OP_ADD, '-': OP_SUB, '*': OP_MUL, '/': OP_DIV, '**': OP_POW}
+# Integer powers are exact, so their cost grows with the size of the result.
+# Anything past this many bits could not be shown as a float anyway.
+MAX_INT_POWER_BITS = 1 << 16
+
+
+def checked_pow(base, exponent, modulus=None):
+    """pow() that refuses integer results too large to compute in reasonable time
+
+    CPython holds the GIL for the whole of a big integer power, so an input
+    like 10**10**9 would freeze every thread of the application.  The size
+    of the result is checked whatever the exponent, since a small exponent
+    of a large base, (((10**64)**64)**64)**64, is just as slow.
+    """
+    if (modulus is None and type(exponent) is int and type(base) is int
+            and exponent * base.bit_length() > MAX_INT_POWER_BITS):
+        raise OverflowError("integer power result too large")
+    if modulus is None:
+        return base ** exponent
+    return pow(base, exponent, modulus)
+
+
+BINARY_OPERATORS = {'+': operator.add, '-': operator.sub, '*': operator.mul,
+                    '/': operator.truediv, '**': checked_pow}
+
+# Functions whose first two arguments are an expression and the variable it
+# is a function of, e.g. integrate(x**2, x, 0, 1); that variable is local to
+# the expression and hides any constant or unit of the same name
+BINDING_FUNCTIONS = {
+    'integrate': "integrate(expression, variable, from, to[, tolerance[, budget]])",
+    'sum': "sum(expression, variable, from, to[, tolerance[, budget]])",
+}
+
+# Alternative spellings accepted in input
+OPERATOR_ALIASES = {'^': '**', '×': '*', '·': '*', '÷': '/', '−': '-', '+/-': '±'}
+
+# Binding powers for infix operators (and their aliases).  ± binds tighter
+# than * and /, so 9.81±0.02*m/s^2 is (9.81±0.02) m/s²
+BINDING_POWER = {'+': 10, '-': 10, '*': 20, '/': 20, '±': 25, '**': 40}
+BINDING_POWER.update((alias, BINDING_POWER[op]) for alias, op in OPERATOR_ALIASES.items())
+UNARY_POWER = 30
+
+# One match per token; whitespace between tokens is skipped by findall
+TOKEN_PATTERN = re.compile(r'\*\*|\+/-|[-+*/^×·÷−(),±]|\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?'
+                           r'|[^\W\d][\w∞]*|∞|\S')
+NUMBER_START = frozenset('0123456789.')
+PLAIN_MANTISSA = re.compile(r'\d+\.?\d*$')
+# A number token whose mantissa is not zero
+NONZERO_DIGIT = re.compile(r'[0.]*[1-9]')
+MIN_NORMAL = sys.float_info.min
+END = ''
+
+
+class ExpressionError(SyntaxError):
+    """Raised for input that is not a valid calculator expression"""
+
+
+def parse_number(text):
+    """The value of a number token: an int, a float, or a Decimal for a float out of range
+
+    "inf" (the value of ∞ in the data file) is the float infinity.
+    """
+    if text == 'inf':
+        return math.inf
+    if '.' in text or 'e' in text or 'E' in text:
+        return out_of_range(float(text), text)
+    return int(text)
+
+
+def out_of_range(value, text):
+    """value, or Decimal(text) if the float value overflowed or lost digits to underflow
+
+    physics_precision evaluates expressions with a Decimal in them in
+    decimal arithmetic, so 1e400 and a reused result such as 1.97E+434
+    keep their value.
+    """
+    if MIN_NORMAL <= abs(value) < math.inf or value == 0 and not NONZERO_DIGIT.match(text):
+        return value
+    return Decimal(text)
+
+
+def tokenize(text):
+    """Split expression text into token strings"""
+    return TOKEN_PATTERN.findall(text)
+
+
+def scientific_notation(tokens, index):
+    """True if tokens[index] is the '×' of an 'm×10^n' literal"""
+    return (tokens[index] == '×' and PLAIN_MANTISSA.match(tokens[index - 1])
+            and tokens[index + 1] == '10' and tokens[index + 2] in ('^', '**')
+            and scientific_exponent(tokens, index + 3) is not None)
+
+
+def scientific_exponent(tokens, index):
+    """Parse the signed integer exponent starting at tokens[index]; return (n, next index)"""
+    sign = 1
+    if tokens[index:index + 1] in (['+'], ['-']):
+        sign = -1 if tokens[index] == '-' else 1
+        index += 1
+    if index < len(tokens) and tokens[index].isdigit():
+        return sign * int(tokens[index]), index + 1
+    return None
+
+
+def parse(text):
+    """Parse expression text into a tree with a Pratt (precedence climbing) parser"""
+    tokens = tokenize(text)
+    tokens.append(END)
+    if tokens[0] == END:
+        raise ExpressionError("Empty expression")
+    position = 0
+
+    def expression(right_power):
+        nonlocal position
+        left = prefix()
+        while True:
+            operator = tokens[position]
+            power = BINDING_POWER.get(operator)
+            if power is None or power <= right_power:
+                return left
+            position += 1
+            operator = OPERATOR_ALIASES.get(operator, operator)
+            # ** is right-associative, everything else left-associative
+            right = expression(power - 1 if operator == '**' else power)
+            left = (UNCERTAIN, left, right) if operator == '±' else (BINOP, operator, left, right)
+
+    def prefix():
+        nonlocal position
+        token = tokens[position]
+        position += 1
+        first = token[:1]
+        if first in NUMBER_START:
+            if token == '.':
+                raise ExpressionError("Unexpected '.'")
+            value = parse_number(token)
+            if tokens[position] == '×' and scientific_notation(tokens, position):
+                # "m×10^n" is one literal, evaluated as (m * 10**n); a power of ten
+                # too large to compute as an int is read as a Decimal instead
+                exponent, position = scientific_exponent(tokens, position + 3)
+                try:
+                    value = value * checked_pow(10, exponent)
+                except OverflowError:
+                    value = math.inf
+                if type(value) is float:
+                    value = out_of_range(value, f"{token}e{exponent}")
+            return (NUM, value)
+        if first.isalpha() or first == '_' or first == '∞':
+            if tokens[position] == '(':
+                position += 1
+                return (CALL, token, arguments())
+            return (NAME, token)
+        if token == '(':
+            inner = expression(0)
+            if tokens[position] != ')':
+                found = tokens[position] or 'end of input'
+                raise ExpressionError(f"Expected ')' but found {found}")
+            position += 1
+            return inner
+        if token == '-' or token == '−':
+            return (NEG, expression(UNARY_POWER))
+        if token == '+':
+            return (POS, expression(UNARY_POWER))
+        if token == END:
+            raise ExpressionError("Unexpected end of expression")
+        raise ExpressionError(f"Unexpected '{token}'")
+
+    def arguments():
+        nonlocal position
+        args = []
+        if tokens[position] == ')':
+            position += 1
+            return ()
+        while True:
+            args.append(expression(0))
+            token = tokens[position]
+            position += 1
+            if token == ')':
+                return tuple(args)
+            if token != ',':
+                raise ExpressionError("Expected ',' or ')' in function call")
+
+    tree = expression(0)
+    if tokens[position] != END:
+        raise ExpressionError(f"Unexpected '{tokens[position]}'")
+    return tree
+
+
+def resolve_symbol(name, symbols, aliases):
+    """Look up a constant or unit, accepting NFKC spellings such as 'me' for 'mₑ'"""
+    if name in symbols:
+        return name
+    return aliases.get(unicodedata.normalize('NFKC', name))
+
+
+def symbol_aliases(symbols):
+    """Map NFKC-normalized names to the symbols they stand for"""
+    aliases = {}
+    for symbol in symbols:
+        aliases.setdefault(unicodedata.normalize('NFKC', symbol), symbol)
+    return aliases
+
+
+class ShadowedSymbols:
+    """A symbol table (or alias or dimension table) with one name hidden"""
+
+    def __init__(self, symbols, name):
+        self.symbols = symbols
+        self.name = name
+
+    def __contains__(self, name):
+        return name != self.name and name in self.symbols
+
+    def __getitem__(self, name):
+        if name == self.name:
+            raise KeyError(name)
+        return self.symbols[name]
+
+    def get(self, name, default=None):
+        return default if name == self.name else self.symbols.get(name, default)
+
+
+def shadow(symbols, aliases, name):
+    """symbols and aliases with a bound variable's name hidden from both"""
+    return ShadowedSymbols(symbols, name), ShadowedSymbols(aliases, unicodedata.normalize('NFKC', name))
+
+
+def binding_arguments(node):
+    """Check the arguments of an integrate()/sum() call; returns the bound variable's name"""
+    name, args = node[1], node[2]
+    if not 4 <= len(args) <= 6 or args[1][0] != NAME:
+        raise ExpressionError(f"Usage: {BINDING_FUNCTIONS[name]}")
+    return args[1][1]
+
+
+def free_variables(tree, symbols, aliases=None):
+    """Return the names in a tree that are not constants or units, in order of appearance"""
+    if aliases is None:
+        aliases = symbol_aliases(symbols)
+    names = []
+
+    def visit(node):
+        tag = node[0]
+        if tag == NAME:
+            if resolve_symbol(node[1], symbols, aliases) is None and node[1] not in names:
+                names.append(node[1])
+        elif tag == BINOP:
+            visit(node[2])
+            visit(node[3])
+        elif tag in (NEG, POS):
+            visit(node[1])
+        elif tag == UNCERTAIN:
+            visit(node[1])
+            visit(node[2])
+        elif tag == CALL and node[1] in BINDING_FUNCTIONS:
+            bound = binding_arguments(node)
+            inner = free_variables(node[2][0], *shadow(symbols, aliases, bound))
+            names.extend(name for name in inner if name != bound and name not in names)
+            for arg in node[2][2:]:
+                visit(arg)
+        elif tag == CALL:
+            for arg in node[2]:
+                visit(arg)
+
+    visit(tree)
+    return tuple(names)
+
+
+class Program:
+    """A compiled expression: flat instruction list plus its free variables
+
+    dims is the result's dimension when the engine has worked it out (see
+    physics_units), otherwise None.  uncertain lists the expression's ±
+    values as (variable, value, uncertainty); the code reads each one from
+    its variable, which physics_uncertainty fills with samples.  precision
+    is the number of decimal digits the expression turned out to need (0
+    when floats are enough, None before physics_precision has checked).
+    """
+    __slots__ = ('source', 'tree', 'code', 'variables', 'temps', 'dims', 'uncertain', 'precision', 'function')
+
+    def __init__(self, source, tree, code, variables, temps=0, dims=None, uncertain=()):
+        self.source = source
+        self.tree = tree
+        self.code = code
+        self.variables = variables
+        self.temps = temps
+        self.dims = dims
+        self.uncertain = uncertain
+        self.precision = None
+        # The instructions as linked closures (see link), which replay faster than run()
+        self.function = link(code)
+
+    def run(self, functions, variables=None):
+        return self.function(functions, variables, [None] * self.temps if self.temps else None)
+
+    def is_constant(self):
+        """True if the whole expression folded to a single value"""
+        return len(self.code) == 1 and self.code[0][0] == OP_CONST
+
+
+class Closure:
+    """The expression argument of integrate()/sum(), as those functions receive it
+
+    Calling it with a value (or an array of values) for the bound variable
+    runs the compiled body with the variables and functions of the program
+    that created it; another function table (e.g. vectorized functions)
+    can be given instead.
+    """
+    __slots__ = ('variable', 'program', 'functions', 'variables')
+
+    def __init__(self, variable, program, functions, variables=None):
+        self.variable = variable
+        self.program = program
+        self.functions = functions
+        self.variables = variables
+
+    def __call__(self, value, functions=None):
+        variables = dict(self.variables) if self.variables else {}
+        variables[self.variable] = value
+        return self.program.run(self.functions if functions is None else functions, variables)
+
+    def bind(self, variables):
+        """The same closure with other values for the enclosing variables"""
+        return Closure(self.variable, self.program, self.functions, variables)
+
+
+def fold_constants(tree, symbols, functions, aliases=None, variables=None, operators=BINARY_OPERATORS,
+                   bodies=None, inputs=None):
+    """Resolve constants and units and fold every subtree that does not depend on a variable
+
+    Folding applies the same Python operators and functions as the VM, so a
+    folded value is exactly the value the program would have computed.
+    Operations that raise (such as 1/0) are left in place so the error is
+    reported when the expression is evaluated.  Operands are never
+    reassociated: x*h*c parses as (x*h)*c and is left alone, while h*c*x
+    folds h*c.  Names that are not constants or units are appended to
+    variables, if given.  operators maps each binary operator to the
+    function used to fold it (the engine passes memoized ones).
+
+    The expression argument of integrate()/sum() becomes a LAMBDA node
+    holding its own compiled Program; bodies, if given, caches those
+    programs by structure so repeated integrands are compiled once.  Calls
+    whose body depends only on the bound variable and whose limits are
+    constants are folded like any other call.
+
+    With an inputs list, each "value ± uncertainty" becomes a variable named
+    ±1, ±2... (never a valid input name) and (name, value, uncertainty) is
+    appended to inputs; both sides must fold to numbers.  Without one, ±
+    subtrees are left in place and never folded.
+    """
+    if aliases is None:
+        aliases = symbol_aliases(symbols)
+
+    def visit(node):
+        tag = node[0]
+        if tag == NUM:
+            return node
+        if tag == NAME:
+            symbol = resolve_symbol(node[1], symbols, aliases)
+            if symbol is None:
+                if variables is not None and node[1] not in variables:
+                    variables.append(node[1])
+                return node
+            return (NUM, symbols[symbol])
+        if tag == BINOP:
+            left = visit(node[2])
+            right = visit(node[3])
+            if left[0] == NUM and right[0] == NUM:
+                try:
+                    return (NUM, operators[node[1]](left[1], right[1]))
+                except Exception:
+                    pass
+            return (BINOP, node[1], left, right)
+        if tag == NEG:
+            operand = visit(node[1])
+            if operand[0] == NUM:
+                return (NUM, -operand[1])
+            return (NEG, operand)
+        if tag == POS:
+            return visit(node[1])
+        if tag == UNCERTAIN:
+            return visit_uncertain(node)
+        if tag == CALL:
+            name = node[1]
+            if name not in functions:
+                raise ExpressionError(f"Unknown function '{name}'")
+            if name in BINDING_FUNCTIONS:
+                return visit_binding(node)
+            args = tuple(visit(arg) for arg in node[2])
+            if all(arg[0] == NUM for arg in args):
+                try:
+                    return (NUM, functions[name](*[arg[1] for arg in args]))
+                except Exception:
+                    pass
+            return (CALL, name, args)
+        raise ExpressionError(f"Unknown node '{tag}'")
+
+    def visit_uncertain(node):
+        value, spread = visit(node[1]), visit(node[2])
+        if inputs is None:
+            return (UNCERTAIN, value, spread)
+        if (value[0] != NUM or spread[0] != NUM or isinstance(value[1], complex)
+                or isinstance(spread[1], complex)):
+            raise ExpressionError("Both sides of '±' must be numbers or constants")
+        if spread[1] < 0:
+            raise ExpressionError("The uncertainty after '±' cannot be negative")
+        name = f"±{len(inputs) + 1}"
+        inputs.append((name, value[1], spread[1]))
+        if variables is not None:
+            variables.append(name)
+        return (NAME, name)
+
+    def visit_binding(node):
+        name, args = node[1], node[2]
+        bound = binding_arguments(node)
+        inner_symbols, inner_aliases = shadow(symbols, aliases, bound)
+        inner_variables = []
+        # The body's ± values are read from variables of the enclosing program
+        body = fold_constants(args[0], inner_symbols, functions, inner_aliases, inner_variables,
+                              operators, bodies, inputs if inputs is not None else [])
+        enclosing = [variable for variable in inner_variables if variable != bound]
+        if variables is not None:
+            variables.extend(variable for variable in enclosing if variable not in variables)
+
+        key = (bound, structure_keys(body)[id(body)])
+        program = bodies.get(key) if bodies is not None else None
+        if program is None:
+            code, temps = generate(body, functions)
+            program = Program(None, body, code, tuple(inner_variables), temps)
+            if bodies is not None:
+                bodies[key] = program
+        rest = tuple(visit(arg) for arg in args[2:])
+        if not enclosing and all(arg[0] == NUM for arg in rest):
+            try:
+                closure = Closure(bound, program, functions)
+                return (NUM, functions[name](closure, *[arg[1] for arg in rest]))
+            except Exception:
+                pass
+        return (CALL, name, ((LAMBDA, bound, program),) + rest)
+
+    return visit(tree)
+
+
+def structure_keys(tree):
+    """Map id(node) to a hashable key that is equal for structurally identical subtrees
+
+    Number leaves include their type, so 2 and 2.0 are not merged.
+    """
+    keys = {}
+
+    def visit(node):
+        tag = node[0]
+        if tag == NUM:
+            key = (NUM, type(node[1]), node[1])
+        elif tag == NAME:
+            key = node
+        elif tag == BINOP:
+            key = (BINOP, node[1], visit(node[2]), visit(node[3]))
+        elif tag == CALL:
+            key = (CALL, node[1], tuple(visit(arg) for arg in node[2]))
+        elif tag == LAMBDA:
+            body = node[2].tree
+            key = (LAMBDA, node[1], structure_keys(body)[id(body)])
+        else:
+            key = (tag, visit(node[1]))
+        keys[id(node)] = key
+        return key
+
+    visit(tree)
+    return keys
+
+
+def repeated_subtrees(tree, keys):
+    """Return the keys of operation subtrees that occur more than once"""
+    counts = {}
+
+    def visit(node):
+        tag = node[0]
+        if tag == NUM or tag == NAME:
+            return
+        key = keys[id(node)]
+        if key in counts:
+            # Parts of a repeated subtree are only computed once, so don't count them again
+            counts[key] += 1
+            return
+        counts[key] = 1
+        if tag == BINOP:
+            visit(node[2])
+            visit(node[3])
+        elif tag == CALL:
+            for arg in node[2]:
+                visit(arg)
+        elif tag != LAMBDA:
+            # A LAMBDA's body is a separate program, with its own temporaries
+            visit(node[1])
+
+    visit(tree)
+    return {key for key, count in counts.items() if count > 1}
+
+
+def generate(tree, functions):
+    """Compile a folded tree into (instructions, number of temporaries)
+
+    Repeated subexpressions are computed once, stored in a temporary slot and
+    reloaded for later occurrences.
+    """
+    code = []
+    emit = code.append
+    keys = structure_keys(tree) if tree[0] != NUM else {}
+    shared = repeated_subtrees(tree, keys) if keys else ()
+    slots = {}
+
+    def visit(node):
+        tag = node[0]
+        if tag == NUM:
+            emit((OP_CONST, node[1]))
+            return
+        if tag == NAME:
+            emit((OP_LOAD, node[1]))
+            return
+        key = keys[id(node)]
+        if key in slots:
+            emit((OP_RECALL, slots[key]))
+            return
+        if tag == BINOP:
+            visit(node[2])
+            visit(node[3])
+            emit((BINARY_OPCODES[node[1]], None))
+        elif tag == NEG:
+            visit(node[1])
+            emit((OP_NEG, None))
+        elif tag == POS:
+            visit(node[1])
+        elif tag == LAMBDA:
+            emit((OP_CLOSURE, (node[1], node[2])))
+        elif tag == CALL:
+            name, args = node[1], node[2]
+            if name not in functions:
+                raise ExpressionError(f"Unknown function '{name}'")
+            for arg in args:
+                visit(arg)
+            if len(args) == 1:
+                emit((OP_CALL1, name))
+            else:
+                emit((OP_CALL, (name, len(args))))
+        else:
+            raise ExpressionError(f"Unknown node '{tag}'")
+        if key in shared:
+            slots[key] = len(slots)
+            emit((OP_STORE, slots[key]))
+
+    visit(tree)
+    return code, len(slots)
+
+
+def compile_expression(text, symbols, functions, aliases=None, operators=BINARY_OPERATORS, bodies=None):
+    """Parse, fold and compile expression text into a Program"""
+    tree = parse(text)
+    variables = []
+    inputs = []
+    folded = fold_constants(tree, symbols, functions, aliases, variables, operators, bodies, inputs)
+    code, temps = generate(folded, functions)
+    if inputs:
+        names = {name for name, value, spread in inputs}
+        variables = [name for name in variables if name not in names]
+    return Program(text, tree, code, tuple(variables), temps, uncertain=tuple(inputs))
+
+
+def run(code, functions, variables=None, temps=0):
+    """Execute compiled instructions and return the value left on the stack"""
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    slots = [None] * temps if temps else None
+    for op, arg in code:
+        if op == OP_CONST:
+            push(arg)
+        elif op == OP_MUL:
+            right = pop()
+            stack[-1] = stack[-1] * right
+        elif op == OP_DIV:
+            right = pop()
+            stack[-1] = stack[-1] / right
+        elif op == OP_POW:
+            right = pop()
+            if type(right) is int and type(stack[-1]) is int:
+                stack[-1] = checked_pow(stack[-1], right)
+            else:
+                stack[-1] = stack[-1] ** right
+        elif op == OP_ADD:
+            right = pop()
+            stack[-1] = stack[-1] + right
+        elif op == OP_SUB:
+            right = pop()
+            stack[-1] = stack[-1] - right
+        elif op == OP_NEG:
+            stack[-1] = -stack[-1]
+        elif op == OP_CALL1:
+            stack[-1] = functions[arg](stack[-1])
+        elif op == OP_LOAD:
+            if variables is None or arg not in variables:
+                raise NameError(f"name '{arg}' is not defined")
+            push(variables[arg])
+        elif op == OP_RECALL:
+            push(slots[arg])
+        elif op == OP_STORE:
+            slots[arg] = stack[-1]
+        elif op == OP_CLOSURE:
+            push(Closure(arg[0], arg[1], functions, variables))
+        else:
+            name, count = arg
+            args = stack[-count:] if count else []
+            del stack[len(stack) - count:]
+            push(functions[name](*args))
+    return stack[0]
+
+
+def link(code):
+    """Turn instructions into nested closures that compute what run() computes
+
+    Each instruction becomes a function of (functions, variables, slots)
+    that calls the functions for its operands, so a program is replayed
+    without decoding opcodes or keeping a value stack.  The operations, and
+    the order they happen in, are exactly those of run(); slots holds the
+    temporaries of repeated subexpressions (None if there are none).
+    """
+
+    def constant(value):
+        return lambda functions, variables, slots: value
+
+    def load(name):
+        def load(functions, variables, slots):
+            try:
+                return variables[name]
+            except (KeyError, TypeError):
+                raise NameError(f"name '{name}' is not defined") from None
+        return load
+
+    def binary(op, left, right):
+        if op == OP_ADD:
+            return lambda functions, variables, slots: (left(functions, variables, slots)
+                                                        + right(functions, variables, slots))
+        if op == OP_SUB:
+            return lambda functions, variables, slots: (left(functions, variables, slots)
+                                                        - right(functions, variables, slots))
+        if op == OP_MUL:
+            return lambda functions, variables, slots: (left(functions, variables, slots)
+                                                        * right(functions, variables, slots))
+        if op == OP_DIV:
+            return lambda functions, variables, slots: (left(functions, variables, slots)
+                                                        / right(functions, variables, slots))
+
+        def power(functions, variables, slots):
+            base = left(functions, variables, slots)
+            exponent = right(functions, variables, slots)
+            if type(exponent) is int and type(base) is int:
+                return checked_pow(base, exponent)
+            return base ** exponent
+        return power
+
+    def negate(operand):
+        return lambda functions, variables, slots: -operand(functions, variables, slots)
+
+    def call1(name, arg):
+        return lambda functions, variables, slots: functions[name](arg(functions, variables, slots))
+
+    def call(name, args):
+        return lambda functions, variables, slots: functions[name](*[arg(functions, variables, slots)
+                                                                    for arg in args])
+
+    def store(index, operand):
+        def store(functions, variables, slots):
+            slots[index] = value = operand(functions, variables, slots)
+            return value
+        return store
+
+    def recall(index):
+        return lambda functions, variables, slots: slots[index]
+
+    def closure(bound, program):
+        return lambda functions, variables, slots: Closure(bound, program, functions, variables)
+
+    stack = []
+    for op, arg in code:
+        if op == OP_CONST:
+            stack.append(constant(arg))
+        elif op == OP_LOAD:
+            stack.append(load(arg))
+        elif op == OP_NEG:
+            stack[-1] = negate(stack[-1])
+        elif op == OP_CALL1:
+            stack[-1] = call1(arg, stack[-1])
+        elif op == OP_RECALL:
+            stack.append(recall(arg))
+        elif op == OP_STORE:
+            stack[-1] = store(arg, stack[-1])
+        elif op == OP_CLOSURE:
+            stack.append(closure(*arg))
+        elif op == OP_CALL:
+            name, count = arg
+            args = tuple(stack[len(stack) - count:])
+            del stack[len(stack) - count:]
+            stack.append(call(name, args))
+        else:
+            right = stack.pop()
+            stack[-1] = binary(op, stack[-1], right)
+    return stack[0]
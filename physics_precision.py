@@ -0,0 +1,389 @@
+"""Precision tiers: floats first, decimal arithmetic when floats give a wrong answer.
+
+    euler**1000                       overflows a float
+    exp(-1000)                        underflows to 0.0
+    (1e16 + 1) - 1e16                 cancels every digit
+    1.00782503223*u - 1.00782503207*u cancels most of them
+
+An expression runs on floats first, as always.  The first evaluation of
+one with a + or - is also checked: a walk over the parse tree with the same float operations
+measures how many significant digits each + and - cancels, and notes any
+intermediate value that overflowed or underflowed.  An expression that
+cancels CANCELLATION_DIGITS or more, or whose float result raised
+OverflowError, is infinite, NaN, zero or subnormal, is evaluated again in
+decimal arithmetic at PHYSICS_CALC_PRECISION significant digits (50 by
+default; 0 turns the tiers off).  The decimal tier takes constants and
+units from the digits they are written with, not from their nearest
+floats, and computes π and euler to full precision.
+
+An expression whose decimal value differs from its float value keeps
+using decimals; the choice is remembered on its compiled Program, so
+typical expressions pay only for the float run and one cheap check of the
+result.  A decimal value that fits a float (after cancellation, say) is
+returned as a float; one outside the float range is returned as a Decimal.
+The parser reads number literals outside the float range (1e400, or an
+earlier result typed back in as 1.97E+434) as Decimals, and expressions
+containing them are evaluated in decimal arithmetic from the start.
+Expressions using integrate(), sum() or functions without a decimal
+version stay on floats, as does any expression whose decimal evaluation
+fails, and ± expressions are left to Monte Carlo sampling.
+"""
+import math
+import operator
+import os
+import sys
+from collections import OrderedDict
+from decimal import MAX_EMAX, MIN_EMIN, Decimal, localcontext
+
+from physics_parser import (BINARY_OPERATORS, BINOP, CALL, NAME, NEG, NUM, POS, fold_constants, generate,
+                            resolve_symbol, run)
+
+DEFAULT_DIGITS = 50
+# Significant digits a float result may lose to cancellation before it is recomputed
+CANCELLATION_DIGITS = 6
+MIN_NORMAL = sys.float_info.min
+# Operators that can start a sum or difference in expression text
+SIGNS = ('+', '-', '−')
+# Compiled decimal programs kept per Precision
+CACHE_SIZE = 1024
+NO_ALIASES = {}
+
+
+def to_decimal(value):
+    """A number as a Decimal with the digits it would be written with"""
+    if isinstance(value, Decimal):
+        return value
+    if type(value) is int:
+        return Decimal(value)
+    if type(value) is float:
+        # repr is the shortest text that reads back as value, so 1.67262192369e-27 stays exact
+        return Decimal(repr(value))
+    raise TypeError(f"No decimal value for {type(value).__name__}")
+
+
+_pi = {}
+
+
+def decimal_pi():
+    """π to the current context's precision (the series from the decimal module documentation)"""
+    with localcontext() as context:
+        digits = context.prec
+        if digits not in _pi:
+            context.prec += 2
+            three = Decimal(3)
+            last, t, total, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+            while total != last:
+                last = total
+                n, na = n + na, na + 8
+                d, da = d + da, da + 32
+                t = (t * n) / d
+                total += t
+            _pi[digits] = total
+    return +_pi[digits]
+
+
+def decimal_euler():
+    return Decimal(1).exp()
+
+
+def decimal_sin_cos(x):
+    """(sin x, cos x) by their Taylor series, after reducing x to one turn"""
+    with localcontext() as context:
+        context.prec += 2
+        x = x % (2 * decimal_pi())
+        square = x * x
+        sine = term = x
+        cosine = cosine_term = Decimal(1)
+        n = 1
+        while True:
+            term = -term * square / ((n + 1) * (n + 2))
+            cosine_term = -cosine_term * square / (n * (n + 1))
+            if sine + term == sine and cosine + cosine_term == cosine:
+                break
+            sine += term
+            cosine += cosine_term
+            n += 2
+    return +sine, +cosine
+
+
+def decimal_tan(x):
+    sine, cosine = decimal_sin_cos(x)
+    return sine / cosine
+
+
+def decimal_expm1(x):
+    with localcontext() as context:
+        # exp(x) - 1 cancels as many leading digits as x has leading zeros
+        context.prec += max(0, -x.adjusted())
+        value = x.exp() - 1
+    return +value
+
+
+def decimal_cbrt(x):
+    # x**(1/3) on floats gives a complex root for negative x; there is no decimal one
+    return x ** (Decimal(1) / 3)
+
+
+# Decimal versions of the engine's scalar functions
+DECIMAL_FUNCTIONS = {
+    'sqrt': lambda x: x.sqrt(),
+    'cbrt': decimal_cbrt,
+    'log10': lambda x: x.log10(),
+    'ln': lambda x: x.ln(),
+    'sin': lambda x: decimal_sin_cos(x)[0],
+    'cos': lambda x: decimal_sin_cos(x)[1],
+    'tan': decimal_tan,
+    'exp': lambda x: x.exp(),
+    'expm1': decimal_expm1,
+    'abs': abs,
+    'pow': operator.pow,
+}
+DECIMAL_OPERATORS = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv,
+                     '**': operator.pow}
+# Mathematical constants, which the data file can only give to float precision
+DECIMAL_CONSTANTS = {'π': decimal_pi, 'euler': decimal_euler}
+
+
+class DecimalSymbols:
+    """A namespace's constants and units as Decimals, except the names in hidden"""
+
+    def __init__(self, namespace, hidden=()):
+        self.namespace = namespace
+        self.hidden = hidden
+
+    def __contains__(self, name):
+        return name not in self.hidden and name in self.namespace
+
+    def __getitem__(self, name):
+        if name in DECIMAL_CONSTANTS and name not in self.namespace.overrides:
+            return DECIMAL_CONSTANTS[name]()
+        return to_decimal(self.namespace[name])
+
+
+def decimal_tree(node):
+    """The parse tree with every number leaf as a Decimal, or None if it has no decimal form"""
+    tag = node[0]
+    if tag == NUM:
+        return (NUM, to_decimal(node[1]))
+    if tag == NAME:
+        return node
+    if tag == BINOP:
+        left, right = decimal_tree(node[2]), decimal_tree(node[3])
+        if left is None or right is None:
+            return None
+        return (BINOP, node[1], left, right)
+    if tag == NEG or tag == POS:
+        operand = decimal_tree(node[1])
+        return None if operand is None else (tag, operand)
+    if tag == CALL and node[1] in DECIMAL_FUNCTIONS:
+        args = tuple(decimal_tree(arg) for arg in node[2])
+        return None if None in args else (CALL, node[1], args)
+    return None
+
+
+def has_decimal(variables):
+    """True if any input is a Decimal (an earlier result out of float range)"""
+    return variables is not None and Decimal in map(type, variables.values())
+
+
+def inexact(value):
+    """True for a float result that overflowed, underflowed or is undefined"""
+    return type(value) is float and not MIN_NORMAL <= abs(value) < math.inf
+
+
+def digits_lost(tree, symbols, functions, variables=None):
+    """Most significant digits cancelled by one + or - while evaluating tree on floats
+
+    Returns math.inf if an intermediate value overflowed or underflowed.
+    Raises whatever the float evaluation raises.
+    """
+    worst = 0.0
+
+    def visit(node):
+        nonlocal worst
+        tag = node[0]
+        if tag == NUM or tag == NAME:
+            if tag == NUM:
+                value = node[1]
+            elif variables and node[1] in variables:
+                value = variables[node[1]]
+            else:
+                value = symbols[resolve_symbol(node[1], symbols, NO_ALIASES)]
+            if type(value) is float and 0 < abs(value) < MIN_NORMAL:
+                # A subnormal input has already lost digits
+                worst = math.inf
+            return value
+        if tag == NEG:
+            return -visit(node[1])
+        if tag == POS:
+            return visit(node[1])
+        if tag == BINOP:
+            left, right = visit(node[2]), visit(node[3])
+            value = BINARY_OPERATORS[node[1]](left, right)
+            if type(value) is not float:
+                return value
+            if node[1] in '+-':
+                largest = max(abs(left), abs(right))
+                if value == 0 and largest:
+                    worst = math.inf
+                elif largest > abs(value):
+                    worst = max(worst, math.log10(largest / abs(value)))
+            elif inexact(value) and left and right and math.isfinite(left) and math.isfinite(right):
+                worst = math.inf
+            return value
+        args = [visit(arg) for arg in node[2]]
+        value = functions[node[1]](*args)
+        if inexact(value) and all(type(arg) in (int, float) and math.isfinite(arg) for arg in args):
+            worst = math.inf
+        return value
+
+    visit(tree)
+    return worst
+
+
+class Precision:
+    """Runs programs on floats, and again in decimal arithmetic when floats fall short"""
+
+    def __init__(self, namespace, digits=None, cache_size=CACHE_SIZE):
+        if digits is None:
+            digits = int(os.environ.get('PHYSICS_CALC_PRECISION') or DEFAULT_DIGITS)
+        self.namespace = namespace
+        # 0 turns escalation off
+        self.digits = digits
+        # Decimal programs by (source text, variables, digits); None for expressions without a decimal form
+        self.programs = OrderedDict()
+        self.cache_size = cache_size
+        self.escalations = 0
+
+    def clear(self):
+        self.programs.clear()
+
+    def run(self, program, functions, variables=None):
+        """Evaluate a program at the precision it needs; program.precision remembers it"""
+        precision = program.precision
+        if precision:
+            return self.evaluate_decimal(program, variables, precision)
+        try:
+            result = program.run(functions, variables)
+        except (OverflowError, TypeError):
+            # TypeError: a Decimal (a literal such as 1e400, or an input) met a float
+            if has_decimal(variables):
+                return self.evaluate_decimal(program, variables, self.digits or DEFAULT_DIGITS)
+            if not self.digits:
+                raise
+            result = self.escalate(program, variables, None)
+            if result is None:
+                raise
+            return result
+        if precision == 0 and (not program.variables or type(result) is float
+                               and MIN_NORMAL <= abs(result) < math.inf):
+            # Checked already, and an ordinary float again.  Without variables the
+            # result cannot change, so an exact zero (0*h) is settled by the first
+            # check too; with them a zero may be an underflow and is checked again.
+            return result
+        if has_decimal(variables):
+            # A decimal input (an earlier result out of float range) needs a decimal evaluation
+            return self.evaluate_decimal(program, variables, self.digits or DEFAULT_DIGITS)
+        if not self.digits:
+            return result
+        if isinstance(result, Decimal):
+            # Decimal literals or inputs beyond the float range keep the program in decimal arithmetic
+            value = self.escalate(program, variables, None)
+            return result if value is None else value
+        if program.precision is None:
+            return self.check(program, functions, variables, result)
+        if inexact(result):
+            return self.escalate(program, variables, result)
+        return result
+
+    def check(self, program, functions, variables, result):
+        """First evaluation of a program: look for cancellation as well as an inexact result"""
+        if type(result) not in (int, float) or variables and not all(
+                type(value) in (int, float) for value in variables.values()):
+            # Complex or array results are left to the float path
+            return result
+        program.precision = 0
+        if inexact(result):
+            return self.escalate(program, variables, result)
+        # Only sums and differences cancel; the text is a cheap first test for them
+        if type(result) is float and any(sign in program.source for sign in SIGNS):
+            try:
+                lost = digits_lost(program.tree, self.namespace, functions, variables)
+            except Exception:
+                return result
+            if lost >= CANCELLATION_DIGITS:
+                return self.escalate(program, variables, result)
+        return result
+
+    def escalate(self, program, variables, result):
+        """The decimal value of a program, remembering the tier if it differs from the float result
+
+        Returns result (None after an OverflowError) when there is no decimal value.
+        """
+        try:
+            value = self.evaluate_decimal(program, variables, self.digits)
+        except Exception:
+            return result
+        self.escalations += 1
+        if result is None or value != result:
+            program.precision = self.digits
+        return value
+
+    def decimal_program(self, program, digits):
+        key = (program.source, program.variables, digits)
+        if key in self.programs:
+            self.programs.move_to_end(key)
+            return self.programs[key]
+        compiled = None
+        tree = decimal_tree(program.tree)
+        if tree is not None:
+            # The float program's variables may include names that are also constants or units
+            symbols = DecimalSymbols(self.namespace, program.variables)
+            folded = fold_constants(tree, symbols, DECIMAL_FUNCTIONS, NO_ALIASES, None, DECIMAL_OPERATORS)
+            compiled = generate(folded, DECIMAL_FUNCTIONS)
+        self.programs[key] = compiled
+        if len(self.programs) > self.cache_size:
+            self.programs.popitem(last=False)
+        return compiled
+
+    def evaluate_decimal(self, program, variables, digits):
+        """Evaluate a program at digits significant digits; a float when the value fits one"""
+        with localcontext() as context:
+            context.prec = digits
+            context.Emax = MAX_EMAX
+            context.Emin = MIN_EMIN
+            compiled = self.decimal_program(program, digits)
+            if compiled is None:
+                raise ValueError("Expression has no decimal form")
+            code, temps = compiled
+            if variables:
+                variables = {name: to_decimal(value) for name, value in variables.items()}
+            value = run(code, DECIMAL_FUNCTIONS, variables, temps)
+        if not isinstance(value, Decimal):
+            value = to_decimal(value)
+        number = float(value)
+        if MIN_NORMAL <= abs(number) < math.inf or value == 0 or not value.is_finite():
+            return number
+        return value
+
+
+def format_decimal(number, scientific_mode=True):
+    """format_scientific for a Decimal beyond the float range, e.g. '1.970071×10^434'"""
+    if not scientific_mode or not number.is_finite():
+        return str(number)
+    if number == 0:
+        return "0"
+    exp = number.adjusted()
+    with localcontext() as context:
+        # The default context's exponent limits (±999999) are narrower than a result's
+        context.Emax = MAX_EMAX
+        context.Emin = MIN_EMIN
+        mantissa = float(number.scaleb(-exp))
+    if abs(mantissa - round(mantissa, 3)) < 1e-10:
+        mantissa = round(mantissa, 3)
+    else:
+        mantissa = round(mantissa, 6)
+    if abs(mantissa) >= 10:
+        mantissa /= 10
+        exp += 1
+    return f"{mantissa}×10^{exp}"
@@ -0,0 +1,213 @@
+"""Registry of physical constants and units, loaded lazily from physics_data.tsv.
+
+The data file is only read on the first lookup.  Loading indexes the raw
+lines by symbol, and each entry's value and dimension are parsed the first
+time it is looked up, so start-up cost does not grow with the size of the
+table.  Names resolve in order:
+
+    exact symbol                   h, eV, nm... as listed in the file
+    NFKC spelling                  me for mₑ
+    SI prefix + "si-unit" symbol   keV, nm, GHz, µF, hPa
+
+A prefix is at most two characters ("da"), so prefix resolution is two hash
+lookups rather than a scan.  Prefixed values are computed in decimal
+(1.602176634e-19 scaled by 10**3 is exactly 1.602176634e-16).
+"""
+import os
+import threading
+import unicodedata
+from decimal import Decimal
+
+from physics_parser import parse_number
+from physics_stats import PROFILER
+from physics_units import BASE_DIMENSIONS, DIMENSIONLESS, dimension
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'physics_data.tsv')
+
+CONSTANT = 'constant'
+UNIT = 'unit'
+SI_UNIT = 'si-unit'
+
+# Decimal exponent of every SI prefix (µ, μ and u all mean micro)
+SI_PREFIXES = {
+    'Q': 30, 'R': 27, 'Y': 24, 'Z': 21, 'E': 18, 'P': 15, 'T': 12, 'G': 9, 'M': 6, 'k': 3,
+    'h': 2, 'da': 1, 'd': -1, 'c': -2, 'm': -3, 'µ': -6, 'μ': -6, 'u': -6, 'n': -9,
+    'p': -12, 'f': -15, 'a': -18, 'z': -21, 'y': -24, 'r': -27, 'q': -30,
+}
+PREFIX_NAMES = {
+    30: 'quetta', 27: 'ronna', 24: 'yotta', 21: 'zetta', 18: 'exa', 15: 'peta', 12: 'tera',
+    9: 'giga', 6: 'mega', 3: 'kilo', 2: 'hecto', 1: 'deca', -1: 'deci', -2: 'centi', -3: 'milli',
+    -6: 'micro', -9: 'nano', -12: 'pico', -15: 'femto', -18: 'atto', -21: 'zepto', -24: 'yocto',
+    -27: 'ronto', -30: 'quecto',
+}
+MAX_PREFIX_LENGTH = max(len(prefix) for prefix in SI_PREFIXES)
+
+
+class Entry:
+    __slots__ = ('symbol', 'value', 'dims', 'kind', 'name', 'text')
+
+    def __init__(self, symbol, value, dims, kind, name, text=None):
+        self.symbol = symbol
+        self.value = value
+        self.dims = dims
+        self.kind = kind
+        self.name = name
+        self.text = text  # value as written in the data file, for exact prefix scaling
+
+    def __repr__(self):
+        return f"Entry({self.symbol!r}, {self.value!r}, {self.kind!r})"
+
+
+def parse_dimension(text):
+    """Parse "kg m2 s-2" (or "-") into a dimension tuple"""
+    if text == '-':
+        return DIMENSIONLESS
+    exponents = {}
+    for part in text.split():
+        base = part.rstrip('-0123456789')
+        if base not in BASE_DIMENSIONS:
+            raise ValueError(f"Unknown base dimension '{base}'")
+        exponents[base] = int(part[len(base):] or 1)
+    return dimension(**exponents)
+
+
+class Registry:
+    def __init__(self, path=DATA_PATH):
+        self.path = path
+        self.lines = None       # symbol -> raw data line, filled by load()
+        self.aliases = None     # NFKC spelling -> symbol
+        self.entries = {}       # symbol (or prefixed name) -> parsed Entry
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Read and index the data file (done automatically on first lookup)"""
+        with self.lock:
+            if self.lines is not None:
+                return
+            start = PROFILER.start()
+            lines = {}
+            aliases = {}
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip() or line.startswith('#'):
+                        continue
+                    symbol = line[:line.index('\t')]
+                    lines[symbol] = line
+                    if not symbol.isascii():
+                        aliases.setdefault(unicodedata.normalize('NFKC', symbol), symbol)
+            self.aliases = aliases
+            self.lines = lines
+            PROFILER.stop('registry', start)
+
+    def _parse(self, symbol):
+        symbol, text, dims, kind, name = self.lines[symbol].rstrip('\n').split('\t')
+        entry = Entry(symbol, parse_number(text), parse_dimension(dims), kind, name, text)
+        self.entries[symbol] = entry
+        return entry
+
+    def lookup(self, name):
+        """Return the Entry for a name (symbol, NFKC spelling or prefixed unit), or None"""
+        entry = self.entries.get(name)
+        if entry is not None:
+            return entry
+        if self.lines is None:
+            self.load()
+        if name in self.lines:
+            return self._parse(name)
+
+        symbol = self.aliases.get(unicodedata.normalize('NFKC', name))
+        if symbol is not None:
+            entry = self.entries[name] = self.lookup(symbol)
+            return entry
+
+        for length in range(1, MAX_PREFIX_LENGTH + 1):
+            exponent = SI_PREFIXES.get(name[:length])
+            if exponent is None or len(name) <= length:
+                continue
+            base = name[length:]
+            unit = self.entries.get(base) or (self._parse(base) if base in self.lines else None)
+            if unit is not None and unit.kind == SI_UNIT:
+                value = float(Decimal(unit.text).scaleb(exponent))
+                entry = Entry(name, value, unit.dims, UNIT, PREFIX_NAMES[exponent] + unit.name)
+                self.entries[name] = entry
+                return entry
+        return None
+
+    def __contains__(self, name):
+        return self.lookup(name) is not None
+
+    def __getitem__(self, name):
+        entry = self.lookup(name)
+        if entry is None:
+            raise KeyError(name)
+        return entry.value
+
+    def get(self, name, default=None):
+        entry = self.lookup(name)
+        return default if entry is None else entry.value
+
+    def symbols(self, kind=None):
+        """All symbols in the data file (prefixed forms are not listed), optionally of one kind"""
+        if self.lines is None:
+            self.load()
+        if kind is None:
+            return list(self.lines)
+        return [symbol for symbol in self.lines if self.lookup(symbol).kind == kind]
+
+    def __len__(self):
+        if self.lines is None:
+            self.load()
+        return len(self.lines)
+
+
+class Namespace:
+    """The names an engine resolves: its own definitions layered over a shared Registry"""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.overrides = {}
+        self.dimensions = DimensionView(self)
+
+    def define(self, symbol, value, dims=DIMENSIONLESS, kind=CONSTANT):
+        self.overrides[symbol] = Entry(symbol, value, dims, kind, symbol)
+
+    def lookup(self, name):
+        entry = self.overrides.get(name)
+        if entry is not None:
+            return entry
+        return self.registry.lookup(name)
+
+    def __contains__(self, name):
+        return self.lookup(name) is not None
+
+    def __getitem__(self, name):
+        entry = self.lookup(name)
+        if entry is None:
+            raise KeyError(name)
+        return entry.value
+
+    def get(self, name, default=None):
+        entry = self.lookup(name)
+        return default if entry is None else entry.value
+
+
+class DimensionView:
+    """Mapping-style access to the dimensions of a Namespace's symbols"""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    def get(self, name, default=None):
+        entry = self.namespace.lookup(name)
+        return default if entry is None else entry.dims
+
+
+_default_registry = None
+
+
+def default_registry():
+    """The Registry for physics_data.tsv, shared by every engine in the process"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = Registry()
+    return _default_registry
@@ -0,0 +1,443 @@
+"""Local evaluation service: a warm PhysicsEngine behind an asyncio socket server.
+
+Clients connect over a Unix socket or localhost TCP and exchange one JSON
+object per line.  Requests:
+
+    {"id": 1, "expr": "h*c/(500*nm)/eV"}                 evaluate (variables optional)
+    {"id": 2, "expr": "h*c/x", "variables": {"x": 5e-7}}
+    {"id": 3, "op": "lookup", "name": "GHz"}              constant/unit table entry
+    {"id": 4, "op": "stats"}                              server and cache counters
+
+Responses carry the same id and either "value", "text" (format_scientific
+output) and "unit", or "error".  Results of expressions with ± values also
+carry "std", with "value" holding the mean.  Values JSON has no number for
+(infinities, NaN, complex numbers, decimals beyond the float range) are sent
+as their text, e.g. "inf" or "nan".
+
+Requests from all connections are gathered into micro-batches: the first
+request of a batch waits at most batch_window seconds for others, up to
+max_batch requests.  A batch is handed to a single worker thread in one go,
+so the event loop keeps accepting input while it runs and the next batch
+forms behind it.  The worker gathers the batch's requests by expression:
+one without variables is evaluated once however often it is repeated, and
+one sent with different float variables (h*c/x for many x) is evaluated
+for all of them in one NumPy run of its compiled program, after the first
+request has shown that floats are enough for it.  Results are formatted
+together with format_scientific_batch.
+
+    python physics_server.py --socket /tmp/physics.sock
+    python physics_server.py --port 8765
+"""
+import asyncio
+import json
+import math
+import os
+import stat
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it every request is evaluated on its own
+    np = None
+
+from physics_engine import PhysicsEngine
+from physics_format import format_scientific_batch
+from physics_sweep import vector_functions
+from physics_uncertainty import Uncertain
+from physics_units import Quantity, format_dimension
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_BATCH_WINDOW = 0.0005
+DEFAULT_QUEUE_SIZE = 10000
+# Requests in a batch sharing an expression (with different variables) worth one NumPy run
+MIN_VECTOR_GROUP = 4
+MIN_NORMAL = sys.float_info.min
+
+
+def json_value(value):
+    """Numbers JSON can carry as numbers; anything else (inf, NaN, complex, Decimal beyond the float range) as text"""
+    if isinstance(value, float):
+        # json.dumps would write Infinity and NaN, which standard JSON parsers reject
+        return value if math.isfinite(value) else str(value)
+    if type(value) in (int, bool):
+        return value
+    return str(value)
+
+
+def remove_stale_socket(path):
+    """Delete a socket left behind at path by an earlier server; anything else there is an error"""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    os.unlink(path)
+
+
+def set_result(response, value, unit):
+    if isinstance(value, Uncertain):
+        response['value'], response['std'] = json_value(value.mean), json_value(value.std)
+    else:
+        response['value'] = json_value(value)
+    response['unit'] = unit
+
+
+def request_variables(request):
+    """The request's variables, which must map names to numbers (None if there are none)"""
+    variables = request.get('variables')
+    if variables is None:
+        return None
+    # Strings or lists would otherwise be repeated or concatenated by the arithmetic
+    if not isinstance(variables, dict) or not all(
+            isinstance(name, str) and type(value) in (int, float) for name, value in variables.items()):
+        raise ValueError("'variables' must be an object mapping names to numbers")
+    return variables
+
+
+class EvaluationServer:
+    def __init__(self, engine=None, max_batch=DEFAULT_MAX_BATCH, batch_window=DEFAULT_BATCH_WINDOW,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+        self.engine = engine if engine is not None else PhysicsEngine()
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.queue_size = queue_size
+        self.queue = None
+        self.server = None
+        self.batch_task = None
+        # One thread, so the engine and its caches are only used from one place
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="evaluate")
+        self.vector_functions = None
+        self.requests = 0
+        self.batches = 0
+        self.connections = 0
+
+    async def start(self, path=None, host='127.0.0.1', port=0):
+        """Listen on a Unix socket (path) or TCP; returns the asyncio server"""
+        self.queue = asyncio.Queue(self.queue_size)
+        self.batch_task = asyncio.create_task(self.run_batches())
+        if path is not None:
+            remove_stale_socket(path)
+            self.server = await asyncio.start_unix_server(self.handle_connection, path)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.batch_task is not None:
+            self.batch_task.cancel()
+            try:
+                await self.batch_task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=True)
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as e:
+                    writer.write(self.encode({'id': None, 'error': f"Bad request: {e}"}))
+                    continue
+                # Back-pressure: a full queue stops reading from this connection
+                await self.queue.put((request, writer))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                if self.queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.queue.get_nowait())
+
+            requests = [request for request, writer in batch]
+            try:
+                responses = await loop.run_in_executor(self.executor, self.evaluate_batch, requests)
+            except Exception as e:
+                # Whatever went wrong, this loop must keep serving the batches behind it
+                responses = [{'id': request.get('id'), 'error': f"Internal error: {e}"} for request in requests]
+            self.requests += len(batch)
+            self.batches += 1
+
+            writers = []
+            for (request, writer), response in zip(batch, responses):
+                if writer.is_closing():
+                    continue
+                writer.write(self.encode(response))
+                if writer not in writers:
+                    writers.append(writer)
+            for writer in writers:
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    pass
+
+    @staticmethod
+    def encode(response):
+        return (json.dumps(response, ensure_ascii=False) + "\n").encode('utf-8')
+
+    def evaluate_batch(self, requests):
+        """Evaluate a list of requests; returns one response dict each (runs on the worker thread)"""
+        engine = self.engine
+        responses = []
+        groups = {}        # (expression, variable names) -> [(response, variables)]
+        for request in requests:
+            response = {'id': request.get('id')}
+            responses.append(response)
+            op = request.get('op', 'eval')
+            try:
+                if op == 'eval':
+                    text = request['expr']
+                    if not isinstance(text, str):
+                        raise ValueError("'expr' must be a string")
+                    variables = request_variables(request)
+                    names = tuple(sorted(variables)) if variables else ()
+                    groups.setdefault((text, names), []).append((response, variables))
+                elif op == 'lookup':
+                    entry = engine.namespace.lookup(request['name'])
+                    if entry is None:
+                        raise ValueError(f"Unknown constant or unit '{request['name']}'")
+                    response.update(symbol=entry.symbol, value=json_value(entry.value),
+                                    unit=format_dimension(entry.dims), kind=entry.kind, name=entry.name)
+                elif op == 'stats':
+                    response['stats'] = self.stats()
+                else:
+                    raise ValueError(f"Unknown op '{op}'")
+            except KeyError as e:
+                response['error'] = f"Missing or unknown field: {e}"
+            except Exception as e:
+                response['error'] = str(e)
+
+        values = []        # (response, value) pairs still to be formatted
+        for (text, names), members in groups.items():
+            values.extend(self.evaluate_group(text, names, members))
+
+        if values:
+            try:
+                texts = format_scientific_batch([value for response, value in values], engine.scientific_mode)
+            except Exception:
+                # Find the values that cannot be formatted, one response at a time
+                texts = None
+            for index, (response, value) in enumerate(values):
+                try:
+                    response['text'] = texts[index] if texts is not None else engine.format_scientific(value)
+                except Exception as e:
+                    for key in ('value', 'std', 'unit'):
+                        response.pop(key, None)
+                    response['error'] = str(e)
+        return responses
+
+    def evaluate_group(self, text, names, members):
+        """Evaluate one expression for each (response, variables) member; returns (response, value) pairs"""
+        if not names:
+            # The same expression without variables has the same answer
+            try:
+                value, unit = self.evaluate_quantity(text, None)
+            except Exception as e:
+                for response, variables in members:
+                    response['error'] = str(e)
+                return []
+            for response, variables in members:
+                set_result(response, value, unit)
+            return [(response, value) for response, variables in members]
+
+        results = []
+        vector = None
+        for index, (response, variables) in enumerate(members):
+            try:
+                if vector is not None and vector[index - 1] is not None:
+                    value, unit = vector[index - 1]
+                else:
+                    value, unit = self.evaluate_quantity(text, variables)
+                set_result(response, value, unit)
+                results.append((response, value))
+            except Exception as e:
+                response['error'] = str(e)
+            if index == 0 and len(members) > MIN_VECTOR_GROUP:
+                # The first evaluation has settled the program's precision tier
+                vector = self.evaluate_vector(text, names, [variables for response, variables in members[1:]])
+        return results
+
+    def evaluate_quantity(self, text, variables):
+        """(value, unit text) of one evaluation"""
+        value = self.engine.evaluate_quantity(text, variables)
+        if isinstance(value, Quantity):
+            return value.value, value.unit
+        return value, ""
+
+    def evaluate_vector(self, text, names, rows):
+        """(value, unit) for each row of variables from one NumPy run of the program, or None
+
+        Only float variables of a program that runs on floats qualify.
+        Elements that come out infinite, NaN, zero or subnormal are None, and
+        are evaluated on their own, so errors and decimal escalation are those
+        of the scalar path.  The functions are the exact vector functions, so
+        the values are the scalar path's bit for bit.
+        """
+        if np is None or not all(type(value) is float for row in rows for value in row.values()):
+            return None
+        program = self.engine.compile_expression(text, names)
+        if program.precision != 0 or program.uncertain:
+            # Not checked yet (the first evaluation failed), or floats are not enough
+            return None
+        if self.vector_functions is None:
+            self.vector_functions = vector_functions(True, self.engine.integrator)
+        columns = {name: np.array([row[name] for row in rows]) for name in names}
+        try:
+            with np.errstate(all='ignore'):
+                array = program.run(self.vector_functions, columns)
+        except Exception:
+            return None
+        if not isinstance(array, np.ndarray) or array.dtype != np.float64 or array.shape != (len(rows),):
+            # A result that does not depend on the variables keeps its scalar type
+            return None
+        unit = format_dimension(program.dims) if program.dims is not None else ""
+        normal = np.isfinite(array) & (np.abs(array) >= MIN_NORMAL)
+        return [(value, unit) if ok else None for value, ok in zip(array.tolist(), normal.tolist())]
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch': self.requests / self.batches if self.batches else 0.0,
+            'connections': self.connections,
+            'cache': self.engine.cache_stats(),
+            'memo': self.engine.memo_stats(),
+        }
+
+
+class EvaluationClient:
+    """Pipelining client: many requests can be in flight on one connection"""
+
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.pending = {}
+        self.next_id = 0
+        self.read_task = None
+
+    async def connect(self, path=None, host='127.0.0.1', port=None):
+        if path is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.read_task = asyncio.create_task(self.read_responses())
+        return self
+
+    async def read_responses(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self.pending.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("server closed the connection"))
+            self.pending.clear()
+
+    async def request(self, **fields):
+        """Send one request and wait for its response dict"""
+        self.next_id += 1
+        request_id = fields['id'] = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write((json.dumps(fields, ensure_ascii=False) + "\n").encode('utf-8'))
+        await self.writer.drain()
+        return await future
+
+    async def evaluate(self, expr, variables=None):
+        if variables:
+            return await self.request(expr=expr, variables=variables)
+        return await self.request(expr=expr)
+
+    async def evaluate_many(self, expressions):
+        """Evaluate a list of expressions concurrently; responses in input order"""
+        return await asyncio.gather(*(self.evaluate(expr) for expr in expressions))
+
+    async def lookup(self, name):
+        return await self.request(op='lookup', name=name)
+
+    async def stats(self):
+        return (await self.request(op='stats'))['stats']
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        if self.read_task is not None:
+            await asyncio.gather(self.read_task, return_exceptions=True)
+
+
+async def serve(path=None, host='127.0.0.1', port=0, **options):
+    server = EvaluationServer(**options)
+    await server.start(path, host, port)
+    where = path if path is not None else "%s:%d" % server.address()[:2]
+    print(f"physics calculator server listening on {where}", file=sys.stderr, flush=True)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve physics calculator evaluation over a local socket")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument('--socket', metavar='PATH', help="Unix socket path")
+    where.add_argument('--port', type=int, default=8765, help="localhost TCP port (default 8765)")
+    parser.add_argument('--host', default='127.0.0.1', help="TCP address to bind (default 127.0.0.1)")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help="largest micro-batch")
+    parser.add_argument('--batch-window', type=float, default=DEFAULT_BATCH_WINDOW * 1e3,
+                        help="milliseconds a batch waits for more requests (default 0.5)")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.socket, args.host, args.port, max_batch=args.max_batch,
+                          batch_window=args.batch_window / 1e3))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
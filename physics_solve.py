@@ -0,0 +1,491 @@
+"""Solve mode: find the value of one unknown that makes an expression hit a target.
+
+The expression is compiled once by the engine, so it resolves the same
+constants, units and functions as the calculator, and the unknown is its one
+free variable.  A target can be a number or an expression ("2.5*eV"), and
+"lhs = rhs" text is accepted too:
+
+    python physics_solve.py "h*c/λ" 2.5*eV
+    python physics_solve.py "h*c/λ = 2.5*eV"
+    python physics_solve.py "h*c/λ/eV" 1 1.5 2 2.5 3
+    python physics_solve.py "h*c/λ/eV" --targets energies.npy -o wavelengths.npy
+
+A single target is solved with Brent's method on plain floats.  Many targets
+are solved together with a vectorized form of Chandrupatla's method (an
+inverse quadratic interpolation/bisection hybrid like Brent's), so each
+iteration is one run of the program over the whole array; that path needs
+NumPy.  Without a bracket, the unknown is searched for on a logarithmic grid
+of magnitudes from 1e-40 to 1e40 (positive values first), which is one
+vectorized evaluation shared by every target.
+"""
+import math
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only solving many targets at once needs it
+    np = None
+
+from physics_engine import NO_ALIASES, PhysicsEngine
+from physics_format import format_scientific_batch
+from physics_sweep import require_numpy, vector_functions
+from physics_units import (DIMENSION_SCALE, DIMENSIONLESS, DimensionError, Quantity, dimension,
+                           dimensions_of, divide, power)
+from physics_uncertainty import Uncertain
+
+EPSILON = sys.float_info.epsilon
+# Absolute tolerance floor, so a root at exactly zero still terminates
+DEFAULT_XTOL = 1e-300
+DEFAULT_RTOL = 4 * EPSILON
+DEFAULT_MAXITER = 100
+# A converged point whose residual is larger than this fraction of the
+# bracket's end residuals is a pole or jump (tan near π/2), not a root
+RESIDUAL_LIMIT = 1e-9
+# Bracket search grid: decades of magnitude, and points per decade
+SEARCH_DECADES = (-40, 40)
+SEARCH_STEPS = 4
+# Targets are bracketed and solved in blocks so temporaries stay bounded
+DEFAULT_CHUNK_SIZE = 1 << 14
+
+
+class SolveError(ValueError):
+    """Raised when an expression cannot be solved for its unknown"""
+
+
+def split_equation(text):
+    """Split "lhs = rhs" into its two sides; (text, None) if there is no '='"""
+    if '=' not in text:
+        return text, None
+    lhs, _, rhs = text.partition('=')
+    if '=' in rhs or not lhs.strip() or not rhs.strip():
+        raise SolveError("An equation needs exactly one '=' with an expression on each side")
+    return lhs.strip(), rhs.strip()
+
+
+def target_quantity(engine, target):
+    """(value, dims) of a target given as a number, Quantity or expression text"""
+    if isinstance(target, str):
+        target = engine.evaluate_quantity(target)
+    if isinstance(target, Quantity):
+        return target.value, target.dims
+    return target, None
+
+
+def prepare(engine, text, target, variable):
+    """Compile the expression and work out the unknown; returns (program, variable, value, dims)
+
+    An equation is rewritten as lhs - (rhs) = 0, or as lhs = rhs when the
+    unknown only appears on the left.
+    """
+    lhs, rhs = split_equation(text)
+    if rhs is not None:
+        if target is not None:
+            raise SolveError("Give either an equation or a target, not both")
+        target = rhs
+    elif target is None:
+        target = 0
+
+    # A named unknown hides any constant or unit of the same name (T, the tesla)
+    unknowns = (variable,) if variable is not None else None
+    program = engine.compile_expression(lhs, unknowns)
+    if isinstance(target, str):
+        rhs_program = engine.compile_expression(target, unknowns)
+        if rhs_program.variables:
+            program = engine.compile_expression(f"({lhs})-({target})", unknowns)
+            target = 0
+
+    if program.uncertain:
+        raise SolveError("Cannot solve an expression containing '±' values")
+    if variable is None:
+        if len(program.variables) != 1:
+            names = ", ".join(program.variables) or "none"
+            raise SolveError(f"Expression must have exactly one unknown (found: {names}); "
+                             "name the unknown if it is also a constant or unit")
+        variable = program.variables[0]
+    elif variable not in program.variables:
+        raise SolveError(f"Expression does not depend on '{variable}'")
+    elif len(program.variables) > 1:
+        others = ", ".join(name for name in program.variables if name != variable)
+        raise SolveError(f"Unknown names besides '{variable}': {others}")
+
+    value, dims = target_quantity(engine, target)
+    if isinstance(value, (complex, Uncertain)):
+        raise SolveError("Target must be a real number")
+    return program, variable, value, dims
+
+
+def unknown_dimension(engine, program, variable, target_dims):
+    """The dimension the unknown must have for the expression to match target_dims, or None"""
+    if target_dims is None:
+        return None
+    namespace = engine.namespace
+
+    def dims_with(dims):
+        try:
+            return dimensions_of(program.tree, namespace, namespace.dimensions, engine.functions,
+                                 NO_ALIASES, {variable: dims})
+        except DimensionError:
+            return None
+
+    base = dims_with(DIMENSIONLESS)
+    probe = dims_with(dimension(m=1))
+    if base is None or probe is None:
+        return None
+    # A metre-valued unknown changes the metre exponent by the unknown's power
+    exponent = (probe[0] - base[0]) / DIMENSION_SCALE
+    if exponent:
+        dims = power(divide(target_dims, base), 1 / exponent)
+    else:
+        dims = DIMENSIONLESS
+    if dims is None or dims_with(dims) != target_dims:
+        return None
+    return dims
+
+
+def scalar_residual(engine, program, variable, target):
+    """f(x) = expression - target, with NaN where the expression is undefined or complex"""
+    functions = engine.functions
+    run = program.run
+
+    def residual(x):
+        try:
+            value = run(functions, {variable: x}) - target
+        except (ArithmeticError, ValueError):
+            return math.nan
+        return value if type(value) is float or type(value) is int else math.nan
+
+    return residual
+
+
+def search_grid():
+    """Candidate values of the unknown, ascending: -1e40 ... -1e-40, 0, 1e-40 ... 1e40"""
+    low, high = SEARCH_DECADES
+    count = (high - low) * SEARCH_STEPS + 1
+    positive = [10.0 ** (low + i / SEARCH_STEPS) for i in range(count)]
+    return [-x for x in reversed(positive)] + [0.0] + positive
+
+
+def search_order(grid):
+    """Indices of grid intervals in the order they are tried: positive upwards, then negative downwards"""
+    zero = grid.index(0.0)
+    return list(range(zero, len(grid) - 1)) + list(range(zero - 1, -1, -1))
+
+
+def find_bracket(residual):
+    """Return (a, b) with residual(a) and residual(b) of opposite sign, searching the grid"""
+    grid = search_grid()
+    values = {}
+
+    def at(index):
+        if index not in values:
+            values[index] = residual(grid[index])
+        return values[index]
+
+    for index in search_order(grid):
+        fa, fb = at(index), at(index + 1)
+        if math.isfinite(fa) and math.isfinite(fb) and (fa <= 0) != (fb <= 0):
+            return grid[index], grid[index + 1]
+    raise SolveError("No sign change found between -1e40 and 1e40; give a bracket")
+
+
+def brent(f, a, b, xtol=DEFAULT_XTOL, rtol=DEFAULT_RTOL, maxiter=DEFAULT_MAXITER):
+    """Brent's method: a root of f between a and b, where f(a) and f(b) differ in sign"""
+    fa, fb = f(a), f(b)
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+    if not (math.isfinite(fa) and math.isfinite(fb)) or (fa > 0) == (fb > 0):
+        raise SolveError(f"No sign change between {a!r} and {b!r}")
+
+    c, fc = a, fa
+    d = e = b - a
+    for _ in range(maxiter):
+        if (fb > 0) == (fc > 0):
+            # Keep the root between b and c
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol = 2 * rtol * abs(b) + 0.5 * xtol
+        m = 0.5 * (c - b)
+        if abs(m) <= tol or fb == 0:
+            return b
+        if abs(e) >= tol and abs(fa) > abs(fb):
+            # Secant step when only two points are distinct, inverse quadratic otherwise
+            s = fb / fa
+            if a == c:
+                p = 2 * m * s
+                q = 1 - s
+            else:
+                q = fa / fc
+                r = fb / fc
+                p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            else:
+                p = -p
+            if 2 * p < min(3 * m * q - abs(tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = m
+        else:
+            d = e = m
+        a, fa = b, fb
+        b += d if abs(d) > tol else math.copysign(tol, m)
+        fb = f(b)
+        if math.isnan(fb):
+            raise SolveError(f"Expression is undefined at {b!r} inside the bracket")
+    raise SolveError(f"No convergence after {maxiter} iterations")
+
+
+def solve(engine, text, target=None, variable=None, bracket=None,
+          xtol=DEFAULT_XTOL, rtol=DEFAULT_RTOL, maxiter=DEFAULT_MAXITER):
+    """Value of the unknown for which the expression equals target (0 by default)
+
+    text may also be an equation "lhs = rhs".  bracket is an optional
+    (low, high) pair; numbers or expression text.
+    """
+    program, variable, value, dims = prepare(engine, text, target, variable)
+    residual = scalar_residual(engine, program, variable, value)
+    if bracket is None:
+        a, b = find_bracket(residual)
+    else:
+        a, b = (float(engine.evaluate(x)) if isinstance(x, str) else float(x) for x in bracket)
+    root = brent(residual, a, b, xtol, rtol, maxiter)
+    if abs(residual(root)) > RESIDUAL_LIMIT * max(abs(residual(a)), abs(residual(b))):
+        raise SolveError(f"Expression jumps across the target near {root!r} (a pole?) instead of reaching it")
+    return root
+
+
+def solve_quantity(engine, text, target=None, variable=None, **options):
+    """Like solve(), but returns a Quantity when the unknown's dimension can be worked out"""
+    program, variable, value, dims = prepare(engine, text, target, variable)
+    root = solve(engine, text, target, variable, **options)
+    dims = unknown_dimension(engine, program, variable, dims)
+    return root if dims is None else Quantity(root, dims)
+
+
+def chandrupatla(f, a, b, fa, fb, xtol=DEFAULT_XTOL, rtol=DEFAULT_RTOL, maxiter=DEFAULT_MAXITER):
+    """Vectorized Chandrupatla's method over arrays of brackets
+
+    f(x, index) returns residuals for the elements index of the original
+    arrays.  Elements converge independently and drop out of later
+    iterations; the result is NaN where an element hit an undefined value
+    or did not converge within maxiter iterations.
+    """
+    roots = np.full(a.shape, np.nan)
+    index = np.arange(a.size)
+    c, fc = a, fa
+    t = np.full(a.shape, 0.5)
+    for _ in range(maxiter):
+        xt = a + t * (b - a)
+        ft = f(xt, index)
+        same = np.sign(ft) == np.sign(fa)
+        c, fc = np.where(same, a, b), np.where(same, fa, fb)
+        b, fb = np.where(same, b, a), np.where(same, fb, fa)
+        a, fa = xt, ft
+
+        smaller = np.abs(fa) < np.abs(fb)
+        xm = np.where(smaller, a, b)
+        fm = np.where(smaller, fa, fb)
+        tlim = (2 * rtol * np.abs(xm) + xtol) / np.abs(b - c)
+        undefined = np.isnan(ft)
+        done = (fm == 0) | (tlim > 0.5) | undefined
+        if done.any():
+            roots[index[done]] = np.where(undefined[done], np.nan, xm[done])
+            active = ~done
+            if not active.any():
+                return roots
+            a, b, c, fa, fb, fc, tlim, index = (
+                array[active] for array in (a, b, c, fa, fb, fc, tlim, index))
+
+        # Inverse quadratic interpolation where it is safe, otherwise bisection
+        xi = (a - b) / (c - b)
+        phi = (fa - fb) / (fc - fb)
+        quadratic = (phi * phi < xi) & ((1 - phi) * (1 - phi) < 1 - xi)
+        t = np.where(quadratic,
+                     fa / (fb - fa) * fc / (fb - fc) + (c - a) / (b - a) * fa / (fc - fa) * fb / (fc - fb),
+                     0.5)
+        t = np.clip(t, tlim, 1 - tlim)
+    # Elements still iterating have no root to the requested tolerance
+    return roots
+
+
+def monotonic_runs(values):
+    """Split a path of values into (start, stop) slices that are finite and monotonic
+
+    Neighbouring runs share their boundary point.  Every run has at least two points.
+    """
+    runs = []
+    start = None
+    direction = 0
+    for i, value in enumerate(values):
+        if not math.isfinite(value):
+            if start is not None and i - start > 1:
+                runs.append((start, i))
+            start = None
+            continue
+        if start is None:
+            start, direction = i, 0
+            continue
+        step = (value > values[i - 1]) - (value < values[i - 1])
+        if step and direction and step != direction:
+            runs.append((start, i))
+            start = i - 1
+        if step:
+            direction = step
+    if start is not None and len(values) - start > 1:
+        runs.append((start, len(values)))
+    return runs
+
+
+def locate_brackets(paths, targets):
+    """First interval along the search paths whose end values straddle each target
+
+    paths is a list of (points, values) arrays, tried in order.  Each
+    monotonic run of a path is searched for all remaining targets at once
+    with a binary search, so the cost is per run rather than per grid
+    interval.  Returns (a, b, fa, fb) with residuals at both ends; a is NaN
+    for targets that no interval straddles.
+    """
+    a = np.full(targets.shape, np.nan)
+    b, fa, fb = a.copy(), a.copy(), a.copy()
+    pending = np.arange(targets.size)
+    for points, values in paths:
+        for start, stop in monotonic_runs(values.tolist()):
+            if not pending.size:
+                return a, b, fa, fb
+            x, v = points[start:stop], values[start:stop]
+            t = targets[pending]
+            # The interval i with v[i] <= t < v[i+1] (or the mirror image when decreasing)
+            if v[-1] > v[0]:
+                i = np.searchsorted(v, t, side='right') - 1
+                # A target equal to the last value is a root at the end of the last interval
+                i[t == v[-1]] = v.size - 2
+            elif v[-1] < v[0]:
+                i = np.searchsorted(-v, -t, side='left') - 1
+            else:
+                continue
+            hit = (i >= 0) & (i < v.size - 1)
+            rows, i = pending[hit], i[hit]
+            a[rows], b[rows] = x[i], x[i + 1]
+            fa[rows], fb[rows] = v[i] - targets[rows], v[i + 1] - targets[rows]
+            pending = pending[~hit]
+    return a, b, fa, fb
+
+
+def solve_many(engine, text, targets, variable=None, bracket=None, exact=False,
+               chunk_size=DEFAULT_CHUNK_SIZE, xtol=DEFAULT_XTOL, rtol=DEFAULT_RTOL, maxiter=DEFAULT_MAXITER):
+    """Solve for the unknown at every target at once; returns an array shaped like targets
+
+    Targets are numbers or expression text.  Elements with no root in the
+    bracket (or none on the search grid) are NaN.
+    """
+    require_numpy()
+    if not isinstance(targets, np.ndarray):
+        targets = [engine.evaluate(target) if isinstance(target, str) else target for target in targets]
+    targets = np.asarray(targets, dtype=np.float64)
+    if split_equation(text)[1] is not None:
+        raise SolveError("Give targets for an expression, not an equation")
+    program, variable, offset, dims = prepare(engine, text, None, variable)
+    functions = vector_functions(exact, engine.integrator)
+
+    def evaluate(x):
+        values = np.asarray(program.run(functions, {variable: x}), dtype=np.float64) - offset
+        return np.broadcast_to(values, x.shape)
+
+    flat = targets.reshape(-1)
+    roots = np.full(flat.shape, np.nan)
+    with np.errstate(all='ignore'):
+        # The expression is evaluated once on the search grid (or the bracket) for every target
+        if bracket is None:
+            grid = np.array(search_grid())
+            values = evaluate(grid)
+            zero = grid.size // 2
+            paths = [(grid[zero:], values[zero:]), (grid[zero::-1], values[zero::-1])]
+        else:
+            ends = np.array([float(engine.evaluate(x)) if isinstance(x, str) else float(x) for x in bracket])
+            paths = [(ends, evaluate(ends))]
+
+        for start in range(0, flat.size, chunk_size):
+            block = flat[start:start + chunk_size]
+            a, b, fa, fb = locate_brackets(paths, block)
+            # Ends that are exact roots need no iteration
+            for end, values in ((a, fa), (b, fb)):
+                exact_roots = values == 0
+                roots[start:start + block.size][exact_roots] = end[exact_roots]
+            rows = np.flatnonzero(~np.isnan(a) & (fa != 0) & (fb != 0))
+            if not rows.size:
+                continue
+            block_targets = block[rows]
+
+            def residual(x, index):
+                return evaluate(x) - block_targets[index]
+
+            solved = chandrupatla(residual, a[rows], b[rows], fa[rows], fb[rows], xtol, rtol, maxiter)
+            # Drop poles and jumps, as in solve()
+            jumps = np.abs(residual(solved, np.arange(rows.size))) > RESIDUAL_LIMIT * np.maximum(
+                np.abs(fa[rows]), np.abs(fb[rows]))
+            solved[jumps] = np.nan
+            roots[start + rows] = solved
+    return roots.reshape(targets.shape)
+
+
+def read_targets(path):
+    """Targets from a .npy file, or a text file with one number or expression per line"""
+    if path.endswith('.npy'):
+        require_numpy()
+        return np.load(path)
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def main(argv=None):
+    """Solve an expression for its unknown at one or more targets"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Solve an expression for its one unknown")
+    parser.add_argument('expression', help="expression with one unknown, or an equation 'lhs = rhs'")
+    parser.add_argument('targets', nargs='*', help="target values or expressions (default: 0)")
+    parser.add_argument('--var', help="name of the unknown (default: the expression's only free name)")
+    parser.add_argument('--bracket', nargs=2, metavar=('LOW', 'HIGH'),
+                        help="interval containing the root (default: search 1e-40..1e40 and negatives)")
+    parser.add_argument('--targets', dest='targets_file', metavar='FILE',
+                        help="read targets from a .npy file or a text file, one per line")
+    parser.add_argument('--exact', action='store_true', help="match scalar results bit for bit")
+    parser.add_argument('-o', '--output', help="save roots to a .npy file instead of printing")
+    args = parser.parse_args(argv)
+
+    engine = PhysicsEngine()
+    targets = read_targets(args.targets_file) if args.targets_file else args.targets
+    try:
+        if len(targets) <= 1 and not args.output:
+            target = targets[0] if len(targets) else None
+            root = solve_quantity(engine, args.expression, target, args.var, bracket=args.bracket)
+            unit = ""
+            if isinstance(root, Quantity):
+                root, unit = root.value, root.unit
+            text = engine.format_scientific(root)
+            print(f"{text} {unit}" if unit else text)
+            return 0
+
+        roots = solve_many(engine, args.expression, targets, args.var, args.bracket, args.exact)
+    except (SolveError, SyntaxError, NameError, DimensionError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if args.output:
+        np.save(args.output, roots)
+    else:
+        inputs = targets if not isinstance(targets, np.ndarray) else format_scientific_batch(
+            targets, engine.scientific_mode)
+        outputs = format_scientific_batch(roots, engine.scientific_mode)
+        sys.stdout.writelines(f"{target}\t{root}\n" for target, root in zip(inputs, outputs))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Low-overhead timing counters for the calculator's hot paths.
+
+Each stage (compile, run, format, history, display, redraw) keeps a call
+count, total and maximum time and a log2 latency histogram.  Timing is off
+unless PHYSICS_CALC_PROFILE is set to a non-empty value other than "0" (or
+the GUI's Profiling menu item is ticked).  While it is off, instrumented code
+only pays for one attribute check:
+
+    start = PROFILER.start()
+    ...
+    PROFILER.stop('format', start)
+"""
+import json
+import os
+import time
+
+# Bucket i counts samples whose duration in nanoseconds has bit length i
+HISTOGRAM_BUCKETS = 48
+
+
+class StageStats:
+    __slots__ = ('count', 'total_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, elapsed_ns):
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.buckets[min(elapsed_ns.bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound (ns) of the histogram bucket holding the given fraction of samples"""
+        if not self.count:
+            return 0
+        target = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return min((1 << bucket) - 1, self.max_ns)
+        return self.max_ns
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_ms': self.total_ns / 1e6,
+            'mean_us': self.total_ns / self.count / 1e3 if self.count else 0.0,
+            'p50_us': self.percentile(0.5) / 1e3,
+            'p90_us': self.percentile(0.9) / 1e3,
+            'p99_us': self.percentile(0.99) / 1e3,
+            'max_us': self.max_ns / 1e3,
+            'histogram_ns_log2': list(self.buckets),
+        }
+
+
+class Profiler:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = {}
+
+    def start(self):
+        """Return a start timestamp, or 0 when profiling is off"""
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def stop(self, stage, start):
+        """Record the time since start for stage (no-op if start came from a disabled profiler)"""
+        if start:
+            self.record(stage, time.perf_counter_ns() - start)
+
+    def record(self, stage, elapsed_ns):
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages[stage] = StageStats()
+        stats.add(elapsed_ns)
+
+    def reset(self):
+        self.stages.clear()
+
+    def snapshot(self):
+        return {
+            'enabled': self.enabled,
+            'stages': {stage: stats.summary() for stage, stats in self.stages.items()},
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def export(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+
+    def report(self):
+        """Plain-text table of the per-stage timings"""
+        lines = [f"{'stage':<10}{'count':>9}{'mean µs':>10}{'p50 µs':>10}{'p99 µs':>10}{'max µs':>10}"]
+        for stage, stats in self.stages.items():
+            summary = stats.summary()
+            lines.append(f"{stage:<10}{summary['count']:>9}{summary['mean_us']:>10.1f}"
+                         f"{summary['p50_us']:>10.1f}{summary['p99_us']:>10.1f}{summary['max_us']:>10.1f}")
+        return "\n".join(lines)
+
+
+PROFILER = Profiler(enabled=os.environ.get('PHYSICS_CALC_PROFILE', '') not in ('', '0'))
@@ -0,0 +1,241 @@
+"""Monte Carlo propagation of uncertainties written with ± (or +/-).
+
+    (9.81 ± 0.02)*m/s^2 * ((1.20 ± 0.01)*s)^2 / 2
+    h*c/((532 ± 1)*nm)/eV
+
+Each ± in an expression is an independent, normally distributed input whose
+standard deviation is the number after the ±.  An Uncertain value passed as
+a variable is an input too, sampled once per draw wherever it appears, so
+"x*x" with an uncertain x stays correlated with itself.
+
+The compiled program is not run once per draw: all the inputs are sampled
+as NumPy arrays and the program runs once per chunk of draws, with the same
+vectorized functions as sweep mode.  Chunks keep memory bounded whatever
+the sample count.  The mean and standard deviation are merged across
+chunks (Chan et al.'s parallel form of Welford's update).  Percentiles come
+from a fixed-size uniform reservoir of the results, which holds every
+result when the sample count is no larger than the reservoir.  Draws whose
+result is infinite or undefined (sqrt of a negative sample) are left out
+and counted.  Without NumPy the draws are evaluated one at a time, with a
+smaller default sample count.  integrate() and sum() with an uncertain
+parameter run once per draw, so lower the sample count for those.
+
+The sample count, chunk size and random seed default to
+PHYSICS_CALC_MC_SAMPLES, PHYSICS_CALC_MC_CHUNK and PHYSICS_CALC_MC_SEED.
+Without a seed every evaluation draws fresh samples.
+"""
+import math
+import os
+import random
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it draws are evaluated one by one
+    np = None
+
+DEFAULT_SAMPLES = 100000
+# Draws evaluated one at a time when NumPy is missing
+SCALAR_SAMPLES = 10000
+DEFAULT_CHUNK_SIZE = 1 << 16
+# Percentiles from this many results are within about 0.01 standard deviations
+RESERVOIR_SIZE = 1 << 14
+DEFAULT_PERCENTILES = (2.5, 50.0, 97.5)
+
+
+class Uncertain:
+    """A result with an uncertainty: sample mean, standard deviation and percentiles
+
+    percentiles maps each percentile (e.g. 97.5) to its value; invalid
+    counts the draws that were left out as infinite or undefined.
+    """
+    __slots__ = ('mean', 'std', 'samples', 'invalid', 'percentiles')
+
+    def __init__(self, mean, std, samples=0, invalid=0, percentiles=None):
+        self.mean = mean
+        self.std = std
+        self.samples = samples
+        self.invalid = invalid
+        self.percentiles = percentiles if percentiles is not None else {}
+
+    def __float__(self):
+        return float(self.mean)
+
+    def __repr__(self):
+        return f"Uncertain({self.mean!r}, {self.std!r}, samples={self.samples})"
+
+    def __str__(self):
+        # Reads back in as the same value and uncertainty
+        return f"{self.mean!r} ± {self.std!r}"
+
+
+def format_uncertain(value, scientific_mode=True):
+    """'9.810 ± 0.020', or '(6.626 ± 0.012)×10^-34' for very large or small values
+
+    The uncertainty is rounded to two significant digits and the value to
+    the same decimal place.  Without scientific mode both are shown in full.
+    """
+    mean, std = value.mean, value.std
+    if not scientific_mode:
+        return str(value)
+    if not (std > 0 and math.isfinite(std) and math.isfinite(mean)):
+        from physics_engine import format_scientific
+        return f"{format_scientific(mean)} ± {format_scientific(std)}"
+
+    # Decimal place of the second significant digit, after rounding (0.0996 is 0.10)
+    place = math.floor(math.log10(float(f"{std:.2g}"))) - 1
+    magnitude = max(abs(mean), std)
+    if 0.000001 < magnitude < 1000000:
+        decimals = max(0, -place)
+        return f"{mean:.{decimals}f} ± {std:.{decimals}f}"
+    exp = int(math.floor(math.log10(magnitude)))
+    if round(magnitude / 10 ** exp, max(0, exp - place)) >= 10:
+        exp += 1
+    scale = 10 ** exp
+    decimals = max(0, exp - place)
+    return f"({mean / scale:.{decimals}f} ± {std / scale:.{decimals}f})×10^{exp}"
+
+
+def has_uncertain(variables):
+    return Uncertain in map(type, variables.values())
+
+
+def percentile(ordered, p):
+    """p-th percentile of a sorted list, interpolated like NumPy's default"""
+    position = (len(ordered) - 1) * p / 100
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class Reservoir:
+    """A uniform random sample of at most size values from a stream of arrays (Algorithm R)"""
+
+    def __init__(self, size, rng):
+        self.data = np.empty(size)
+        self.size = size
+        self.rng = rng
+        self.filled = 0
+        self.seen = 0
+
+    def add(self, values):
+        fill = min(self.size - self.filled, values.size)
+        if fill:
+            self.data[self.filled:self.filled + fill] = values[:fill]
+            self.filled += fill
+        rest = values[fill:]
+        if rest.size:
+            # The i-th value seen takes a random slot with probability size/i
+            seen = self.seen + fill + np.arange(1, rest.size + 1)
+            slots = (self.rng.random(rest.size) * seen).astype(np.int64)
+            keep = slots < self.size
+            self.data[slots[keep]] = rest[keep]
+        self.seen += values.size
+
+    def values(self):
+        return self.data[:self.filled]
+
+
+class Propagator:
+    """Evaluates programs with uncertain inputs by Monte Carlo sampling"""
+
+    def __init__(self, samples=None, chunk_size=None, seed=None, percentiles=DEFAULT_PERCENTILES,
+                 reservoir_size=RESERVOIR_SIZE):
+        if samples is None:
+            samples = int(os.environ.get('PHYSICS_CALC_MC_SAMPLES') or 0) or None
+        if chunk_size is None:
+            chunk_size = int(os.environ.get('PHYSICS_CALC_MC_CHUNK') or DEFAULT_CHUNK_SIZE)
+        if seed is None and os.environ.get('PHYSICS_CALC_MC_SEED'):
+            seed = int(os.environ['PHYSICS_CALC_MC_SEED'])
+        # None: DEFAULT_SAMPLES with NumPy, SCALAR_SAMPLES without
+        self.samples = samples
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.percentiles = tuple(percentiles)
+        self.reservoir_size = reservoir_size
+
+    def inputs(self, program, variables):
+        """(name, value, uncertainty) for the program's ± values and Uncertain variables"""
+        inputs = list(program.uncertain)
+        if variables:
+            inputs.extend((name, value.mean, value.std) for name, value in variables.items()
+                          if isinstance(value, Uncertain))
+        return inputs
+
+    def evaluate(self, program, functions, integrator, variables=None):
+        """Run program over samples of its uncertain inputs; returns an Uncertain"""
+        inputs = self.inputs(program, variables)
+        fixed = {name: value for name, value in (variables or {}).items() if not isinstance(value, Uncertain)}
+        if np is None:
+            return self.evaluate_scalar(program, integrator.scalar_functions(functions), inputs, fixed)
+
+        functions = integrator.vector_functions()
+        samples = self.samples or DEFAULT_SAMPLES
+        rng = np.random.default_rng(self.seed)
+        reservoir = Reservoir(min(self.reservoir_size, samples), rng)
+        count, mean, m2 = 0, 0.0, 0.0
+        with np.errstate(all='ignore'):
+            for start in range(0, samples, self.chunk_size):
+                size = min(self.chunk_size, samples - start)
+                values = dict(fixed)
+                for name, value, spread in inputs:
+                    draws = rng.standard_normal(size)
+                    draws *= spread
+                    draws += value
+                    values[name] = draws
+                result = np.broadcast_to(np.asarray(program.run(functions, values)), (size,))
+                if result.dtype.kind not in 'fiub':
+                    continue
+                result = result.astype(np.float64)
+                result = result[np.isfinite(result)]
+                if not result.size:
+                    continue
+                # Merge this chunk's mean and sum of squared deviations into the totals
+                chunk_mean = result.mean()
+                deviations = result - chunk_mean
+                chunk_m2 = deviations.dot(deviations)
+                total = count + result.size
+                delta = chunk_mean - mean
+                mean += delta * result.size / total
+                m2 += chunk_m2 + delta * delta * count * result.size / total
+                count = total
+                reservoir.add(result)
+
+        if not count:
+            raise ValueError("The expression is undefined for every sample of its uncertain inputs")
+        levels = np.percentile(reservoir.values(), self.percentiles).tolist() if self.percentiles else ()
+        std = math.sqrt(m2 / (count - 1)) if count > 1 else 0.0
+        return Uncertain(float(mean), std, samples, samples - count, dict(zip(self.percentiles, levels)))
+
+    def evaluate_scalar(self, program, functions, inputs, fixed):
+        samples = self.samples or SCALAR_SAMPLES
+        rng = random.Random(self.seed)
+        size = min(self.reservoir_size, samples)
+        kept = []
+        count, mean, m2 = 0, 0.0, 0.0
+        for _ in range(samples):
+            values = dict(fixed)
+            for name, value, spread in inputs:
+                values[name] = rng.gauss(value, spread)
+            try:
+                result = program.run(functions, values)
+            except (ArithmeticError, ValueError):
+                continue
+            if type(result) not in (float, int, bool) or not math.isfinite(result):
+                continue
+            count += 1
+            delta = result - mean
+            mean += delta / count
+            m2 += delta * (result - mean)
+            if len(kept) < size:
+                kept.append(result)
+            else:
+                slot = rng.randrange(count)
+                if slot < size:
+                    kept[slot] = result
+
+        if not count:
+            raise ValueError("The expression is undefined for every sample of its uncertain inputs")
+        kept.sort()
+        levels = {p: percentile(kept, p) for p in self.percentiles}
+        std = math.sqrt(m2 / (count - 1)) if count > 1 else 0.0
+        return Uncertain(float(mean), std, samples, samples - count, levels)
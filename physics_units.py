@@ -0,0 +1,333 @@
+"""Dimensions and unit-aware values for the physics calculator.
+
+A dimension is a tuple of seven integers, the exponents of the SI base
+dimensions (m, kg, s, A, K, mol, cd) multiplied by DIMENSION_SCALE so that
+square and cube roots stay exact integers.  Constants and units carry a
+dimension; compiled expressions get theirs from a static pass over the parse
+tree (dimensions_of), so evaluation itself still runs on plain floats and
+costs nothing extra.
+
+Bare numbers count as dimensionless, and a dimensionless operand of + or -
+takes the other operand's dimension, so "h*c/(500*nm)/eV + 1" is accepted.
+Adding two different non-empty dimensions (eV + nm) raises DimensionError.
+Names with no known dimension (variables) make the result's dimension
+unknown (None) instead of failing.
+
+Quantity pairs a value with its dimension; QuantityArray does the same for a
+whole NumPy array with one shared dimension.
+"""
+import operator
+
+from physics_parser import (BINDING_FUNCTIONS, BINOP, CALL, NAME, NEG, NUM, POS, UNCERTAIN, ShadowedSymbols,
+                            binding_arguments, fold_constants, resolve_symbol, shadow)
+
+BASE_DIMENSIONS = ('m', 'kg', 's', 'A', 'K', 'mol', 'cd')
+# Exponents are stored multiplied by this, so 1/2 and 1/3 powers are exact
+DIMENSION_SCALE = 6
+DIMENSIONLESS = (0,) * len(BASE_DIMENSIONS)
+
+SUPERSCRIPTS = str.maketrans('-0123456789', '⁻⁰¹²³⁴⁵⁶⁷⁸⁹')
+
+
+class DimensionError(ValueError):
+    """Raised when an expression combines incompatible dimensions"""
+
+
+def dimension(**exponents):
+    """Build a dimension from base exponents, e.g. dimension(kg=1, m=2, s=-2)"""
+    return tuple(round(exponents.get(base, 0) * DIMENSION_SCALE) for base in BASE_DIMENSIONS)
+
+
+def multiply(left, right):
+    if right is DIMENSIONLESS:
+        return left
+    if left is DIMENSIONLESS:
+        return right
+    return tuple(map(operator.add, left, right))
+
+
+def divide(left, right):
+    if right is DIMENSIONLESS:
+        return left
+    return tuple(map(operator.sub, left, right))
+
+
+def power(dims, exponent):
+    """Raise a dimension to a number; None if the result is not a multiple of 1/DIMENSION_SCALE"""
+    if dims == DIMENSIONLESS:
+        return DIMENSIONLESS
+    scaled = []
+    for value in dims:
+        product = value * exponent
+        nearest = round(product)
+        if abs(product - nearest) > 1e-9:
+            return None
+        scaled.append(int(nearest))
+    return tuple(scaled)
+
+
+def add(left, right):
+    """Dimension of left + right (or left - right)"""
+    if left == right or right == DIMENSIONLESS:
+        return left
+    if left == DIMENSIONLESS:
+        return right
+    raise DimensionError(f"Cannot add {format_dimension(left)} and {format_dimension(right)}")
+
+
+def format_dimension(dims):
+    """SI base unit text for a dimension, e.g. 'kg·m²·s⁻²'; '' when dimensionless"""
+    if dims is None or dims == DIMENSIONLESS:
+        return ""
+    parts = []
+    # Conventional order: kg before m
+    for index in (1, 0, 2, 3, 4, 5, 6):
+        value = dims[index]
+        if not value:
+            continue
+        base = BASE_DIMENSIONS[index]
+        if value == DIMENSION_SCALE:
+            parts.append(base)
+        elif value % DIMENSION_SCALE == 0:
+            parts.append(base + str(value // DIMENSION_SCALE).translate(SUPERSCRIPTS))
+        else:
+            numerator, denominator = value, DIMENSION_SCALE
+            for factor in (2, 3):
+                if numerator % factor == 0 and denominator % factor == 0:
+                    numerator //= factor
+                    denominator //= factor
+            parts.append(f"{base}^({numerator}/{denominator})")
+    return "·".join(parts)
+
+
+# How each built-in function maps its argument's dimension to its result's
+FUNCTION_POWERS = {'sqrt': 1 / 2, 'cbrt': 1 / 3, 'abs': 1}
+DIMENSIONLESS_FUNCTIONS = frozenset(['log10', 'ln', 'sin', 'cos', 'tan', 'exp', 'expm1'])
+
+
+def dimensions_of(tree, symbols, symbol_dimensions, functions, aliases=None, variables=None):
+    """Return the dimension of a parse tree, or None if it depends on names with unknown dimensions
+
+    variables optionally maps variable names to their dimensions (None where
+    unknown); a variable hides any constant or unit of the same name.  Raises
+    DimensionError for sums of incompatible dimensions, and for exponents and
+    arguments of exp, ln, sin and the other DIMENSIONLESS_FUNCTIONS that have
+    a dimension.  A temperature typed as a bare number (exp(-E/(kB*300)))
+    is such a mistake too; PhysicsEngine(check_dimensions=False) accepts it.
+    """
+
+    def constant_value(node):
+        if node[0] == NUM:
+            return node[1]
+        # Variables hide constants and units of the same name here too
+        inner_symbols, inner_aliases = symbols, aliases or {}
+        for name in variables or ():
+            inner_symbols, inner_aliases = shadow(inner_symbols, inner_aliases, name)
+        folded = fold_constants(node, inner_symbols, functions, inner_aliases)
+        return folded[1] if folded[0] == NUM else None
+
+    def require_dimensionless(what, dims):
+        # exp(2*m), and euler**(2*m) too; None (unknown) may still turn out dimensionless
+        if dims is not None and dims != DIMENSIONLESS:
+            raise DimensionError(f"{what} must be dimensionless, not {format_dimension(dims)}")
+
+    def raised(dims, exponent_node, exponent_dims):
+        require_dimensionless("An exponent", exponent_dims)
+        if dims is None:
+            return None
+        if dims == DIMENSIONLESS:
+            return DIMENSIONLESS
+        exponent = constant_value(exponent_node)
+        if exponent is None or isinstance(exponent, complex):
+            return None
+        return power(dims, exponent)
+
+    def visit(node):
+        tag = node[0]
+        if tag == NUM:
+            return DIMENSIONLESS
+        if tag == NAME:
+            if variables and node[1] in variables:
+                return variables[node[1]]
+            # symbol_dimensions covers every constant and unit, so a miss is a variable
+            dims = symbol_dimensions.get(node[1])
+            if dims is not None:
+                return dims
+            symbol = resolve_symbol(node[1], symbols, aliases or {})
+            if symbol is None:
+                return None
+            return symbol_dimensions.get(symbol, DIMENSIONLESS)
+        if tag == BINOP:
+            operator = node[1]
+            left = visit(node[2])
+            if operator == '**':
+                return raised(left, node[3], visit(node[3]))
+            right = visit(node[3])
+            if left is None or right is None:
+                return None
+            if operator == '*':
+                return multiply(left, right)
+            if operator == '/':
+                return divide(left, right)
+            return add(left, right)
+        if tag == NEG or tag == POS:
+            return visit(node[1])
+        if tag == UNCERTAIN:
+            # A value and its uncertainty are added to each other, in effect
+            value, spread = visit(node[1]), visit(node[2])
+            if value is None or spread is None:
+                return None
+            return add(value, spread)
+        if tag == CALL and node[1] in BINDING_FUNCTIONS:
+            return bound_dimensions(node)
+        if tag == CALL:
+            name, args = node[1], node[2]
+            arg_dims = [visit(arg) for arg in args]
+            if name in FUNCTION_POWERS and len(args) == 1:
+                return power(arg_dims[0], FUNCTION_POWERS[name]) if arg_dims[0] is not None else None
+            if name == 'pow' and len(args) == 2:
+                return raised(arg_dims[0], args[1], arg_dims[1])
+            if name in DIMENSIONLESS_FUNCTIONS:
+                for dims in arg_dims:
+                    require_dimensionless(f"The argument of {name}()", dims)
+                return None if None in arg_dims else DIMENSIONLESS
+            return None
+        return None
+
+    def bound_dimensions(node):
+        # integrate(f, x, a, b) has the dimension of f times x, with x measured like a and b;
+        # sum(f, n, a, b) has the dimension of f
+        name, args = node[1], node[2]
+        bound = binding_arguments(node)
+        limits = [visit(arg) for arg in args[2:4]]
+        if None in limits:
+            return None
+        limit = add(*limits) if name == 'integrate' else DIMENSIONLESS
+        inner_symbols, inner_aliases = shadow(symbols, aliases or {}, bound)
+        inner_variables = dict(variables or {}, **{bound: limit})
+        body = dimensions_of(args[0], inner_symbols, ShadowedSymbols(symbol_dimensions, bound), functions,
+                             inner_aliases, inner_variables)
+        if body is None:
+            return None
+        return multiply(body, limit)
+
+    return visit(tree)
+
+
+def _split(other):
+    """(value, dims) of a Quantity or a plain number"""
+    if isinstance(other, Quantity):
+        return other.value, other.dims
+    return other, DIMENSIONLESS
+
+
+class Quantity:
+    """A value with a dimension; arithmetic checks and propagates the dimension"""
+    __slots__ = ('value', 'dims')
+
+    def __init__(self, value, dims=DIMENSIONLESS):
+        self.value = value
+        self.dims = dims
+
+    def _new(self, value, dims):
+        return Quantity(value, dims)
+
+    def __add__(self, other):
+        value, dims = _split(other)
+        return self._new(self.value + value, add(self.dims, dims))
+
+    def __radd__(self, other):
+        value, dims = _split(other)
+        return self._new(value + self.value, add(dims, self.dims))
+
+    def __sub__(self, other):
+        value, dims = _split(other)
+        return self._new(self.value - value, add(self.dims, dims))
+
+    def __rsub__(self, other):
+        value, dims = _split(other)
+        return self._new(value - self.value, add(dims, self.dims))
+
+    def __mul__(self, other):
+        value, dims = _split(other)
+        return self._new(self.value * value, multiply(self.dims, dims))
+
+    def __rmul__(self, other):
+        value, dims = _split(other)
+        return self._new(value * self.value, multiply(dims, self.dims))
+
+    def __truediv__(self, other):
+        value, dims = _split(other)
+        return self._new(self.value / value, divide(self.dims, dims))
+
+    def __rtruediv__(self, other):
+        value, dims = _split(other)
+        return self._new(value / self.value, divide(dims, self.dims))
+
+    def __pow__(self, exponent):
+        if isinstance(exponent, Quantity):
+            if exponent.dims != DIMENSIONLESS:
+                raise DimensionError("Exponent must be dimensionless")
+            exponent = exponent.value
+        dims = power(self.dims, exponent)
+        if dims is None:
+            raise DimensionError(f"Cannot raise {format_dimension(self.dims)} to the power {exponent}")
+        return self._new(self.value ** exponent, dims)
+
+    def __neg__(self):
+        return self._new(-self.value, self.dims)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return self._new(abs(self.value), self.dims)
+
+    def __float__(self):
+        return float(self.value)
+
+    def __eq__(self, other):
+        value, dims = _split(other)
+        return self.dims == dims and self.value == value
+
+    __hash__ = None
+
+    @property
+    def unit(self):
+        return format_dimension(self.dims)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.value!r}, {self.unit!r})"
+
+    def __str__(self):
+        unit = self.unit
+        return f"{self.value} {unit}" if unit else str(self.value)
+
+
+class QuantityArray(Quantity):
+    """A NumPy array of values sharing one dimension"""
+    __slots__ = ()
+
+    def _new(self, value, dims):
+        return QuantityArray(value, dims)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __getitem__(self, index):
+        item = self.value[index]
+        if getattr(item, 'ndim', 0):
+            return QuantityArray(item, self.dims)
+        return Quantity(item, self.dims)
+
+    def __iter__(self):
+        for item in self.value:
+            yield Quantity(item, self.dims)
+
+    def __eq__(self, other):
+        value, dims = _split(other)
+        return self.dims == dims and (self.value == value).all()
+
+    @property
+    def shape(self):
+        return self.value.shape
@@ -0,0 +1,302 @@
+"""Worksheet: named quantities that recompute when the quantities they use change.
+
+    μ = mₑ*mₚ/(mₑ + mₚ)
+    a = 4*π*ε₀*ℏ^2/(μ*e^2)
+    E = ℏ^2/(2*μ*a^2)*(1 - 1/n^2)
+    n = 2
+    λ = h*c/E
+
+Each assignment binds a name to an expression, which may use the other
+names in any order (n above is defined after E uses it).  The worksheet
+keeps a dependency graph between the names.  When an expression changes,
+only that name and the names downstream of it are recomputed, in
+dependency order, by running each one's compiled program again with its
+inputs' new values; nothing is parsed or compiled again.  The dimension
+of each name is carried along, so λ above comes out in metres.
+
+A name that uses an undefined name, or whose inputs have errors, holds an
+error until the inputs are fixed.  Circular definitions are rejected when
+they are made.  An uncertain (±) value is passed on as its mean and
+standard deviation, so quantities derived from it in separate steps are
+sampled independently of each other.
+
+Worksheets are saved as plain text, one "name = expression" line each, in
+the order they were defined; values are recomputed on load.  Run as a
+script to print a saved worksheet's values:
+
+    python physics_worksheet.py hydrogen.txt --set n=3
+"""
+import re
+import sys
+
+from physics_engine import NO_ALIASES, PhysicsEngine
+from physics_parser import resolve_symbol
+from physics_units import DIMENSIONLESS, Quantity, dimensions_of
+
+ASSIGNMENT = re.compile(r'\s*([^\W\d][\w∞]*)\s*=(?!=)(.*)$', re.DOTALL)
+NAME = re.compile(r'[^\W\d][\w∞]*$')
+HEADER = "# physics calculator worksheet"
+
+
+def parse_assignment(line):
+    """(name, expression) for a 'name = expression' line, or None for anything else"""
+    match = ASSIGNMENT.match(line)
+    if match is None:
+        return None
+    return match.group(1), match.group(2).strip()
+
+
+class Cell:
+    """One named expression and its latest value, dimension or error"""
+    __slots__ = ('name', 'text', 'program', 'dependencies', 'value', 'dims', 'error', 'dims_cache')
+
+    def __init__(self, name, text, program):
+        self.name = name
+        self.text = text
+        self.program = program
+        self.dependencies = program.variables
+        self.value = None
+        self.dims = None
+        self.error = None
+        # (dependency dimensions, dimension) from the last time it was worked out
+        self.dims_cache = None
+
+    def result(self):
+        """The value as a Quantity when its dimension is known"""
+        if self.dims is None:
+            return self.value
+        return Quantity(self.value, self.dims)
+
+    def __repr__(self):
+        return f"Cell({self.name!r}, {self.text!r})"
+
+
+class Worksheet:
+    """Named expressions evaluated with an engine, recomputed incrementally"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        # Cells in definition order
+        self.cells = {}
+        # Name -> names of the cells that use it (including names not defined yet)
+        self.dependents = {}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, name):
+        return name in self.cells
+
+    def __iter__(self):
+        return iter(self.cells.values())
+
+    def __getitem__(self, name):
+        return self.cells[name]
+
+    def check_name(self, name):
+        if not NAME.match(name):
+            raise ValueError(f"'{name}' is not a valid name")
+        if resolve_symbol(name, self.engine.namespace, NO_ALIASES) is not None:
+            raise ValueError(f"'{name}' is already a constant or unit")
+        if name in self.engine.functions:
+            raise ValueError(f"'{name}' is already a function")
+
+    def define(self, name, text):
+        """Set name's expression without evaluating anything; returns the new Cell
+
+        Raises ValueError for a bad name or a circular definition, and the
+        parser's errors for a bad expression.
+        """
+        self.check_name(name)
+        program = self.engine.compile_expression(text)
+        dependencies = program.variables
+        if name in dependencies:
+            raise ValueError(f"'{name}' cannot be defined in terms of itself")
+        downstream = set(self.downstream([name]))
+        for dependency in dependencies:
+            if dependency in downstream:
+                raise ValueError(f"Circular definition: '{dependency}' already depends on '{name}'")
+
+        old = self.cells.get(name)
+        if old is not None:
+            for dependency in old.dependencies:
+                self.dependents[dependency].discard(name)
+        cell = Cell(name, text.strip(), program)
+        self.cells[name] = cell
+        for dependency in dependencies:
+            self.dependents.setdefault(dependency, set()).add(name)
+        return cell
+
+    def assign(self, name, text):
+        """Define name as text and recompute it and everything downstream
+
+        Returns the names recomputed, in the order they were evaluated.
+        """
+        self.define(name, text)
+        return self.recompute([name])
+
+    def remove(self, name):
+        """Delete a name; the names that used it are recomputed (as errors) and returned"""
+        cell = self.cells.pop(name)
+        for dependency in cell.dependencies:
+            self.dependents[dependency].discard(name)
+        return self.recompute([name])
+
+    def clear(self):
+        self.cells.clear()
+        self.dependents.clear()
+
+    def downstream(self, names):
+        """names and every name that uses them, directly or not, in dependency order"""
+        # Reverse postorder of a depth-first walk along dependents, without recursion
+        # so long chains of definitions do not hit the recursion limit
+        order = []
+        seen = set()
+        for root in names:
+            if root in seen:
+                continue
+            seen.add(root)
+            stack = [(root, iter(self.dependents.get(root, ())))]
+            while stack:
+                name, users = stack[-1]
+                for user in users:
+                    if user not in seen:
+                        seen.add(user)
+                        stack.append((user, iter(self.dependents.get(user, ()))))
+                        break
+                else:
+                    stack.pop()
+                    order.append(name)
+        order.reverse()
+        return order
+
+    def recompute(self, names=None):
+        """Re-evaluate names (every cell by default) and their dependents; returns the names evaluated"""
+        if names is None:
+            names = list(self.cells)
+        updated = []
+        for name in self.downstream(names):
+            cell = self.cells.get(name)
+            if cell is not None:
+                self.evaluate(cell)
+                updated.append(name)
+        return updated
+
+    def evaluate(self, cell):
+        cell.value = cell.dims = cell.error = None
+        variables = {}
+        for dependency in cell.dependencies:
+            source = self.cells.get(dependency)
+            if source is None:
+                cell.error = f"'{dependency}' is not defined"
+                return
+            if source.error is not None:
+                cell.error = f"'{dependency}' has an error"
+                return
+            variables[dependency] = source.value
+        try:
+            cell.dims = self.dimensions(cell)
+            cell.value = self.engine.run(cell.program, variables)
+        except Exception as e:
+            cell.value = cell.dims = None
+            cell.error = str(e)
+
+    def dimensions(self, cell):
+        """The cell's dimension, worked out again only when its inputs' dimensions change"""
+        if not self.engine.check_dimensions:
+            return None
+        # Worked out here even without dependencies: the cell may have been
+        # compiled while dimension checks were off
+        key = tuple(self.cells[dependency].dims for dependency in cell.dependencies)
+        if cell.dims_cache is None or cell.dims_cache[0] != key:
+            namespace = self.engine.namespace
+            dims = dimensions_of(cell.program.tree, namespace, namespace.dimensions, self.engine.functions,
+                                 NO_ALIASES, dict(zip(cell.dependencies, key)))
+            cell.dims_cache = (key, dims)
+        return cell.dims_cache[1]
+
+    def variables(self):
+        """Name -> value (a Quantity where the dimension is known) of every cell without an error"""
+        return {name: cell.result() for name, cell in self.cells.items() if cell.error is None}
+
+    def values(self):
+        """Name -> plain value of every cell without an error"""
+        return {name: cell.value for name, cell in self.cells.items() if cell.error is None}
+
+    def format(self, cell):
+        """'value unit' text for a cell, or 'Error: ...'"""
+        if cell.error is not None:
+            return f"Error: {cell.error}"
+        formatted = self.engine.format_scientific(cell.value)
+        if cell.dims is not None and cell.dims != DIMENSIONLESS:
+            formatted = f"{formatted} {Quantity(cell.value, cell.dims).unit}"
+        return formatted
+
+    def dumps(self):
+        return "".join([HEADER + "\n"] + [f"{cell.name} = {cell.text}\n" for cell in self.cells.values()])
+
+    def loads(self, text):
+        """Replace the worksheet with the assignments in text, then evaluate them all"""
+        definitions = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            assignment = parse_assignment(line)
+            if assignment is None:
+                raise ValueError(f"line {number}: expected 'name = expression'")
+            definitions.append((number, assignment))
+        # The current worksheet is kept if any line is rejected
+        cells, dependents = self.cells, self.dependents
+        self.cells, self.dependents = {}, {}
+        for number, (name, expression) in definitions:
+            try:
+                self.define(name, expression)
+            except (ValueError, SyntaxError) as e:
+                self.cells, self.dependents = cells, dependents
+                raise ValueError(f"line {number}: {e}") from None
+        return self.recompute()
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.dumps())
+
+    def load(self, path):
+        with open(path, encoding='utf-8') as f:
+            return self.loads(f.read())
+
+
+def main(argv=None):
+    """Print the values of a saved worksheet, optionally with some names redefined"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluate a saved worksheet of named expressions")
+    parser.add_argument('worksheet', help="worksheet file of 'name = expression' lines")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=EXPRESSION',
+                        help="redefine NAME before printing (repeatable)")
+    parser.add_argument('--plain', action='store_true', help="disable scientific notation formatting")
+    parser.add_argument('-o', '--output', help="save the worksheet, with the --set changes, to this file")
+    args = parser.parse_args(argv)
+
+    engine = PhysicsEngine()
+    engine.scientific_mode = not args.plain
+    worksheet = Worksheet(engine)
+    try:
+        worksheet.load(args.worksheet)
+        for text in args.set:
+            assignment = parse_assignment(text)
+            if assignment is None:
+                raise ValueError(f"Expected NAME=EXPRESSION, got '{text}'")
+            worksheet.assign(*assignment)
+        if args.output:
+            worksheet.save(args.output)
+    except (ValueError, SyntaxError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    for cell in worksheet:
+        print(f"{cell.name} = {worksheet.format(cell)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
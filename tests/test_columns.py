@@ -0,0 +1,75 @@
+import pytest
+
+from physics_engine import PhysicsEngine
+from physics_columns import CsvSource, evaluate_columns, main, open_source
+
+np = pytest.importorskip('numpy')
+
+ENERGY = 'h*c/(λ*nm)/eV'
+
+
+@pytest.fixture
+def wavelengths():
+    return np.linspace(200.0, 1100.0, 50)
+
+
+def expected(text, **columns):
+    # The scalar engine, one row at a time
+    engine = PhysicsEngine()
+    rows = zip(*columns.values())
+    return [engine.evaluate(text, dict(zip(columns, row))) for row in rows]
+
+
+@pytest.mark.parametrize('output', ['energies.npy', 'energies.csv'])
+def test_npy_round_trip(tmp_path, wavelengths, output):
+    source = tmp_path / 'λ.npy'
+    np.save(source, wavelengths)
+    target = tmp_path / output
+    assert main([ENERGY, str(source), '--exact', '--chunk-size', '7', '-o', str(target)]) == 0
+    if output.endswith('.npy'):
+        results = np.load(target).tolist()
+    else:
+        lines = target.read_text(encoding='utf-8').splitlines()
+        assert lines[0] == 'result'
+        results = [float(line) for line in lines[1:]]
+    # Chunked and vectorized, the same floats bit for bit
+    assert results == expected(ENERGY, λ=wavelengths.tolist())
+
+
+def test_csv_columns_by_header_and_binding(tmp_path):
+    path = tmp_path / 'circuit.csv'
+    path.write_text('volts,amps\n1.5,0.5\n3.0,0.25\n\n4.5,1.5\n', encoding='utf-8')
+    source = open_source(str(path))
+    assert isinstance(source, CsvSource) and source.columns == ['volts', 'amps']
+    chunks = list(evaluate_columns(PhysicsEngine(), 'U/I', [source], {'U': 'volts', 'I': 'amps'}, chunk_size=2))
+    source.close()
+    assert np.concatenate(chunks).tolist() == [3.0, 12.0, 3.0]
+
+
+def test_files_side_by_side(tmp_path):
+    np.save(tmp_path / 'x.npy', np.arange(6.0))
+    np.save(tmp_path / 'pairs.npy', np.arange(12.0).reshape(6, 2))
+    sources = [open_source(str(tmp_path / 'x.npy')), open_source(str(tmp_path / 'pairs.npy'))]
+    assert sources[1].columns == ['pairs:0', 'pairs:1']
+    results = np.concatenate(list(evaluate_columns(PhysicsEngine(), 'x*a + b', sources,
+                                                   {'a': 'pairs:0', 'b': 'pairs:1'}, chunk_size=4)))
+    x, pairs = np.arange(6.0), np.arange(12.0).reshape(6, 2)
+    assert results.tolist() == (x * pairs[:, 0] + pairs[:, 1]).tolist()
+
+
+def test_numbered_columns_and_constant_expressions(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('1,2\n3,4\n', encoding='utf-8')
+    source = open_source(str(path))
+    assert source.columns == ['0', '1']
+    assert np.concatenate(list(evaluate_columns(PhysicsEngine(), '2*3', [source]))).tolist() == [6.0, 6.0]
+    source.close()
+
+
+def test_errors(tmp_path, capsys):
+    np.save(tmp_path / 'a.npy', np.arange(3.0))
+    np.save(tmp_path / 'b.npy', np.arange(4.0))
+    assert main(['a+b', str(tmp_path / 'a.npy'), str(tmp_path / 'b.npy')]) == 1
+    assert 'different numbers of rows' in capsys.readouterr().err
+    assert main(['a*z', str(tmp_path / 'a.npy')]) == 1
+    assert "No column 'z'" in capsys.readouterr().err
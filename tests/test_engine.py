@@ -0,0 +1,36 @@
+import pytest
+
+from physics_engine import PhysicsEngine
+
+
+def test_each_evaluation_is_one_cache_lookup():
+    engine = PhysicsEngine()
+    engine.evaluate_quantity('h*c/(500*nm)')
+    engine.evaluate_quantity('h*c/(500*nm)')
+    engine.evaluate('h*c/(500*nm)')
+    stats = engine.cache_stats()
+    assert (stats['misses'], stats['hits']) == (1, 2)
+    assert stats['hit_rate'] == pytest.approx(2 / 3)
+
+
+def test_surrounding_space_shares_a_cache_entry():
+    engine = PhysicsEngine()
+    assert engine.evaluate(' 2*x ', {'x': 3}) == engine.evaluate('2*x', {'x': 3}) == 6
+    assert engine.cache_stats()['size'] == 1
+
+
+def test_cache_is_bounded():
+    engine = PhysicsEngine(cache_size=8)
+    for n in range(20):
+        engine.evaluate(f'{n}*2')
+    assert engine.cache_stats()['size'] == 8
+    engine.evaluate('19*2')
+    assert engine.cache_stats()['hits'] == 1
+
+
+def test_defining_a_constant_drops_compiled_programs():
+    engine = PhysicsEngine()
+    engine.define_constant('k_test', 4.0)
+    assert engine.evaluate('k_test/2') == 2.0
+    engine.define_constant('k_test', 8.0)
+    assert engine.evaluate('k_test/2') == 4.0
@@ -0,0 +1,50 @@
+import math
+import random
+
+import pytest
+
+import physics_format
+from physics_engine import format_scientific
+from physics_format import format_scientific_batch
+
+EDGES = [0.0, -0.0, 1.0, -1.0, 0.5, 999999.0, 1000000.0, 0.000001, 0.0000011, 123456.789, 1e-320, 2.5e-315,
+         1.7976931348623157e308, 1e300, 1e-300, 1e22, 1e23, 2.5e-7, 1.0000005e10, 1.2345675e-8,
+         math.inf, -math.inf, math.nan, 42.0, 1e15 + 0.3]
+
+
+def corpus():
+    rng = random.Random(5)
+    values = list(EDGES)
+    values += [rng.choice((-1, 1)) * rng.uniform(1, 10) * 10.0 ** rng.randint(-320, 307) for _ in range(2000)]
+    # Mantissas with few digits sit on the rounding boundaries
+    values += [rng.randint(1, 9999999) / 10 ** rng.randint(0, 7) * 10.0 ** rng.randint(-30, 30) for _ in range(2000)]
+    return values
+
+
+@pytest.mark.parametrize('scientific_mode', [True, False])
+def test_batch_matches_the_scalar_formatter(scientific_mode):
+    values = corpus()
+    expected = [format_scientific(value, scientific_mode) for value in values]
+    assert format_scientific_batch(values, scientific_mode) == expected
+
+
+def test_arrays_of_any_number_type():
+    np = pytest.importorskip('numpy')
+    values = corpus()
+    assert format_scientific_batch(np.array(values)) == [format_scientific(value) for value in values]
+    assert format_scientific_batch(np.array([[1.5e-9, 2.0], [3.0, 4e9]])) == ['1.5×10^-9', '2', '3', '4.0×10^9']
+    integers = [3, 10 ** 7, -12]
+    assert format_scientific_batch(np.array(integers)) == [format_scientific(value) for value in integers]
+    halves = np.array([0.1, 2.5e-8], dtype=np.float32)
+    assert format_scientific_batch(halves) == [format_scientific(float(value)) for value in halves]
+
+
+def test_mixed_lists_use_the_scalar_formatter():
+    values = [2, 10 ** 400, 1.5, complex(1, 2)]
+    assert format_scientific_batch(values) == [format_scientific(value) for value in values]
+
+
+def test_without_numpy(monkeypatch):
+    monkeypatch.setattr(physics_format, 'np', None)
+    values = corpus()[:200]
+    assert format_scientific_batch(values) == [format_scientific(value) for value in values]
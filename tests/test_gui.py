@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+MOCKED = ['tkinter', 'tkinter.ttk', 'tkinter.messagebox', 'tkinter.filedialog', 'tkinter.font',
+          'tkinter.scrolledtext', 'physics_calculator_gui']
+
+
+class Root:
+    """Just enough of Tk's after() for PreviewWorker; callbacks run when run() is called"""
+
+    def __init__(self):
+        self.callbacks = {}
+        self.timers = 0
+
+    def after(self, delay, callback, *args):
+        self.timers += 1
+        self.callbacks[self.timers] = (callback, args)
+        return self.timers
+
+    def after_cancel(self, timer):
+        self.callbacks.pop(timer, None)
+
+    def run(self):
+        for timer in sorted(self.callbacks):
+            callback, args = self.callbacks.pop(timer)
+            callback(*args)
+
+    def wait(self, timeout=5.0):
+        """Wait for the preview thread to queue a result"""
+        deadline = time.monotonic() + timeout
+        while not self.callbacks:
+            assert time.monotonic() < deadline, "no preview arrived"
+            time.sleep(0.001)
+
+
+@pytest.fixture
+def gui(monkeypatch, tmp_path):
+    """The calculator module, imported against the mocked Tk in benchmarks/mock_tk.py"""
+    monkeypatch.syspath_prepend(BENCHMARKS)
+    import mock_tk
+    for name in MOCKED:
+        # Put back whatever was imported before once the test is done
+        monkeypatch.setitem(sys.modules, name, None)
+        del sys.modules[name]
+    mock_tk.install()
+    monkeypatch.setattr(mock_tk.Widget, 'pending', [])
+    # Never the user's own history file
+    monkeypatch.setenv('PHYSICS_CALC_HISTORY', str(tmp_path / 'history.sqlite3'))
+    import physics_calculator_gui
+    return physics_calculator_gui
+
+
+@pytest.fixture
+def calc(gui):
+    calc = gui.PhysicsCalculatorGUI()
+    calc.flush_display()
+    yield calc
+    calc.on_close()
+
+
+def test_a_burst_of_keys_is_one_display_update(calc, monkeypatch):
+    updates = []
+    update = calc._update_display
+    monkeypatch.setattr(calc, '_update_display', lambda: (update(), updates.append(calc._current_input)))
+    for char in '12+3*4':
+        calc.add_to_input(char)
+    assert calc.pending_input and calc.display_pending
+    calc.flush_display()
+    calc.flush_display()
+    assert updates == ['12+3*4']
+    assert calc.input_var.get() == '12+3*4'
+
+
+@pytest.mark.parametrize('keys, text', [
+    ('12\x083', '13'),
+    ('99\x1b4', '4'),
+    ('05', '5'),
+    ('0.5', '0.5'),
+    ('\x08\x08', ''),
+])
+def test_edit_keys_apply_in_order(calc, keys, text):
+    calc.inject(keys)
+    calc.flush_display()
+    assert calc.current_input == text
+    assert calc.input_var.get() == (text or '0')
+
+
+def test_buffered_keys_come_before_later_edits(calc):
+    calc.add_to_input('2')
+    calc.add_symbol('c')
+    calc.flush_display()
+    assert calc.current_input == '2*c'
+
+
+def test_paste_is_one_edit(calc, monkeypatch):
+    monkeypatch.setattr(calc.root, 'clipboard_get', lambda: '  h*c/(500*nm)\n', raising=False)
+    calc.add_to_input('(')
+    assert calc.paste() == 'break'
+    calc.add_to_input(')')
+    calc.flush_display()
+    assert calc.current_input == '(h*c/(500*nm))'
+
+
+def test_keys_typed_before_enter_are_calculated(calc):
+    calc.inject('6*7')
+    calc.calculate()
+    assert calc.last_result == 42
+    assert calc.history.get(len(calc.history) - 1) == '6*7 = 42'
+
+
+def test_only_the_newest_preview_is_evaluated(gui):
+    root = Root()
+    previews = []
+    worker = gui.PreviewWorker(root, lambda text, preview: previews.append((text, preview)))
+    worker.request('2*')
+    worker.request('2*3')
+    # The debounce timer of the first request was cancelled
+    assert len(root.callbacks) == 1
+    root.run()
+    root.wait()
+    root.run()
+    assert previews == [('2*3', '6')]
+
+
+def test_stale_previews_are_dropped(gui):
+    root = Root()
+    previews = []
+    worker = gui.PreviewWorker(root, lambda text, preview: previews.append((text, preview)))
+    worker.request('x*3', variables={'x': 2})
+    root.run()
+    root.wait()
+    # The input changed while the first result was on its way
+    worker.request('4+4')
+    root.run()
+    root.wait()
+    root.run()
+    assert previews == [('4+4', '8')]
+
+
+def test_previews_of_old_input_are_not_shown(calc):
+    calc.inject('2*3')
+    calc.flush_display()
+    calc.show_preview('2*', '2')
+    assert calc.display_var.get() == '2*3'
+    calc.show_preview('2*3', '6')
+    assert calc.display_var.get() == '6'
@@ -0,0 +1,48 @@
+import pytest
+
+from physics_history import HistoryStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'history.sqlite3')
+
+
+def test_entries_read_back_by_index_and_search(path):
+    store = HistoryStore(path, buffer_size=4)
+    for n in range(10):
+        store.append(f'{n}*2', str(n * 2))
+    assert len(store) == 10
+    # Older entries come from the file, newer ones from the ring buffer
+    assert store.window(0, 3) == ['0*2 = 0', '1*2 = 2', '2*2 = 4']
+    assert store.window(5, 3) == ['5*2 = 10', '6*2 = 12', '7*2 = 14']
+    assert store.get(9) == '9*2 = 18'
+    with pytest.raises(IndexError):
+        store.get(10)
+    assert store.search('7*2') == [(7, '7*2 = 14')]
+    store.close()
+
+    reopened = HistoryStore(path, buffer_size=4)
+    assert len(reopened) == 10 and reopened.get(3) == '3*2 = 6'
+    reopened.close()
+
+
+def test_windows_sharing_a_file_take_turns(path):
+    first, second = HistoryStore(path), HistoryStore(path)
+    for n in range(3):
+        assert first.append(f'a{n}', '1') == 2 * n
+        first.flush()
+        # The second window picks up the first one's entries on its next append
+        assert second.append(f'b{n}', '2') == 2 * n + 1
+        second.flush()
+    assert len(second) == 6
+    assert second.window(0, 6) == ['a0 = 1', 'b0 = 2', 'a1 = 1', 'b1 = 2', 'a2 = 1', 'b2 = 2']
+    assert first.append('a3', '1') == 6
+    first.flush()
+    assert first.window(4, 3) == ['a2 = 1', 'b2 = 2', 'a3 = 1']
+    assert [index for index, line in first.search('b1')] == [3]
+
+    second.clear()
+    assert first.append('a4', '1') == 0 and len(first) == 1
+    first.close()
+    second.close()
@@ -0,0 +1,59 @@
+import math
+
+import pytest
+
+from physics_engine import PhysicsEngine
+from physics_integrate import IntegrationError
+
+# Stefan–Boltzmann: ∫ h ν^3/(exp(hν/kT) - 1) dν from 0 to ∞ = (kT)^4/h^3 × π^4/15
+KT = 1.380649e-23 * 5778
+STEFAN_BOLTZMANN = KT ** 4 / 6.62607015e-34 ** 3 * math.pi ** 4 / 15
+
+
+@pytest.fixture
+def engine():
+    return PhysicsEngine()
+
+
+def test_planck_spectrum_with_expm1(engine):
+    result = engine.evaluate('integrate(h*ν^3/expm1(h*ν/(kB*5778*K)), ν, 0*Hz, ∞*Hz)')
+    assert result == pytest.approx(STEFAN_BOLTZMANN, rel=1e-12)
+
+
+def test_planck_spectrum_with_exp_minus_one(engine):
+    # exp(x)-1 rounds to 0 next to ν = 0; the end point's limit is taken instead
+    result = engine.evaluate('integrate(h*ν^3/(exp(h*ν/(kB*5778*K))-1), ν, 0*Hz, ∞*Hz)')
+    assert result == pytest.approx(STEFAN_BOLTZMANN, rel=1e-12)
+
+
+def test_dimensionless_planck_integral(engine):
+    assert engine.evaluate('integrate(x^3/expm1(x), x, 0, ∞)') == pytest.approx(math.pi ** 4 / 15, rel=1e-14)
+
+
+def test_spectral_radiance_over_wavelength_has_units(engine):
+    result = engine.evaluate_quantity('integrate(2*π*h*c^2/λ^5/expm1(h*c/(λ*kB*5778*K)), λ, 0*m, ∞*m)')
+    assert result.value == pytest.approx(5.670374419e-8 * 5778 ** 4, rel=1e-9)
+    assert result.unit == engine.evaluate_quantity('W/m^2').unit
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('integrate(exp(-x^2), x, -∞, ∞)', math.sqrt(math.pi)),
+    ('integrate(1/(1+x^2), x, -∞, ∞)', math.pi),
+    ('integrate(1/x^2, x, 1, ∞)', 1.0),
+    ('integrate(sin(x), x, 0, π)', 2.0),
+    ('integrate(1/sqrt(x), x, 0, 1)', 2.0),
+    ('integrate(x, x, 2, 1)', -1.5),
+    ('sum(1/n^2, n, 1, ∞)', math.pi ** 2 / 6),
+    ('sum(n, n, 1, 100)', 5050),
+])
+def test_integrals_and_sums(engine, text, expected):
+    assert engine.evaluate(text) == pytest.approx(expected, rel=1e-9)
+
+
+def test_divergent_integral_is_an_error(engine):
+    with pytest.raises(IntegrationError):
+        engine.evaluate('integrate(1/x^2, x, 0, 1)')
+
+
+def test_expm1_keeps_digits_near_zero(engine):
+    assert engine.evaluate('expm1(1e-20)') == 1e-20
@@ -0,0 +1,68 @@
+import pytest
+
+from physics_engine import PhysicsEngine
+from physics_memo import MemoCache
+
+EXPRESSIONS = [
+    ('sqrt(x)*sqrt(x)+exp(-x)', {'x': 2.0}),
+    ('pow(x, 200)', {'x': 3}),
+    ('pow(x, 0.5)', {'x': 2}),
+    ('abs(x)', {'x': -2}),
+    ('abs(x)', {'x': -2.0}),
+    ('x*1', {'x': -0.0}),
+    ('sin(x)^2+cos(x)^2', {'x': 0.3}),
+    ('h*c/(500*nm)/eV', None),
+    ('10**300*10**300', None),
+]
+
+
+@pytest.mark.parametrize('text, variables', EXPRESSIONS)
+def test_memoized_results_are_the_uncached_ones(text, variables):
+    plain = PhysicsEngine()
+    memoized = PhysicsEngine(memo_size=64)
+    expected = plain.evaluate(text, variables)
+    for _ in range(3):
+        # A miss, then hits
+        value = memoized.evaluate(text, variables)
+        # repr tells 2 from 2.0 and 0.0 from -0.0
+        assert repr(value) == repr(expected)
+
+
+def test_hits_and_misses_are_counted():
+    engine = PhysicsEngine(memo_size=16)
+    assert PhysicsEngine().memo_stats() is None
+    engine.evaluate('sqrt(x)', {'x': 2})
+    engine.evaluate('sqrt(x)', {'x': 2})
+    stats = engine.memo_stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+    # 2 and 2.0 are different arguments
+    engine.evaluate('sqrt(x)', {'x': 2.0})
+    assert engine.memo_stats()['misses'] == 2
+
+
+def test_errors_are_not_cached():
+    engine = PhysicsEngine(memo_size=16)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            engine.evaluate('ln(x)', {'x': 0})
+    stats = engine.memo_stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (0, 2, 0)
+
+
+def test_the_memo_is_bounded_and_cleared():
+    cache = MemoCache(2)
+    for key in 'abc':
+        cache.store(key, key.upper())
+    assert cache.lookup('a') == (False, None)
+    assert cache.lookup('c') == (True, 'C')
+    assert cache.stats()['size'] == 2
+
+    engine = PhysicsEngine(memo_size=16)
+    engine.evaluate('sqrt(x)', {'x': 2})
+    engine.clear_cache()
+    assert engine.memo_stats()['size'] == 0
+
+
+def test_size_from_the_environment(monkeypatch):
+    monkeypatch.setenv('PHYSICS_CALC_MEMO', '8')
+    assert PhysicsEngine().memo_stats()['maxsize'] == 8
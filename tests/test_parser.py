@@ -0,0 +1,129 @@
+import math
+from decimal import Decimal
+
+import pytest
+
+from physics_engine import FUNCTIONS, PhysicsEngine
+from physics_parser import ExpressionError, compile_expression, parse, run
+
+SYMBOLS = {'h': 6.62607015e-34, 'c': 299792458.0, 'kB': 1.380649e-23, 'eV': 1.602176634e-19, 'nm': 1e-9,
+           'mₑ': 9.1093837015e-31, 'π': math.pi, 'ε₀': 8.8541878128e-12}
+VARIABLES = {'x': 2.5, 'y': -0.75, 'n': 3}
+
+# (calculator syntax, the same computation in Python)
+CORPUS = [
+    ("1+2*3", "1+2*3"),
+    ("2^3^2", "2**3**2"),
+    ("-2^2", "-2**2"),
+    ("2^-1", "2**-1"),
+    ("(1+2)*(3+4)/5", "(1+2)*(3+4)/5"),
+    ("7-3-2", "7-3-2"),
+    ("2**10", "2**10"),
+    ("6×7÷3", "6*7/3"),
+    ("1.5×10^3*eV", "(1.5*10**3)*eV"),
+    (".5e-3+2.", ".5e-3+2."),
+    ("h*c/(500*nm)/eV", "h*c/(500*nm)/eV"),
+    ("mₑ*c^2", "me*c**2"),
+    ("me*c^2", "me*c**2"),
+    ("1/(4*π*ε₀)", "1/(4*π*ε0)"),
+    ("sqrt(kB*300)", "sqrt(kB*300)"),
+    ("x*y-x/y+x^n", "x*y-x/y+x**n"),
+    ("-x^2+ +y", "-x**2+ +y"),
+    ("h*c/(x*nm)/eV", "h*c/(x*nm)/eV"),
+    ("sqrt(x^2+y^2)*exp(-x/y)+x^2", "sqrt(x**2+y**2)*exp(-x/y)+x**2"),
+    ("sin(x)^2+cos(x)^2", "sin(x)**2+cos(x)**2"),
+    ("ln(x)*log10(x)+abs(y)", "ln(x)*log10(x)+abs(y)"),
+    ("pow(x, n)+pow(2, 0.5)", "pow(x, n)+pow(2, 0.5)"),
+    ("(x+y)*(x+y)/(x+y)^2", "(x+y)*(x+y)/(x+y)**2"),
+    ("2*x*c*h", "2*x*c*h"),
+    ("n^n^2", "n**n**2"),
+]
+
+
+def eval_namespace():
+    namespace = {'__builtins__': {}, 'me': SYMBOLS['mₑ'], 'ε0': SYMBOLS['ε₀']}
+    namespace.update(FUNCTIONS)
+    namespace.update(SYMBOLS)
+    namespace.update(VARIABLES)
+    return namespace
+
+
+@pytest.mark.parametrize('text, source', CORPUS)
+def test_results_match_python_eval(text, source):
+    expected = eval(source, eval_namespace())
+    program = compile_expression(text, SYMBOLS, FUNCTIONS)
+    variables = {name: VARIABLES[name] for name in program.variables}
+    # Same operations in the same order, so the same float, bit for bit
+    assert program.run(FUNCTIONS, variables) == expected
+    assert run(program.code, FUNCTIONS, variables, program.temps) == expected
+    assert type(program.run(FUNCTIONS, variables)) is type(expected)
+
+
+def test_repeated_subexpressions_are_computed_once():
+    calls = []
+
+    def traced_sqrt(value):
+        calls.append(value)
+        return math.sqrt(value)
+
+    functions = dict(FUNCTIONS, sqrt=traced_sqrt)
+    program = compile_expression('sqrt(x)*sqrt(x)+sqrt(x)', SYMBOLS, functions)
+    assert program.run(functions, {'x': 4.0}) == 6.0
+    assert calls == [4.0]
+
+
+def test_constants_fold_to_one_value():
+    program = compile_expression('h*c/(500*nm)', SYMBOLS, FUNCTIONS)
+    assert program.is_constant()
+    assert not compile_expression('h*c/x', SYMBOLS, FUNCTIONS).is_constant()
+
+
+def test_missing_variable_is_a_name_error():
+    program = compile_expression('x+1', SYMBOLS, FUNCTIONS)
+    with pytest.raises(NameError, match="'x'"):
+        program.run(FUNCTIONS)
+    with pytest.raises(NameError, match="'x'"):
+        program.run(FUNCTIONS, {'y': 1})
+
+
+@pytest.mark.parametrize('text', ['1+', '(1+2', '2**', 'sqrt(1,', '1 2', '', '3!', 'x.real'])
+def test_syntax_errors(text):
+    with pytest.raises(ExpressionError):
+        parse(text)
+
+
+@pytest.mark.parametrize('text', ['__import__', 'x.__class__', 'open("f")', '().__class__'])
+def test_python_is_out_of_reach(text):
+    engine = PhysicsEngine()
+    with pytest.raises((ExpressionError, NameError, ValueError)):
+        engine.evaluate(text)
+
+
+def test_huge_integer_powers_are_refused():
+    program = compile_expression('n^n', SYMBOLS, FUNCTIONS)
+    with pytest.raises(OverflowError):
+        program.run(FUNCTIONS, {'n': 10 ** 6})
+
+
+@pytest.mark.parametrize('text', ['(((10**64)**64)**64)**64', '((n**64)**64)**64', 'pow(pow(n, 64), 4096)'])
+def test_small_exponents_of_large_integers_are_refused(text):
+    # Each power alone has a small exponent; the result would still take
+    # minutes to compute, holding the GIL
+    with pytest.raises(OverflowError):
+        compile_expression(text, SYMBOLS, FUNCTIONS).run(FUNCTIONS, {'n': 10 ** 64})
+    program = compile_expression(text.replace('10**64', 'n'), SYMBOLS, FUNCTIONS)
+    with pytest.raises(OverflowError):
+        run(program.code, FUNCTIONS, {'n': 10 ** 64}, program.temps)
+    assert PhysicsEngine().format_scientific(PhysicsEngine().evaluate(text, {'n': 10 ** 64})) == '1.0×10^16777216'
+
+
+@pytest.mark.parametrize('text, value', [
+    ('2×10^3', 2000),
+    ('1.5×10^3', 1500.0),
+    ('1×10^30000000', Decimal('1e30000000')),
+    ('2.5×10^-3000000', Decimal('2.5e-3000000')),
+])
+def test_scientific_literals_never_build_huge_integers(text, value):
+    # 10**30000000 as an int would take minutes to compute
+    node = parse(text)
+    assert node == ('num', value) and type(node[1]) is type(value)
@@ -0,0 +1,131 @@
+import math
+from decimal import Decimal
+
+import pytest
+
+from physics_engine import PhysicsEngine
+from physics_precision import format_decimal
+
+
+@pytest.fixture
+def engine():
+    return PhysicsEngine()
+
+
+@pytest.mark.parametrize('text, formatted', [
+    ('euler**1000', '1.970071×10^434'),
+    ('10**10**9', '1.0×10^1000000000'),
+    ('exp(1e17)', '5.822546×10^43429448190325182'),
+    ('2.0**1e17', '3.321803×10^30102999566398119'),
+    ('exp(-1e17)', '1.717462×10^-43429448190325183'),
+])
+def test_results_beyond_the_default_decimal_context_format(engine, text, formatted):
+    result = engine.evaluate(text)
+    assert isinstance(result, Decimal)
+    assert engine.format_scientific(result) == formatted
+
+
+def test_format_decimal_rounds_into_the_next_power():
+    assert format_decimal(Decimal('9.9999999999E+400')) == '1.0×10^401'
+
+
+@pytest.mark.parametrize('text, formatted', [
+    ('1e400', '1.0×10^400'),
+    ('1e-400', '1.0×10^-400'),
+    ('1e400*2.0', '2.0×10^400'),
+    ('1.5×10^400', '1.5×10^400'),
+    ('5×10^-400', '5.0×10^-400'),
+])
+def test_literals_beyond_the_float_range_are_decimal(engine, text, formatted):
+    assert engine.format_scientific(engine.evaluate(text)) == formatted
+
+
+def test_literals_beyond_the_float_range_fold_back_into_floats(engine):
+    assert engine.evaluate('1e-400*1e400') == 1.0
+    assert engine.evaluate('ln(1e400)') == pytest.approx(921.0340371976183)
+
+
+@pytest.mark.parametrize('text, doubled', [
+    ('euler**1000', '3.940142×10^434'),
+    ('exp(-1000)', '1.015192×10^-434'),
+])
+def test_decimal_result_reused_as_input(engine, text, doubled):
+    # The GUI chains calculations through the text of the last result
+    result = engine.evaluate(text)
+    assert isinstance(result, Decimal)
+    assert engine.format_scientific(engine.evaluate(f"{result}*2")) == doubled
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('(1e16 + 1) - 1e16', 1.0),
+    ('1.00782503223*u - 1.00782503207*u', float(Decimal('0.00000000016') * Decimal('1.66053906660e-27'))),
+    ('sqrt(1e16 + 1) - 1e8', 5e-9),
+])
+def test_cancellation_is_recomputed_in_decimal(engine, text, expected):
+    result = engine.evaluate(text)
+    assert type(result) is float
+    assert result == pytest.approx(expected, rel=1e-15)
+
+
+def test_overflow_and_underflow_escalate(engine):
+    assert engine.format_scientific(engine.evaluate('exp(-1000)')) == '5.075959×10^-435'
+    assert engine.format_scientific(engine.evaluate('10.0^400/7')) == '1.428571×10^399'
+    assert engine.evaluate('10.0^400/10.0^399') == 10.0
+
+
+def test_the_tier_is_remembered_on_the_program(engine):
+    plain = engine.compile_expression('h*c + 1')
+    cancelling = engine.compile_expression('(1e16 + 1) - 1e16')
+    engine.evaluate('h*c + 1')
+    engine.evaluate('(1e16 + 1) - 1e16')
+    assert plain.precision == 0
+    assert cancelling.precision > 0
+    assert engine.evaluate('(1e16 + 1) - 1e16') == 1.0
+
+
+def test_decimal_inputs(engine):
+    assert engine.evaluate('x*2', {'x': Decimal('1e400')}) == Decimal('2e400')
+    assert engine.evaluate('sqrt(x)', {'x': Decimal('1e400')}) == pytest.approx(1e200)
+    assert engine.evaluate('x/1e300', {'x': Decimal('1e400')}) == pytest.approx(1e100)
+
+
+def test_ordinary_results_stay_floats(engine):
+    assert engine.evaluate('h*c/(500*nm)/eV') == pytest.approx(2.479683968)
+    assert type(engine.evaluate('sqrt(2) - 1')) is float
+    assert type(engine.evaluate('integrate(x^2, x, 0, 1)')) is float
+
+
+def test_precision_zero_turns_the_tiers_off(monkeypatch):
+    monkeypatch.setenv('PHYSICS_CALC_PRECISION', '0')
+    engine = PhysicsEngine()
+    assert engine.evaluate('(1e16 + 1) - 1e16') == 0.0
+    assert engine.evaluate('exp(-1000)') == 0.0
+
+
+@pytest.mark.parametrize('text, value', [
+    ('1/∞', 0.0),
+    ('exp(-∞)', 0.0),
+    ('-∞', -math.inf),
+    ('inf', math.inf),
+])
+def test_infinity_is_the_float_infinity(engine, text, value):
+    result = engine.evaluate(text)
+    assert type(result) is float and result == value
+
+
+def test_infinity_formats_as_inf(engine):
+    assert engine.format_scientific(engine.evaluate('∞')) == 'inf'
+
+
+@pytest.mark.parametrize('text', ['0*h', '1/∞', 'h*c - h*c'])
+def test_exact_zero_is_settled_by_the_first_check(engine, text):
+    for _ in range(3):
+        assert engine.evaluate(text) == 0.0
+    assert engine.precision.escalations <= 1
+    assert engine.compile_expression(text).precision == 0
+
+
+def test_zero_with_variables_is_still_checked_for_underflow(engine):
+    assert engine.evaluate('exp(-x)', {'x': 1.0}) == pytest.approx(0.36787944117144233)
+    # The program settled on floats; an underflow later is still caught
+    assert engine.format_scientific(engine.evaluate('exp(-x)', {'x': 1000.0})) == '5.075959×10^-435'
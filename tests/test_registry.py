@@ -0,0 +1,85 @@
+import pytest
+
+from physics_engine import PhysicsEngine
+from physics_registry import SI_UNIT, UNIT, Namespace, Registry, default_registry
+from physics_units import dimension
+
+
+@pytest.fixture
+def registry():
+    return default_registry()
+
+
+@pytest.mark.parametrize('name, value', [
+    ('keV', 1.602176634e-16),
+    ('MeV', 1.602176634e-13),
+    ('nm', 1e-9),
+    ('GHz', 1e9),
+    ('hPa', 100.0),
+    ('kg', 1.0),
+    ('mg', 1e-6),
+    ('dam', 10.0),
+    ('kmol', 1000.0),
+    ('QJ', 1e30),
+    ('qm', 1e-30),
+])
+def test_prefixed_units(registry, name, value):
+    # Scaled in decimal, so the float is the nearest to the exact value
+    assert registry[name] == value
+
+
+def test_prefixed_entry_has_the_units_dimension_and_name(registry):
+    entry = registry.lookup('GHz')
+    assert entry.kind == UNIT
+    assert entry.dims == dimension(s=-1)
+    assert entry.name == 'giga' + registry.lookup('Hz').name
+
+
+def test_every_micro_sign_means_micro(registry):
+    assert registry['µF'] == registry['μF'] == registry['uF'] == pytest.approx(1e-6)
+
+
+def test_listed_symbols_win_over_prefix_readings(registry):
+    # Pa is the pascal, not peta-annum; cd the candela, mol the mole
+    assert registry.lookup('Pa').kind == SI_UNIT
+    assert registry.lookup('cd').dims == dimension(cd=1)
+    assert registry['mol'] == 1
+
+
+@pytest.mark.parametrize('name', ['kh', 'kc', 'k', 'da', 'xm', 'kkm', 'mₑV'])
+def test_names_that_do_not_resolve(registry, name):
+    # Constants take no prefixes, and a prefix alone or doubled is not a unit
+    assert registry.lookup(name) is None
+    assert name not in registry
+
+
+def test_nfkc_spelling(registry):
+    assert registry.lookup('me') is registry.lookup('mₑ')
+    assert registry['ε0'] == registry['ε₀']
+
+
+def test_loading_is_lazy(tmp_path):
+    path = tmp_path / 'data.tsv'
+    path.write_text("# test data\nm\t1\tm\tsi-unit\tmetre\nft\t0.3048\tm\tunit\tfoot\n", encoding='utf-8')
+    registry = Registry(str(path))
+    assert registry.lines is None
+    assert registry['km'] == 1000
+    # Only the entries looked up so far have been parsed
+    assert set(registry.entries) == {'m', 'km'}
+    assert registry.lookup('kft') is None
+    assert sorted(registry.symbols()) == ['ft', 'm']
+
+
+def test_namespace_definitions_hide_the_registry(registry):
+    namespace = Namespace(registry)
+    namespace.define('c', 1.0)
+    assert namespace['c'] == 1.0
+    assert registry['c'] == 299792458
+    assert namespace['keV'] == registry['keV']
+
+
+def test_engine_evaluates_prefixed_units():
+    engine = PhysicsEngine()
+    assert engine.evaluate('h*c/(500*nm)/eV') == pytest.approx(2.479683968)
+    assert engine.evaluate('3*keV/eV') == pytest.approx(3000)
+    assert engine.evaluate_quantity('2*kN*3*mm').dims == engine.evaluate_quantity('J').dims
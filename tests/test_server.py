@@ -0,0 +1,151 @@
+import asyncio
+import json
+import socket
+
+import pytest
+
+from physics_engine import PhysicsEngine
+from physics_server import EvaluationClient, EvaluationServer, json_value
+
+
+def exchange(path, calls):
+    """Start a server on path, run calls(client) against it and return the result"""
+    async def session():
+        server = EvaluationServer()
+        await server.start(path)
+        client = await EvaluationClient().connect(path)
+        try:
+            return await calls(client)
+        finally:
+            await client.close()
+            await server.close()
+    return asyncio.run(session())
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'physics.sock')
+
+
+def test_round_trip(path):
+    async def calls(client):
+        return (await client.evaluate('h*c/(500*nm)/eV'), await client.evaluate('h*c/x', {'x': 5e-7}),
+                await client.lookup('GHz'), await client.evaluate('1/'))
+
+    energy, variable, lookup, error = exchange(path, calls)
+    assert energy['value'] == pytest.approx(2.479683968)
+    assert energy['text'] and energy['unit'] == ''
+    assert variable['value'] == pytest.approx(3.972891714e-19)
+    assert lookup['value'] == 1e9 and lookup['unit'] == 's⁻¹'
+    assert 'error' in error and 'value' not in error
+
+
+def test_batched_requests_answer_in_order(path):
+    expressions = ['2*3', 'sqrt(16)', '2*3', 'kB*300', '2*3']
+
+    async def calls(client):
+        return await client.evaluate_many(expressions), await client.stats()
+
+    responses, stats = exchange(path, calls)
+    assert [response['value'] for response in responses] == [6, 4.0, 6, pytest.approx(4.141947e-21), 6]
+    # The stats request itself is counted once its batch is done
+    assert stats['requests'] == len(expressions)
+
+
+def test_non_finite_values_are_standard_json(path):
+    async def calls(client):
+        return await client.evaluate('1e308*10'), await client.evaluate('x - x', {'x': 1e308 * 10})
+
+    overflow, undefined = exchange(path, calls)
+    # The decimal tier keeps the first in range as text; the second has no number at all
+    assert isinstance(overflow['value'], str)
+    assert undefined['value'] == 'nan'
+
+
+def test_stale_socket_is_replaced(path):
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+
+    async def calls(client):
+        return await client.evaluate('1+1')
+
+    assert exchange(path, calls)['value'] == 2
+
+
+def test_other_files_at_the_socket_path_are_kept(path):
+    with open(path, 'w') as f:
+        f.write('data')
+
+    async def calls(client):
+        return None
+
+    with pytest.raises(FileExistsError):
+        exchange(path, calls)
+    with open(path) as f:
+        assert f.read() == 'data'
+
+
+def test_bad_request_gets_an_error(path):
+    async def session():
+        server = EvaluationServer()
+        await server.start(path)
+        reader, writer = await asyncio.open_unix_connection(path)
+        try:
+            writer.write(b'[1, 2]\n')
+            await writer.drain()
+            return json.loads(await reader.readline())
+        finally:
+            writer.close()
+            await server.close()
+
+    response = asyncio.run(session())
+    assert response['id'] is None and response['error'].startswith('Bad request')
+
+
+def test_bad_results_and_variables_do_not_stop_the_server(path):
+    async def calls(client):
+        first = await asyncio.gather(client.evaluate('cbrt(-8)'), client.evaluate('x*3', {'x': 'ab'}),
+                                     client.evaluate('x*3', {'x': [1]}), client.request(expr='x', variables=5),
+                                     client.request(expr=None), client.evaluate('2*3'))
+        return first, await client.evaluate('h*c')
+
+    (complex_root, string, array, scalar, missing, product), later = exchange(path, calls)
+    assert complex_root['value'] == '(1.0000000000000002+1.7320508075688772j)'
+    assert complex_root['text'] == complex_root['value']
+    for response in (string, array, scalar):
+        assert response['error'] == "'variables' must be an object mapping names to numbers"
+    assert 'error' in missing
+    assert product['value'] == 6
+    assert later['value'] == pytest.approx(1.98644586e-25)
+
+
+def test_shared_expressions_are_evaluated_together():
+    np = pytest.importorskip('numpy')
+    server = EvaluationServer()
+    scalar = []
+    evaluate_quantity = server.evaluate_quantity
+
+    def counted(text, variables):
+        scalar.append(variables)
+        return evaluate_quantity(text, variables)
+
+    server.evaluate_quantity = counted
+    xs = [float(x) for x in np.linspace(0.1, 3, 20)] + [0.0, 800.0, 2.5]
+    requests = [{'id': index, 'expr': 'sqrt(x)*exp(-x)/x', 'variables': {'x': x}} for index, x in enumerate(xs)]
+    requests += [{'id': 'a', 'expr': 'h*c'}, {'id': 'b', 'expr': 'h*c'}]
+    responses = server.evaluate_batch(requests)
+    server.executor.shutdown()
+
+    engine = PhysicsEngine()
+    for x, response in zip(xs, responses):
+        if x == 0:
+            assert 'error' in response
+        else:
+            # The same values as the scalar path, bit for bit
+            expected = engine.evaluate('sqrt(x)*exp(-x)/x', {'x': x})
+            assert response['value'] == json_value(expected)
+            assert response['text'] == engine.format_scientific(expected)
+    assert responses[-2]['value'] == responses[-1]['value'] == engine.evaluate('h*c')
+    # The first request, then 0 (an error) and 800 (underflows to a decimal) on their own, plus h*c once
+    assert len(scalar) == 4
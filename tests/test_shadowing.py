@@ -0,0 +1,66 @@
+import math
+
+import pytest
+
+from physics_engine import PhysicsEngine
+from physics_solve import solve, solve_quantity
+from physics_units import dimension
+
+
+@pytest.fixture
+def engine():
+    return PhysicsEngine()
+
+
+def test_bound_temperature_hides_tesla(engine):
+    assert engine.evaluate('sqrt(kB*T)', {'T': 300}) == pytest.approx(6.435795988e-11)
+    # Unbound, T is still the tesla
+    assert engine.evaluate('sqrt(kB*T)') == pytest.approx(math.sqrt(1.380649e-23))
+
+
+def test_bound_names_hide_gas_constant_and_volt(engine):
+    assert engine.evaluate('R*T/V', {'R': 1, 'T': 2, 'V': 4}) == 0.5
+    assert engine.evaluate('R*T/V', {'T': 2, 'V': 4}) == pytest.approx(8.314462618 / 2)
+
+
+def test_shadowed_and_plain_programs_are_cached_separately(engine):
+    assert engine.evaluate('2*T', {'T': 3}) == 6
+    assert engine.evaluate('2*T') == 2
+    assert engine.evaluate('2*T', {'T': 5}) == 10
+    assert engine.cache_stats()['misses'] == 2
+
+
+def test_bound_name_takes_the_callers_dimension(engine):
+    result = engine.evaluate_quantity('kB*T', {'T': 300 * engine.evaluate_quantity('K')})
+    assert result.value == pytest.approx(4.141947e-21)
+    assert result.dims == engine.evaluate_quantity('J').dims
+
+
+def test_bound_name_that_would_mismatch_as_a_unit(engine):
+    # T + 300*K is a DimensionError with T as the tesla
+    assert engine.evaluate('T + 300*K', {'T': 1}) == 301
+
+
+def test_decimal_tier_uses_bound_value(engine):
+    assert engine.evaluate('(1e16 + T) - 1e16', {'T': 2}) == 2
+
+
+def test_solve_for_a_unit_symbol(engine):
+    assert solve(engine, 'kB*T/eV = 0.025', variable='T') == pytest.approx(290.112953, rel=1e-6)
+    root = solve_quantity(engine, 'kB*T = 0.025*eV', variable='T')
+    assert root.dims == dimension(K=1)
+
+
+def test_sweep_over_a_unit_symbol(engine):
+    np = pytest.importorskip('numpy')
+    from physics_sweep import sweep
+    assert np.allclose(sweep(engine, 'kB*T', 'T', [1.0, 2.0]), [1.380649e-23, 2.761298e-23])
+
+
+def test_column_named_like_a_unit(engine, tmp_path):
+    np = pytest.importorskip('numpy')
+    from physics_columns import evaluate_columns, open_source
+    path = tmp_path / 'data.csv'
+    path.write_text("T,V\n100,1\n200,4\n")
+    results = np.concatenate(list(evaluate_columns(engine, 'T/V', [open_source(str(path))])))
+    assert results.tolist() == [100.0, 50.0]
@@ -0,0 +1,80 @@
+import math
+
+import pytest
+
+from physics_engine import PhysicsEngine
+from physics_solve import SolveError, solve, solve_many, solve_quantity
+from physics_units import dimension
+
+HC = 6.62607015e-34 * 299792458
+EV = 1.602176634e-19
+
+
+@pytest.fixture
+def engine():
+    return PhysicsEngine()
+
+
+def test_photon_wavelength(engine):
+    assert solve(engine, 'h*c/λ', '2.5*eV') == pytest.approx(HC / (2.5 * EV), rel=1e-14)
+    assert solve(engine, 'h*c/λ = 2.5*eV') == pytest.approx(HC / (2.5 * EV), rel=1e-14)
+
+
+def test_unknown_gets_its_dimension(engine):
+    result = solve_quantity(engine, 'h*c/λ', '2.5*eV')
+    assert result.dims == dimension(m=1)
+    assert result.value == pytest.approx(495.9367936e-9, rel=1e-9)
+
+
+@pytest.mark.parametrize('text, bracket, root', [
+    ('x^2 = 2', (0, 2), math.sqrt(2)),
+    ('x^3 - 2*x - 5', (2, 3), 2.0945514815423265),
+    # Wien's displacement law: x = 5*(1 - exp(-x))
+    ('x - 5*(1 - exp(-x))', (1, 10), 4.965114231744276),
+    ('cos(x) = x', (0, 1), 0.7390851332151607),
+    ('ln(x) = 1', None, math.e),
+])
+def test_roots_to_full_precision(engine, text, bracket, root):
+    assert solve(engine, text, bracket=bracket) == pytest.approx(root, rel=4 * 2.0 ** -52)
+
+
+def test_root_at_zero_terminates(engine):
+    assert abs(solve(engine, 'sin(x)', bracket=(-1, 2))) < 1e-300
+
+
+def test_roots_found_without_a_bracket_across_magnitudes(engine):
+    assert solve(engine, 'x*1e30', 3) == pytest.approx(3e-30, rel=1e-14)
+    assert solve(engine, 'x/1e30', 3) == pytest.approx(3e30, rel=1e-14)
+    assert solve(engine, 'x^3', -8) == pytest.approx(-2, rel=1e-14)
+
+
+def test_pole_is_not_a_root(engine):
+    with pytest.raises(SolveError, match='pole'):
+        solve(engine, 'tan(x)', bracket=(1, 2))
+
+
+@pytest.mark.parametrize('text, target, message', [
+    ('x*y', 1, 'exactly one unknown'),
+    ('2*3', 1, 'exactly one unknown'),
+    ('x = 1', 2, 'either an equation or a target'),
+    ('x + (1 ± 0.1)', 2, '±'),
+    ('x = = 1', None, "exactly one '='"),
+])
+def test_unsolvable_requests(engine, text, target, message):
+    with pytest.raises(SolveError, match=message):
+        solve(engine, text, target)
+
+
+def test_many_targets_match_one_at_a_time(engine):
+    np = pytest.importorskip('numpy')
+    energies = np.array([1.0, 1.5, 2.0, 2.5, 3.0])
+    roots = solve_many(engine, 'h*c/λ/eV', energies)
+    assert roots == pytest.approx(HC / (energies * EV), rel=1e-14)
+    assert roots[1] == pytest.approx(solve(engine, 'h*c/λ/eV', 1.5), rel=1e-14)
+
+
+def test_many_targets_without_a_root_are_nan(engine):
+    np = pytest.importorskip('numpy')
+    roots = solve_many(engine, 'x^2', np.array([4.0, -1.0]), bracket=(0, 10))
+    assert roots[0] == pytest.approx(2, rel=1e-14)
+    assert np.isnan(roots[1])
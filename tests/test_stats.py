@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import physics_engine
+from physics_engine import PhysicsEngine
+from physics_stats import PROFILER, Profiler, StageStats
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    """The shared profiler, switched on with empty counters for one test"""
+    monkeypatch.setattr(PROFILER, 'enabled', True)
+    monkeypatch.setattr(PROFILER, 'stages', {})
+    return PROFILER
+
+
+def test_stage_counters_and_percentiles():
+    stats = StageStats()
+    for elapsed in [1000] * 90 + [1_000_000] * 9 + [5_000_000]:
+        stats.add(elapsed)
+    summary = stats.summary()
+    assert summary['count'] == 100
+    assert summary['total_ms'] == pytest.approx(14.09)
+    assert summary['max_us'] == 5000
+    # Upper bounds of the log2 buckets holding each percentile
+    assert summary['p50_us'] == pytest.approx(1.023)
+    assert summary['p99_us'] == pytest.approx(1048.575)
+    assert sum(summary['histogram_ns_log2']) == 100
+
+
+def test_a_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    start = profiler.start()
+    assert start == 0
+    profiler.stop('run', start)
+    assert profiler.snapshot() == {'enabled': False, 'stages': {}}
+
+
+def test_engine_stages_are_counted(profiler):
+    engine = PhysicsEngine()
+    for x in range(5):
+        engine.format_scientific(engine.evaluate('h*c/x', {'x': x + 1.0}))
+    counts = {stage: profiler.stages[stage].count for stage in ('compile', 'run', 'format')}
+    # Compiled once, then cached
+    assert counts == {'compile': 1, 'run': 5, 'format': 5}
+    assert profiler.report().splitlines()[0].split()[:2] == ['stage', 'count']
+
+
+def test_stats_file_from_the_command_line(profiler, tmp_path, monkeypatch):
+    source = tmp_path / 'input.txt'
+    source.write_text('1+1\nh*c\n', encoding='utf-8')
+    stats = tmp_path / 'stats.json'
+    monkeypatch.setattr(physics_engine.PROFILER, 'enabled', False)
+    assert physics_engine.main([str(source), '-o', str(tmp_path / 'out.txt'), '--stats', str(stats)]) == 0
+    snapshot = json.loads(stats.read_text(encoding='utf-8'))
+    assert snapshot['enabled'] and snapshot['stages']['compile']['count'] == 2
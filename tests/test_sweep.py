@@ -0,0 +1,57 @@
+import pytest
+
+import physics_sweep
+from physics_engine import PhysicsEngine
+from physics_sweep import logspace, main, sweep
+
+np = pytest.importorskip('numpy')
+
+EXPRESSIONS = [
+    'h*c/(x*nm)/eV',
+    'sqrt(x)*exp(-x/300)+ln(x)',
+    'tan(x/1000)^2 + log10(x) - expm1(-x/500)',
+    'sin(x)^2 + cos(x)^2',
+    'x^3 - 2*x',
+]
+
+
+@pytest.fixture
+def engine():
+    return PhysicsEngine()
+
+
+@pytest.mark.parametrize('text', EXPRESSIONS)
+def test_exact_sweeps_match_the_scalar_engine(engine, text):
+    values = np.linspace(100.0, 1000.0, 257)
+    results = sweep(engine, text, 'x', values, chunk_size=64, exact=True)
+    # Bit for bit, chunk boundaries included
+    assert results.tolist() == [engine.evaluate(text, {'x': x}) for x in values.tolist()]
+    # NumPy's own kernels may differ in the last bit
+    assert sweep(engine, text, 'x', values) == pytest.approx(results, rel=1e-14)
+
+
+def test_shape_and_constant_results(engine):
+    values = np.arange(1.0, 7.0).reshape(2, 3)
+    assert sweep(engine, 'x*2', 'x', values).tolist() == [[2, 4, 6], [8, 10, 12]]
+    # A result that does not use the variable fills the whole sweep
+    assert sweep(engine, 'h*c', 'x', values, chunk_size=4).tolist() == [[engine.evaluate('h*c')] * 3] * 2
+
+
+def test_spacing():
+    assert logspace(1.0, 1000.0, 4) == pytest.approx([1, 10, 100, 1000])
+
+
+def test_script_saves_or_prints(tmp_path, capsys):
+    output = tmp_path / 'energies.npy'
+    assert main(['h*c/λ/eV', 'λ', '100*nm', '1000*nm', '--num', '10', '-o', str(output)]) == 0
+    energies = np.load(output)
+    assert energies[0] == pytest.approx(12.398419843, rel=1e-9) and energies.shape == (10,)
+
+    assert main(['x^2', 'x', '1', '1000', '--num', '4', '--log']) == 0
+    assert capsys.readouterr().out.splitlines() == ['1\t1', '10\t100', '100\t10000', '1000\t1.0×10^6']
+
+
+def test_numpy_is_required(engine, monkeypatch):
+    monkeypatch.setattr(physics_sweep, 'np', None)
+    with pytest.raises(RuntimeError, match='NumPy'):
+        sweep(engine, 'x', 'x', [1.0])
@@ -0,0 +1,73 @@
+import math
+
+import pytest
+
+import physics_uncertainty
+from physics_engine import PhysicsEngine
+from physics_uncertainty import Uncertain, format_uncertain
+
+
+@pytest.fixture(params=['numpy', 'scalar'])
+def engine(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        # As on an installation without NumPy
+        monkeypatch.setattr(physics_uncertainty, 'np', None)
+    engine = PhysicsEngine()
+    engine.propagator.samples = 20000
+    engine.propagator.seed = 1
+    return engine
+
+
+def test_mean_and_spread_of_a_product(engine):
+    result = engine.evaluate('(9.81 ± 0.02)*(1.20 ± 0.01)^2/2')
+    assert result.samples == 20000 and result.invalid == 0
+    # First-order propagation: relative errors add in quadrature
+    expected = math.hypot(0.02 / 9.81, 2 * 0.01 / 1.20) * 9.81 * 1.44 / 2
+    assert result.mean == pytest.approx(9.81 * 1.44 / 2, rel=1e-3)
+    assert result.std == pytest.approx(expected, rel=0.03)
+    assert result.percentiles[2.5] < result.percentiles[50.0] < result.percentiles[97.5]
+    assert result.percentiles[97.5] - result.percentiles[2.5] == pytest.approx(2 * 1.96 * expected, rel=0.05)
+
+
+def test_an_uncertain_variable_is_sampled_once_per_draw(engine):
+    x = Uncertain(3.0, 0.1)
+    square = engine.evaluate('x*x', {'x': x})
+    independent = engine.evaluate('x*y', {'x': x, 'y': x})
+    assert square.mean == pytest.approx(9.01, rel=1e-3)
+    # Correlated with itself, x*x spreads √2 times as much as a product of independent draws
+    assert square.std / independent.std == pytest.approx(math.sqrt(2), rel=0.05)
+
+
+def test_undefined_draws_are_left_out(engine):
+    result = engine.evaluate('sqrt(x)', {'x': Uncertain(0.0, 1.0)})
+    assert result.invalid == pytest.approx(10000, rel=0.05)
+    assert result.mean > 0
+    with pytest.raises(ValueError, match='every sample'):
+        engine.evaluate('ln(x)', {'x': Uncertain(-10.0, 1.0)})
+
+
+def test_a_seed_repeats_the_draws(engine):
+    first = engine.evaluate('(2 ± 0.1)*3')
+    assert engine.evaluate('(2 ± 0.1)*3').mean == first.mean
+
+
+def test_units_are_kept(engine):
+    result = engine.evaluate_quantity('(2 ± 0.1)*m')
+    assert result.unit == 'm' and result.value.std == pytest.approx(0.1, rel=0.05)
+
+
+def test_fewer_draws_without_numpy(monkeypatch):
+    monkeypatch.setattr(physics_uncertainty, 'np', None)
+    engine = PhysicsEngine()
+    engine.propagator.seed = 1
+    assert engine.evaluate('(2 ± 0.1)*3').samples == physics_uncertainty.SCALAR_SAMPLES
+
+
+@pytest.mark.parametrize('mean, std, text', [
+    (9.8123, 0.0213, '9.812 ± 0.021'),
+    (6.626e-34, 1.2e-36, '(6.626 ± 0.012)×10^-34'),
+])
+def test_formatting(mean, std, text):
+    assert format_uncertain(Uncertain(mean, std)) == text
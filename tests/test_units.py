@@ -0,0 +1,72 @@
+import pytest
+
+from physics_engine import PhysicsEngine
+from physics_units import DIMENSIONLESS, DimensionError, Quantity, dimension
+
+
+@pytest.fixture
+def engine():
+    return PhysicsEngine()
+
+
+@pytest.mark.parametrize('text', [
+    'exp(2*m)',
+    'sin(3*kg)',
+    'ln(5*J)',
+    'expm1(h*c/(500*nm))',
+    'exp(-1.5*eV/(kB*300))',
+])
+def test_dimensionless_functions_reject_dimensioned_arguments(engine, text):
+    with pytest.raises(DimensionError):
+        engine.evaluate(text)
+
+
+@pytest.mark.parametrize('text', [
+    'exp(2*m/m)',
+    'cos(π/3)',
+    'exp(-1.5*eV/(kB*300*K))',
+    'log10(6.02214076e23)',
+])
+def test_dimensionless_arguments_are_accepted(engine, text):
+    assert engine.evaluate_quantity(text).dims == DIMENSIONLESS
+
+
+def test_unknown_argument_leaves_the_dimension_open(engine):
+    # x may turn out to be dimensionless, so nothing is decided at compile time
+    assert engine.evaluate('exp(x*m)', {'x': 2}) == pytest.approx(7.389056099)
+    assert engine.compile_expression('exp(x*m)', {'x': 2}).dims is None
+
+
+def test_incompatible_sums(engine):
+    with pytest.raises(DimensionError, match='Cannot add'):
+        engine.evaluate('2*m + 3*s')
+    assert engine.evaluate('2*m + 3*cm') == pytest.approx(2.03)
+
+
+def test_dimensions_through_powers_and_roots(engine):
+    assert engine.evaluate_quantity('sqrt(4*m^2)').dims == dimension(m=1)
+    assert engine.evaluate_quantity('(2*m)^3').dims == dimension(m=3)
+    assert engine.evaluate_quantity('h*c/(500*nm)').dims == engine.evaluate_quantity('J').dims
+
+
+@pytest.mark.parametrize('text', ['euler**(2*m)', '2^(3*kg)', 'pow(10, 3*s)', 'euler^(-1.5*eV/(kB*300))'])
+def test_exponents_must_be_dimensionless_like_function_arguments(engine, text):
+    with pytest.raises(DimensionError, match='exponent'):
+        engine.evaluate(text)
+
+
+@pytest.mark.parametrize('text', ['exp(-h*c/(500*nm*kB*300))', 'euler**(-h*c/(500*nm*kB*300))', 'log10(1000*nm)',
+                                  '2*m + 3*s'])
+def test_dimension_checks_can_be_turned_off(text):
+    # As before dimensions were checked, bare numbers may stand for a temperature or a size
+    value = PhysicsEngine(check_dimensions=False).evaluate(text)
+    assert isinstance(value, (int, float))
+
+
+def test_quantity_arithmetic():
+    length = Quantity(2.0, dimension(m=1))
+    assert (length * length).dims == dimension(m=2)
+    with pytest.raises(DimensionError):
+        length + Quantity(1.0, dimension(s=1))
+    with pytest.raises(DimensionError):
+        length ** length
@@ -0,0 +1,85 @@
+import pytest
+
+from physics_engine import PhysicsEngine
+from physics_units import dimension
+from physics_worksheet import Worksheet, main
+
+HYDROGEN = """μ = mₑ*mₚ/(mₑ + mₚ)
+a = 4*π*ε₀*ℏ^2/(μ*e^2)
+E = ℏ^2/(2*μ*a^2)*(1 - 1/n^2)
+n = 2
+λ = h*c/E
+"""
+
+
+@pytest.fixture
+def worksheet():
+    worksheet = Worksheet(PhysicsEngine())
+    worksheet.loads(HYDROGEN)
+    return worksheet
+
+
+def test_names_may_be_used_before_they_are_defined(worksheet):
+    assert worksheet['λ'].value == pytest.approx(121.5684e-9, rel=1e-6)
+    assert worksheet['λ'].dims == dimension(m=1)
+    assert worksheet.format(worksheet['a']).endswith(' m')
+
+
+def test_only_downstream_names_are_recomputed(worksheet):
+    runs = []
+    run = worksheet.engine.run
+
+    def counted(program, variables=None):
+        runs.append(program)
+        return run(program, variables)
+
+    worksheet.engine.run = counted
+    assert worksheet.assign('n', '3') == ['n', 'E', 'λ']
+    assert len(runs) == 3
+    assert worksheet['λ'].value == pytest.approx(102.5734e-9, rel=1e-6)
+    # The same values as evaluating from scratch
+    fresh = Worksheet(PhysicsEngine())
+    fresh.loads(worksheet.dumps())
+    assert fresh.values() == worksheet.values()
+
+
+def test_circular_definitions_are_rejected(worksheet):
+    with pytest.raises(ValueError, match='Circular'):
+        worksheet.assign('μ', 'λ*kg/m')
+    with pytest.raises(ValueError, match='itself'):
+        worksheet.assign('n', 'n+1')
+    # The worksheet is unchanged
+    assert worksheet['μ'].text == 'mₑ*mₚ/(mₑ + mₚ)' and worksheet['n'].value == 2
+
+
+def test_errors_propagate_until_fixed(worksheet):
+    worksheet.assign('n', '1/0')
+    assert worksheet['λ'].error == "'E' has an error"
+    worksheet.remove('n')
+    assert worksheet['E'].error == "'n' is not defined"
+    assert worksheet.assign('n', '2') == ['n', 'E', 'λ']
+    assert worksheet['λ'].error is None
+
+
+def test_save_and_load_round_trip(worksheet, tmp_path):
+    path = str(tmp_path / 'hydrogen.txt')
+    worksheet.assign('n', '4')
+    worksheet.save(path)
+    loaded = Worksheet(PhysicsEngine())
+    loaded.load(path)
+    assert [cell.name for cell in loaded] == ['μ', 'a', 'E', 'n', 'λ']
+    assert loaded.values() == worksheet.values()
+
+
+def test_bad_lines_keep_the_current_worksheet(worksheet):
+    with pytest.raises(ValueError, match='line 2'):
+        worksheet.loads("x = 1\nnot an assignment\n")
+    assert len(worksheet) == 5
+
+
+def test_script_prints_values(tmp_path, capsys):
+    path = tmp_path / 'hydrogen.txt'
+    path.write_text(HYDROGEN, encoding='utf-8')
+    assert main([str(path), '--set', 'n=3']) == 0
+    assert 'λ = 1.025734×10^-7 m' in capsys.readouterr().out
+    assert main([str(path), '--set', 'n']) == 1